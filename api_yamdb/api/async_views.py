@@ -0,0 +1,73 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Самые нагруженные маршруты чтения, которые под ASGI обслуживаются
+# асинхронными представлениями.
+ASYNC_ROUTES = (
+    'title-list', 'title-detail', 'category-list', 'genre-list',
+    'reviews-list', 'comments-list',
+)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_READ_THREADS, thread_name_prefix='read')
+
+
+def run_view(view, request, *args, **kwargs):
+    """
+    Выполняет представление DRF в потоке пула. Ответ рендерится здесь же,
+    чтобы сериализация в JSON не ждала общего потока синхронного кода.
+    Соединения с БД у каждого потока пула свои; они закрываются
+    и переиспользуются по CONN_MAX_AGE, как после обычного запроса.
+    """
+
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read(view):
+    """
+    Асинхронная версия представления DRF. Под ASGI синхронные
+    представления Django выполняет по очереди в одном потоке, а здесь
+    запросы на чтение расходятся по пулу из ASYNC_READ_THREADS потоков.
+    Запросы на запись выполняются как обычные синхронные представления.
+    """
+
+    sync_view = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await sync_view(request, *args, **kwargs)
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            executor,
+            partial(context.run, run_view, view, request, *args, **kwargs))
+
+    return async_view
+
+
+def async_urls(patterns, routes=ASYNC_ROUTES):
+    """Заменяет представления маршрутов routes асинхронными."""
+
+    return [
+        URLPattern(pattern.pattern, async_read(pattern.callback),
+                   pattern.default_args, pattern.name)
+        if isinstance(pattern, URLPattern) and pattern.name in routes
+        else pattern
+        for pattern in patterns
+    ]
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+
+from api_yamdb.replicas import pin_user_reads
+from .cache import get_cache
+
+USER_KEY = 'api:user:{}'
+
+
+def get_user_cache_key(user_id):
+    return USER_KEY.format(user_id)
+
+
+def get_cached_fields(model):
+    """Поля пользователя, которые хранятся в кэше (без пароля)."""
+
+    return [field.attname for field in model._meta.concrete_fields
+            if field.attname != 'password']
+
+
+def invalidate_cached_user(user_id):
+    """
+    Удаляет пользователя из кэша сразу и повторно после фиксации
+    транзакции, чтобы параллельный запрос не вернул в кэш
+    прежние роль или статус активности.
+    """
+
+    cache = get_cache()
+    key = get_user_cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без запроса к БД на каждый вызов.
+    Пользователь, найденный по идентификатору из токена, хранится
+    в кэше API_USER_CACHE_TIMEOUT секунд. Пароль в кэш не попадает
+    и загружается из БД только при обращении к нему.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            pin_user_reads(result[0])
+        return result
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+
+        cache = get_cache()
+        key = get_user_cache_key(user_id)
+        values = cache.get(key)
+        if values is None:
+            user = super().get_user(validated_token)
+            cache.set(
+                key,
+                [getattr(user, name)
+                 for name in get_cached_fields(self.user_model)],
+                settings.API_USER_CACHE_TIMEOUT)
+            return user
+
+        user = self.user_model.from_db(
+            router.db_for_read(self.user_model),
+            get_cached_fields(self.user_model), values)
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive')
+        return user
@@ -0,0 +1,143 @@
+from contextlib import nullcontext
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import mixins
+from rest_framework.response import Response
+
+from api_yamdb.replicas import primary_reads
+
+CATALOG_VERSION_KEY = 'api:catalog:version'
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def get_version(key):
+    """
+    Возвращает текущее поколение данных под ключом key.
+    Поколение хранится в общем кэше, поэтому одинаково для всех воркеров.
+    """
+
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_recent_key(key):
+    return f'{key}:recent'
+
+
+def bump_version(key):
+    """
+    Начинает новое поколение данных key после фиксации транзакции.
+    Реплика, признанная исправной, может еще не получить изменения,
+    поэтому новое поколение отмечается как недавнее на REPLICA_MAX_LAG
+    и интервал между проверками реплик.
+    """
+
+    def bump():
+        cache = get_cache()
+        if settings.REPLICA_DATABASES:
+            cache.set(get_recent_key(key), True, timeout=(
+                settings.REPLICA_MAX_LAG + settings.REPLICA_HEALTH_INTERVAL))
+        cache.set(key, uuid4().hex, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def version_reads(key):
+    """
+    Контекст для чтения данных, которые сохраняются под текущим
+    поколением key: пока поколение недавнее, чтение идет с основной БД,
+    чтобы отстающая реплика не закрепила в нем прежние данные.
+    """
+
+    if settings.REPLICA_DATABASES and get_cache().get(
+            get_recent_key(key)) is not None:
+        return primary_reads()
+    return nullcontext()
+
+
+def get_catalog_version():
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """
+    Начинает новое поколение каталога.
+    Ответы, закэшированные для прежнего поколения, больше не читаются
+    и вытесняются из кэша как самые давно использованные.
+    """
+
+    bump_version(CATALOG_VERSION_KEY)
+
+
+class CachedResponseMixin:
+    """
+    Кэширует ответы для текущего поколения каталога.
+    Ключ строится из адреса, параметров фильтрации и пагинации.
+    """
+
+    cache_query_params = ('limit', 'offset', 'page', 'cursor',
+                          'ordering', 'search', 'format')
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        with version_reads(CATALOG_VERSION_KEY):
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        return response
+
+    def get_cache_params(self, request):
+        """Нормализованные параметры запроса, влияющие на ответ."""
+
+        filterset_class = getattr(self, 'filterset_class', None)
+        filters = filterset_class.base_filters if filterset_class else {}
+        names = set(self.cache_query_params) | set(filters)
+        params = []
+        for name in sorted(names & set(request.query_params)):
+            value = request.query_params.get(name)
+            if name in filters and ',' in value:
+                value = ','.join(sorted(value.split(',')))
+            params.append(f'{name}={value}')
+        return '&'.join(params)
+
+    def get_cache_key(self, request):
+        kwargs = '&'.join(
+            f'{name}={value}' for name, value in sorted(self.kwargs.items()))
+        request_key = '|'.join((
+            request.get_host(), self.basename, self.action, kwargs,
+            self.get_cache_params(request),
+        ))
+        return 'api:response:{}:{}'.format(
+            get_catalog_version(), md5(request_key.encode()).hexdigest())
+
+
+class CachedListModelMixin(CachedResponseMixin, mixins.ListModelMixin):
+    """Список объектов с кэшированием ответа."""
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveModelMixin(CachedResponseMixin,
+                               mixins.RetrieveModelMixin):
+    """Получение объекта с кэшированием ответа."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs)
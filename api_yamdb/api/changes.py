@@ -0,0 +1,120 @@
+import base64
+import binascii
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from reviews.models import Category, Comment, Genre, Review, Title, Tombstone
+from .serializers import (CategorySerializer, CommentSerializer,
+                          GenreSerializer, ReviewSerializer,
+                          TitleViewSerializer)
+
+DATASETS = {
+    'titles': (
+        Title.objects.select_related('category').prefetch_related(
+            'genre').defer('search_vector'),
+        TitleViewSerializer),
+    'reviews': (Review.objects.select_related('author'), ReviewSerializer),
+    'comments': (Comment.objects.select_related('author'), CommentSerializer),
+    'genres': (Genre.objects.all(), GenreSerializer),
+    'categories': (Category.objects.all(), CategorySerializer),
+}
+
+# Курсор хранит позиции двух потоков ленты: измененных объектов
+# по (updated_at, id) и отметок об удалении по (deleted_at, id).
+STREAMS = ('changed', 'deleted')
+
+timestamp_field = serializers.DateTimeField()
+
+
+def encode_cursor(position):
+    data = json.dumps({
+        stream: None if value is None else [value[0].isoformat(), value[1]]
+        for stream, value in position.items()
+    })
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        position = {}
+        for stream in STREAMS:
+            value = data[stream]
+            position[stream] = None if value is None else (
+                parse_datetime(value[0]), int(value[1]))
+            if value is not None and position[stream][0] is None:
+                raise ValueError
+    except (binascii.Error, KeyError, TypeError, ValueError):
+        raise ValidationError({'cursor': ['Неверный курсор.']})
+    return position
+
+
+def get_start_position(cursor=None, updated_since=None):
+    """Позиция ленты по курсору или с момента updated_since."""
+
+    if cursor:
+        return decode_cursor(cursor)
+    value = None if updated_since is None else (updated_since, 0)
+    return dict.fromkeys(STREAMS, value)
+
+
+def after(queryset, field, position):
+    """
+    Строки queryset после позиции (отметка времени, id) в порядке
+    (field, id). Условие field >= отметки читается диапазоном индекса
+    (field, id), строки с той же отметкой и меньшим id отбрасываются.
+    """
+
+    queryset = queryset.order_by(field, 'id')
+    if position is None:
+        return queryset
+    timestamp, pk = position
+    return queryset.filter(**{f'{field}__gte': timestamp}).exclude(
+        **{field: timestamp, 'id__lte': pk})
+
+
+def get_changes(dataset, position, limit):
+    """
+    Не больше limit измененных и limit удаленных объектов dataset
+    после позиции position и новая позиция. Изменения последних
+    CHANGE_FEED_LAG секунд не отдаются: транзакции, начатые раньше,
+    еще могут записать строки с меньшей отметкой времени.
+    """
+
+    queryset, serializer_class = DATASETS[dataset]
+    horizon = timezone.now() - timedelta(seconds=settings.CHANGE_FEED_LAG)
+    changed = list(after(
+        queryset.filter(updated_at__lt=horizon), 'updated_at',
+        position['changed'])[:limit])
+    deleted = list(after(
+        Tombstone.objects.filter(
+            model=queryset.model._meta.model_name, deleted_at__lt=horizon),
+        'deleted_at', position['deleted'])[:limit])
+    position = dict(position)
+    if changed:
+        position['changed'] = (changed[-1].updated_at, changed[-1].id)
+    if deleted:
+        position['deleted'] = (deleted[-1].deleted_at, deleted[-1].id)
+    data = serializer_class(changed, many=True).data
+    return {
+        'cursor': encode_cursor(position),
+        'more': len(changed) == limit or len(deleted) == limit,
+        'changed': [
+            {'id': obj.id,
+             'updated_at': timestamp_field.to_representation(obj.updated_at),
+             **row}
+            for obj, row in zip(changed, data)
+        ],
+        'deleted': [
+            {'id': tombstone.object_id,
+             'deleted_at': timestamp_field.to_representation(
+                 tombstone.deleted_at)}
+            for tombstone in deleted
+        ],
+    }
@@ -0,0 +1,72 @@
+from calendar import timegm
+from datetime import datetime
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import mixins
+
+
+class ConditionalResponseMixin:
+    """
+    Поддержка условных GET-запросов (If-None-Match, If-Modified-Since).
+    Валидатор вычисляется методом get_validator без основного запроса
+    и сериализации, поэтому ответ 304 стоит одного индексного поиска.
+    """
+
+    def get_validator(self):
+        """
+        Возвращает отметку времени изменения (datetime) или строку
+        версии данных. None отключает условную обработку запроса.
+        """
+
+        raise NotImplementedError
+
+    def get_etag(self, request, validator):
+        if isinstance(validator, datetime):
+            validator = validator.isoformat()
+        kwargs = '&'.join(
+            f'{name}={value}' for name, value in sorted(self.kwargs.items()))
+        params = '&'.join(
+            f'{name}={value}'
+            for name, value in sorted(request.query_params.items()))
+        source = '|'.join((self.basename, self.action, kwargs, params,
+                           str(validator)))
+        return quote_etag(md5(source.encode()).hexdigest())
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        validator = self.get_validator()
+        if validator is None:
+            return handler(request, *args, **kwargs)
+        etag = self.get_etag(request, validator)
+        last_modified = None
+        if isinstance(validator, datetime):
+            last_modified = timegm(validator.utctimetuple())
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class ConditionalListModelMixin(ConditionalResponseMixin,
+                                mixins.ListModelMixin):
+    """Список объектов с поддержкой условных запросов."""
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().list, request, *args, **kwargs)
+
+
+class ConditionalRetrieveModelMixin(ConditionalResponseMixin,
+                                    mixins.RetrieveModelMixin):
+    """Получение объекта с поддержкой условных запросов."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().retrieve, request, *args, **kwargs)
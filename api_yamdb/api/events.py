@@ -0,0 +1,397 @@
+import asyncio
+import atexit
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from collections import defaultdict
+from uuid import uuid4
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connections, transaction
+from django.http import Http404, StreamingHttpResponse
+from django.urls import Resolver404, resolve
+from django.views.decorators.http import require_GET
+
+from reviews.models import Comment, Review, Title
+from .serializers import CommentSerializer, ReviewSerializer
+
+CONTENT_TYPE = 'text/event-stream'
+
+HEADERS = {
+    'Cache-Control': 'no-cache',
+    # nginx передает события клиенту сразу, не накапливая ответ.
+    'X-Accel-Buffering': 'no',
+}
+
+# Первое сообщение потока: через сколько миллисекунд EventSource
+# переподключается после разрыва.
+PREAMBLE = b'retry: 3000\n\n'
+
+HEARTBEAT = b': ping\n\n'
+
+# Потоки событий: имя маршрута -> (модель события, поле родителя,
+# сериализатор). Канал потока — '<поле родителя>:<id родителя>'.
+SOURCES = {
+    'review-events': (Review, 'title', ReviewSerializer),
+    'comment-events': (Comment, 'review', CommentSerializer),
+}
+
+
+def get_channel(parent, parent_id):
+    return f'{parent}:{parent_id}'
+
+
+def format_event(instance, serializer_class):
+    """Событие SSE о новом объекте; id события — id объекта."""
+
+    data = json.dumps(serializer_class(instance).data, cls=DjangoJSONEncoder,
+                      ensure_ascii=False)
+    name = instance._meta.model_name
+    return f'id: {instance.pk}\nevent: {name}\ndata: {data}\n\n'.encode()
+
+
+class Subscription:
+    """
+    Очередь событий одного подписчика. Если подписчик не успевает
+    забирать события и очередь переполняется, подписка закрывается:
+    клиент переподключится с Last-Event-ID и получит пропущенное из БД.
+    """
+
+    def __init__(self):
+        self.channel = None
+        self.closed = False
+
+
+class ThreadSubscription(Subscription):
+    """Подписка для потока ответа WSGI."""
+
+    def __init__(self):
+        super().__init__()
+        self.queue = queue.Queue(settings.EVENTS_QUEUE_SIZE)
+
+    def put(self, pk, event):
+        try:
+            self.queue.put_nowait((pk, event))
+        except queue.Full:
+            self.closed = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """
+    Подписка для ответа ASGI; события передаются в цикл событий.
+    Создается в потоке цикла событий.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(settings.EVENTS_QUEUE_SIZE)
+
+    def put(self, pk, event):
+        self.loop.call_soon_threadsafe(self.put_nowait, pk, event)
+
+    def put_nowait(self, pk, event):
+        try:
+            self.queue.put_nowait((pk, event))
+        except asyncio.QueueFull:
+            self.closed = True
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    """
+    Раздача событий подписчикам всех воркеров на этой машине.
+    Воркер, у которого есть подписчики, слушает датаграммный сокет
+    в папке EVENTS_DIR. Событие отправляется одной датаграммой в каждый
+    сокет папки, а воркер раздает его своим подписчикам из памяти:
+    одна запись в БД доходит до всех клиентов без запросов к БД.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = defaultdict(set)
+        self.pid = None
+        self.path = None
+        self.sender = None
+
+    def subscribe(self, subscription):
+        with self.lock:
+            self.listen()
+            self.channels[subscription.channel].add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.channels[subscription.channel]
+
+    def deliver(self, channel, pk, event):
+        with self.lock:
+            subscribers = list(self.channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(pk, event)
+
+    def listen(self):
+        """Открывает сокет воркера при первой подписке (и после fork)."""
+
+        if self.pid == os.getpid():
+            return
+        os.makedirs(settings.EVENTS_DIR, exist_ok=True)
+        self.path = os.path.join(
+            settings.EVENTS_DIR, f'{os.getpid()}-{uuid4().hex[:8]}.sock')
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(self.path)
+        self.pid = os.getpid()
+        threading.Thread(target=self.receive, args=(receiver,), daemon=True,
+                         name='events').start()
+        atexit.register(self.close, self.path)
+
+    def receive(self, receiver):
+        while True:
+            message = receiver.recv(settings.EVENTS_MAX_SIZE)
+            try:
+                channel, pk, event = message.split(b'\n', 2)
+                self.deliver(channel.decode(), int(pk), event)
+            except ValueError:
+                continue
+
+    def close(self, path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def publish(self, channel, pk, event):
+        """
+        Отправляет событие во все сокеты EVENTS_DIR. Отправка
+        не блокируется: если очередь сокета воркера заполнена,
+        его подписчики получат событие при переподключении.
+        """
+
+        message = b'\n'.join((channel.encode(), str(pk).encode(), event))
+        if self.sender is None or self.sender[0] != os.getpid():
+            sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sender.setblocking(False)
+            self.sender = (os.getpid(), sender)
+        try:
+            names = os.listdir(settings.EVENTS_DIR)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith('.sock'):
+                continue
+            path = os.path.join(settings.EVENTS_DIR, name)
+            try:
+                self.sender[1].sendto(message, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Сокет завершившегося воркера.
+                self.close(path)
+            except OSError:
+                pass
+
+
+broker = EventBroker()
+
+
+def publish_created(instance):
+    """
+    Публикует событие о новом отзыве или комментарии после фиксации
+    транзакции. Событие сериализуется один раз, здесь же.
+    """
+
+    for model, parent, serializer_class in SOURCES.values():
+        if isinstance(instance, model):
+            channel = get_channel(parent, getattr(instance, f'{parent}_id'))
+            event = format_event(instance, serializer_class)
+            transaction.on_commit(
+                lambda: broker.publish(channel, instance.pk, event))
+
+
+class EventStream:
+    """
+    Поток событий о новых объектах одного родителя. Подписка
+    оформляется до чтения пропущенных событий, поэтому события
+    между ними не теряются, а повторы отбрасываются по id.
+    """
+
+    def __init__(self, route, kwargs, last_event_id, subscription):
+        model, parent, serializer_class = SOURCES[route]
+        parent_id = kwargs[f'{parent}_id']
+        if parent == 'title':
+            parents = Title.objects.filter(pk=parent_id)
+        else:
+            parents = Review.objects.filter(
+                pk=parent_id, title_id=kwargs['title_id'])
+        if not parents.exists():
+            raise Http404
+        self.subscription = subscription
+        subscription.channel = get_channel(parent, parent_id)
+        broker.subscribe(subscription)
+        self.last_id = 0
+        self.backlog = [PREAMBLE]
+        if last_event_id is not None:
+            self.last_id = last_event_id
+            missed = model.objects.filter(
+                **{f'{parent}_id': parent_id, 'pk__gt': last_event_id}
+            ).select_related('author').order_by('pk')[
+                :settings.EVENTS_REPLAY_SIZE]
+            for instance in missed:
+                self.backlog.append(format_event(instance, serializer_class))
+                self.last_id = instance.pk
+        self.deadline = time.monotonic() + settings.EVENTS_STREAM_SECONDS
+
+    def accept(self, item):
+        """Событие для отправки клиенту или None для повтора."""
+
+        if item is None:
+            return HEARTBEAT
+        pk, event = item
+        if pk <= self.last_id:
+            return None
+        self.last_id = pk
+        return event
+
+    def is_open(self):
+        return (not self.subscription.closed
+                and time.monotonic() < self.deadline)
+
+    def close(self):
+        broker.unsubscribe(self.subscription)
+
+    def __iter__(self):
+        """События для потокового ответа WSGI."""
+
+        try:
+            yield from self.backlog
+            while self.is_open():
+                event = self.accept(
+                    self.subscription.get(settings.EVENTS_HEARTBEAT))
+                if event is not None:
+                    yield event
+        finally:
+            self.close()
+
+
+def get_last_event_id(value):
+    """id последнего полученного события из заголовка Last-Event-ID."""
+
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+@require_GET
+def events_view(request, **kwargs):
+    """
+    Поток событий SSE о новых отзывах произведения или комментариях
+    отзыва. Под WSGI каждый поток занимает поток воркера, поэтому
+    для него нужен воркер gthread; под ASGI потоки обслуживает
+    events_application.
+    """
+
+    stream = EventStream(
+        request.resolver_match.url_name, kwargs,
+        get_last_event_id(request.headers.get('Last-Event-ID')),
+        ThreadSubscription())
+    # Поток не обращается к БД, а request_finished придет только после
+    # его закрытия: соединение освобождается, как только готов backlog.
+    connections.close_all()
+    response = StreamingHttpResponse(stream, content_type=CONTENT_TYPE)
+    for name, value in HEADERS.items():
+        response[name] = value
+    return response
+
+
+def open_stream(route, kwargs, last_event_id, subscription):
+    close_old_connections()
+    try:
+        return EventStream(route, kwargs, last_event_id, subscription)
+    finally:
+        close_old_connections()
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def send_stream(stream, receive, send):
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        for event in stream.backlog:
+            await send({'type': 'http.response.body', 'body': event,
+                        'more_body': True})
+        while stream.is_open():
+            waiter = asyncio.ensure_future(
+                stream.subscription.get(settings.EVENTS_HEARTBEAT))
+            await asyncio.wait(
+                (waiter, disconnect), return_when=asyncio.FIRST_COMPLETED)
+            if disconnect.done():
+                waiter.cancel()
+                return
+            event = stream.accept(waiter.result())
+            if event is not None:
+                await send({'type': 'http.response.body', 'body': event,
+                            'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnect.cancel()
+        stream.close()
+
+
+def events_application(application):
+    """
+    ASGI-приложение: потоки событий обслуживаются асинхронно, без
+    потока на каждого подписчика, остальные запросы идут в Django.
+    Django 3.2 отдает потоковые ответы синхронным итератором,
+    поэтому потоки SSE отдаются в обход него.
+    """
+
+    async def app(scope, receive, send):
+        try:
+            match = (resolve(scope['path'])
+                     if scope['type'] == 'http' else None)
+        except Resolver404:
+            match = None
+        if (match is None or match.url_name not in SOURCES
+                or scope['method'] != 'GET'):
+            return await application(scope, receive, send)
+        headers = dict(scope['headers'])
+        try:
+            stream = await sync_to_async(open_stream)(
+                match.url_name, match.kwargs, get_last_event_id(
+                    headers.get(b'last-event-id', b'').decode('latin-1')),
+                AsyncSubscription())
+        except Http404:
+            await send({'type': 'http.response.start', 'status': 404,
+                        'headers': [(b'content-type', b'text/plain')]})
+            await send({'type': 'http.response.body', 'body': b'Not Found'})
+            return
+        await send({
+            'type': 'http.response.start', 'status': 200,
+            'headers': [(b'content-type', CONTENT_TYPE.encode())] + [
+                (name.lower().encode(), value.encode())
+                for name, value in HEADERS.items()],
+        })
+        await send_stream(stream, receive, send)
+
+    return app
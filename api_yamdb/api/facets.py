@@ -0,0 +1,64 @@
+from django.db.models import Count
+from django_filters.utils import translate_validation
+
+from reviews.models import GenreTitle, Title
+
+# Измерения фасетов: откуда считаются значения и какие поля их описывают.
+FACETS = {
+    'genre': (GenreTitle, 'title', ('genre__slug', 'genre__name')),
+    'category': (Title, 'pk', ('category__slug', 'category__name')),
+    'year': (Title, 'pk', ('year',)),
+}
+
+
+def filter_titles(filterset_class, request, exclude=None):
+    """
+    Произведения, отобранные параметрами запроса без фильтра exclude.
+    Возвращает подзапрос идентификаторов без сортировки или None,
+    если фильтров нет.
+    """
+
+    data = request.query_params.copy()
+    data.pop(exclude, None)
+    if not set(data) & set(filterset_class.base_filters):
+        return None
+    filterset = filterset_class(
+        data, queryset=Title.objects.all(), request=request)
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    return filterset.qs.order_by().values('pk')
+
+
+def count_facet(name, titles):
+    """
+    Количество произведений titles (None — всех) по значениям измерения.
+    """
+
+    model, title_field, fields = FACETS[name]
+    key = fields[0]
+    rows = model.objects.filter(**{f'{key}__isnull': False})
+    if titles is not None:
+        rows = rows.filter(**{f'{title_field}__in': titles})
+    rows = rows.values(*fields).annotate(
+        count=Count(title_field, distinct=True)
+    ).order_by('-count', key)
+    return [
+        {**{field.split('__')[-1]: row[field] for field in fields},
+         'count': row['count']}
+        for row in rows
+    ]
+
+
+def count_facets(filterset_class, request, names):
+    """
+    Фасеты names для текущего выбора фильтров: по одному сгруппированному
+    запросу на измерение. Счетчики измерения строятся без его
+    собственного фильтра, чтобы показывать, сколько произведений даст
+    выбор другого значения.
+    """
+
+    return {
+        name: count_facet(
+            name, filter_titles(filterset_class, request, exclude=name))
+        for name in names
+    }
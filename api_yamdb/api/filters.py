@@ -18,7 +18,13 @@ class TitleFilter(filters.FilterSet):
     category = CharFilterInFilter(field_name='category__slug')
     genre = CharFilterInFilter(field_name='genre__slug')
     year = filters.NumberFilter(field_name='year')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ['name', 'category', 'genre', 'year']
+        fields = ['name', 'category', 'genre', 'year', 'search']
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск с сортировкой по релевантности."""
+
+        return queryset.search(value)
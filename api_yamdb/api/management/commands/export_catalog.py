@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand
+
+from api.export import EXPORTS, RENDERERS, export
+
+
+class Command(BaseCommand):
+    """Потоковая выгрузка каталога или отзывов в файл."""
+
+    help = """
+    Выгружает произведения (в том же виде, что /api/v1/titles/) или
+    отзывы в NDJSON или CSV. Строки читаются пачками курсором на
+    стороне сервера, расход памяти не зависит от размера таблицы."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORTS))
+        parser.add_argument(
+            '--format', dest='output_format', default='ndjson',
+            choices=sorted(RENDERERS))
+        parser.add_argument(
+            '--output', help='Файл для выгрузки, по умолчанию stdout.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Количество строк в одной пачке.')
+
+    def handle(self, *args, **options):
+        parts = export(options['dataset'], options['output_format'],
+                       options['chunk_size'])
+        if not options['output']:
+            for part in parts:
+                self.stdout.write(part, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            for part in parts:
+                output.write(part)
@@ -0,0 +1,99 @@
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.http import HttpRequest, QueryDict
+from django.urls import URLResolver, Resolver404
+from django.urls.resolvers import RegexPattern
+
+from api_yamdb.replicas import get_read_state, pin_user_reads, read_state
+
+API_PREFIX = '/api/v1/'
+
+# Заголовки внешнего запроса, которые не передаются подзапросам:
+# тело пакета и условия, относящиеся к нему, а не к подзапросам.
+SKIPPED_HEADERS = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_IF_NONE_MATCH',
+                   'HTTP_IF_MODIFIED_SINCE')
+
+
+@lru_cache(maxsize=None)
+def get_resolver():
+    """Маршруты router_v1 без асинхронных представлений режима ASGI."""
+
+    from .urls import router_v1
+
+    return URLResolver(RegexPattern(r'^{}'.format(API_PREFIX)),
+                       router_v1.urls)
+
+
+def get_path(url):
+    """Адрес относительно /api/v1/ или None для адреса вне API."""
+
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc:
+        return None
+    path = parts.path
+    if not path.startswith(API_PREFIX):
+        path = API_PREFIX + path.lstrip('/')
+    return path, parts.query
+
+
+def make_request(request, path, query):
+    """
+    GET-подзапрос с заголовками и пользователем внешнего запроса:
+    аутентификация не повторяется, а объекты, загруженные resolve_object,
+    общие для всех подзапросов пакета.
+    """
+
+    outer = request._request
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.META = {name: value for name, value in outer.META.items()
+                if name not in SKIPPED_HEADERS}
+    sub.META.update(REQUEST_METHOD='GET', PATH_INFO=path, QUERY_STRING=query)
+    sub.GET = QueryDict(query)
+    sub.COOKIES = outer.COOKIES
+    if request.user.is_authenticated:
+        sub._force_auth_user = request.user
+        sub._force_auth_token = request.auth
+    sub._resolved_objects = outer.__dict__.setdefault(
+        '_resolved_objects', {})
+    return sub
+
+
+def get(request, url):
+    """Статус и данные ответа на GET-подзапрос url."""
+
+    path = get_path(url)
+    try:
+        if path is None:
+            raise Resolver404
+        match = get_resolver().resolve(path[0])
+    except Resolver404:
+        return 404, {'detail': 'Страница не найдена.'}
+    sub = make_request(request, *path)
+    sub.resolver_match = match
+    token = read_state.set(get_read_state(sub))
+    try:
+        pin_user_reads(request.user)
+        response = match.func(sub, *match.args, **match.kwargs)
+    finally:
+        read_state.reset(token)
+    return response.status_code, getattr(response, 'data', None)
+
+
+def multiplex(request, urls):
+    """
+    Ответы на GET-запросы urls к маршрутам router_v1, выполненные
+    в этом же процессе без повторной аутентификации и middleware.
+    Одинаковые адреса выполняются один раз.
+    """
+
+    results = {}
+    responses = []
+    for url in urls:
+        if url not in results:
+            results[url] = get(request, url)
+        status, data = results[url]
+        responses.append({'url': url, 'status': status, 'body': data})
+    return responses
@@ -0,0 +1,62 @@
+from django.conf import settings
+from rest_framework.pagination import (CursorPagination,
+                                       LimitOffsetPagination,
+                                       PageNumberPagination)
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация по первичному ключу.
+    Страница выбирается условием id > курсор без OFFSET и COUNT(*),
+    поэтому стоимость запроса не зависит от номера страницы.
+    """
+
+    ordering = 'id'
+    page_size_query_param = 'limit'
+    max_page_size = settings.API_CURSOR_MAX_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        return (self.ordering,)
+
+
+class OptionalCursorPaginationMixin:
+    """
+    Включает курсорную пагинацию, если в запросе передан параметр cursor.
+    Без него работает исходная пагинация класса.
+    """
+
+    cursor_pagination_class = IdCursorPagination
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_query_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+
+class LimitOffsetOrCursorPagination(OptionalCursorPaginationMixin,
+                                    LimitOffsetPagination):
+    """Пагинация limit/offset с переходом на курсор по ?cursor=."""
+
+    pass
+
+
+class PageNumberOrCursorPagination(OptionalCursorPaginationMixin,
+                                   PageNumberPagination):
+    """Постраничная пагинация с переходом на курсор по ?cursor=."""
+
+    pass
@@ -57,7 +57,7 @@ class AdminOrModeratorOrAuthor(permissions.BasePermission):
             return True
         if request.user.is_moderator:
             return True
-        if request.user == obj.author and request.user.is_user:
+        if obj.author_id == request.user.pk and request.user.is_user:
             return True
         return False
 
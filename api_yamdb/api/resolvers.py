@@ -0,0 +1,38 @@
+from django.shortcuts import get_object_or_404
+
+
+def resolve_object(request, queryset, **lookup):
+    """
+    Возвращает объект queryset по lookup, загружая его не более
+    одного раза за запрос. Представление, разрешения и сериализаторы
+    получают один и тот же экземпляр родительского объекта.
+    Объекты хранятся в исходном HttpRequest, поэтому их разделяют
+    и подзапросы пакетного чтения (api/multiplex.py).
+    """
+
+    request = getattr(request, '_request', request)
+    resolved = request.__dict__.setdefault('_resolved_objects', {})
+    key = (queryset.model._meta.label,
+           tuple(sorted((name, str(value)) for name, value in lookup.items())))
+    if key not in resolved:
+        resolved[key] = get_object_or_404(queryset, **lookup)
+    return resolved[key]
+
+
+class ResolvedObjectMixin:
+    """
+    Объект из адреса запроса загружается через resolve_object:
+    проверки разрешений, сериализатор и представление получают один
+    экземпляр. object_lookup сопоставляет аргументы адреса полям
+    объекта; в ключ входит и родитель, поэтому объект другого
+    родителя не будет взят из уже загруженных.
+    """
+
+    object_lookup = {'pk': 'pk'}
+
+    def get_object(self):
+        obj = resolve_object(self.request, self.get_queryset(), **{
+            field: self.kwargs[name]
+            for name, field in self.object_lookup.items()})
+        self.check_object_permissions(self.request, obj)
+        return obj
@@ -1,12 +1,19 @@
 import datetime as dt
 
+from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.relations import SlugRelatedField
+from rest_framework.settings import api_settings
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.models import (Category, Comment, Genre, GenreTitle,
+                            LeaderboardEntry, Review, Title, User)
+from .cache import bump_catalog_version
+from .facets import FACETS
+from .title_index import bump_title_index_version
 from .validators import username_validator, validate_email, validate_username
 
 
@@ -31,7 +38,7 @@ class TitleViewSerializer(serializers.ModelSerializer):
 
     category = CategorySerializer()
     genre = GenreSerializer(many=True)
-    rating = serializers.IntegerField()
+    rating = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Title
@@ -62,7 +69,9 @@ class TitleSerializer(TitleViewSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = ('id', 'name', 'year',
+                  'rating', 'description', 'genre',
+                  'category')
 
     def validate_year(self, value):
         current_year = dt.date.today().year
@@ -71,6 +80,147 @@ class TitleSerializer(TitleViewSerializer):
         return value
 
 
+class BatchListSerializer(serializers.ListSerializer):
+    """
+    Пакетная запись объектов.
+    Связанные объекты всех элементов проверяются одним запросом
+    в validate_batch, ошибки возвращаются списком по элементам.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) > settings.API_BATCH_MAX_SIZE:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Слишком много объектов в одном запросе, '
+                f'максимум {settings.API_BATCH_MAX_SIZE}.'
+            ]})
+        items = super().to_internal_value(data)
+        errors = self.validate_batch(items)
+        if any(errors):
+            raise ValidationError(errors)
+        return items
+
+    def validate_batch(self, items):
+        return [{} for _ in items]
+
+
+class TitleBatchListSerializer(BatchListSerializer):
+    """Пакетное создание произведений с жанрами."""
+
+    def validate_batch(self, items):
+        categories = Category.objects.in_bulk(
+            {item['category'] for item in items}, field_name='slug')
+        genres = Genre.objects.in_bulk(
+            {slug for item in items for slug in item['genre']},
+            field_name='slug')
+        errors = []
+        for item in items:
+            item_errors = {}
+            if item['category'] not in categories:
+                item_errors['category'] = [
+                    f'Категория {item["category"]} не найдена.']
+            missing = [slug for slug in item['genre'] if slug not in genres]
+            if missing:
+                item_errors['genre'] = [
+                    f'Жанр {slug} не найден.' for slug in missing]
+            item['category'] = categories.get(item['category'])
+            item['genre'] = [genres.get(slug) for slug in item['genre']]
+            errors.append(item_errors)
+        return errors
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            titles = Title.objects.bulk_create(
+                Title(**{key: value for key, value in item.items()
+                         if key != 'genre'})
+                for item in validated_data
+            )
+            GenreTitle.objects.bulk_create(
+                GenreTitle(title=title, genre=genre)
+                for title, item in zip(titles, validated_data)
+                for genre in dict.fromkeys(item['genre'])
+            )
+        bump_catalog_version()
+        bump_title_index_version()
+        return titles
+
+
+class TitleBatchSerializer(TitleSerializer):
+    """
+    Элемент пакетного создания произведений.
+    Слаги категорий и жанров проверяются сразу для всего пакета.
+    """
+
+    category = serializers.SlugField()
+    genre = serializers.ListField(
+        child=serializers.SlugField(), allow_empty=False)
+
+    class Meta(TitleSerializer.Meta):
+        list_serializer_class = TitleBatchListSerializer
+
+
+class FacetParamsSerializer(serializers.Serializer):
+    """Измерения фасетов через запятую: genre, category, year."""
+
+    facets = serializers.CharField(default=','.join(FACETS))
+
+    def validate_facets(self, value):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(names) - set(FACETS)
+        if not names or unknown:
+            raise ValidationError(
+                f'Допустимые фасеты: {", ".join(FACETS)}.')
+        return list(dict.fromkeys(names))
+
+
+class ChangesParamsSerializer(serializers.Serializer):
+    """Параметры запроса ленты изменений."""
+
+    updated_since = serializers.DateTimeField(required=False)
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.CHANGE_FEED_MAX_SIZE,
+        default=settings.CHANGE_FEED_SIZE)
+
+
+class MultiplexSerializer(serializers.Serializer):
+    """Адреса GET-запросов пакетного чтения относительно /api/v1/."""
+
+    requests = serializers.ListField(
+        child=serializers.CharField(max_length=2000), min_length=1,
+        max_length=settings.API_MULTIPLEX_MAX_SIZE)
+
+
+class LeaderboardParamsSerializer(serializers.Serializer):
+    """Параметры запроса рейтинга лидеров."""
+
+    window = serializers.ChoiceField(
+        choices=list(settings.LEADERBOARD_PERIODS), default='all')
+    category = serializers.SlugField(required=False)
+    genre = serializers.SlugField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.LEADERBOARD_MAX_SIZE,
+        default=settings.LEADERBOARD_SIZE)
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    """Место произведения в рейтинге лидеров."""
+
+    score = serializers.SerializerMethodField()
+    reviews = serializers.IntegerField(source='review_count')
+    average = serializers.SerializerMethodField()
+    title = TitleViewSerializer()
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ('score', 'reviews', 'average', 'title')
+
+    def get_score(self, obj):
+        return round(obj.value, 3)
+
+    def get_average(self, obj):
+        return round(obj.score_sum / obj.review_count, 2)
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     """Сериализатор для отзывов."""
 
@@ -79,7 +229,7 @@ class ReviewSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = '__all__'
+        fields = ('id', 'author', 'text', 'pub_date', 'score', 'title')
         model = Review
         read_only_fields = ('title',)
 
@@ -92,16 +242,71 @@ class ReviewSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         if self.context['request'].method == 'POST':
-            title_id = (
-                self.context['request'].parser_context['kwargs']['title_id'])
-            author = self.context['request'].user
-            if author.reviews.filter(title_id=title_id).exists():
+            if self.context['view'].get_title().reviewed:
                 raise serializers.ValidationError(
                     'Вы уже оставили свой отзыв.'
                 )
         return data
 
 
+class ReviewBatchListSerializer(BatchListSerializer):
+    """Пакетное создание отзывов автора на разные произведения."""
+
+    def validate_batch(self, items):
+        title_ids = {item['title_id'] for item in items}
+        existing_titles = set(Title.objects.filter(
+            pk__in=title_ids).values_list('pk', flat=True))
+        reviewed = set(self.context['request'].user.reviews.filter(
+            title_id__in=title_ids).values_list('title_id', flat=True))
+        errors = []
+        for item in items:
+            title_id = item['title_id']
+            if title_id not in existing_titles:
+                errors.append({'title': [
+                    f'Произведение {title_id} не найдено.']})
+            elif title_id in reviewed:
+                errors.append({'title': ['Вы уже оставили свой отзыв.']})
+            else:
+                errors.append({})
+            reviewed.add(title_id)
+        return errors
+
+    def create(self, validated_data):
+        # events импортирует сериализаторы этого модуля.
+        from .events import publish_created
+
+        try:
+            with transaction.atomic():
+                reviews = Review.objects.bulk_create(
+                    Review(**item) for item in validated_data)
+                # bulk_create не отправляет post_save: события
+                # рассылаются здесь, после фиксации транзакции.
+                for review in reviews:
+                    publish_created(review)
+                return reviews
+        except IntegrityError:
+            # Между проверкой и записью параллельный запрос мог оставить
+            # отзыв или удалить произведение: пакет проверяется заново.
+            errors = self.validate_batch(validated_data)
+            if any(errors):
+                raise ValidationError(errors)
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Не удалось сохранить отзывы, повторите запрос.']})
+
+
+class ReviewBatchSerializer(ReviewSerializer):
+    """Элемент пакетного создания отзывов."""
+
+    title = serializers.IntegerField(source='title_id')
+
+    class Meta(ReviewSerializer.Meta):
+        read_only_fields = ()
+        list_serializer_class = ReviewBatchListSerializer
+
+    def validate(self, data):
+        return data
+
+
 class SignUpSerializer(serializers.ModelSerializer):
     """Сериализатор для регистрации новых пользователей."""
 
@@ -200,6 +405,7 @@ class TokenSerializer(serializers.ModelSerializer):
         if default_token_generator.check_token(
                 user, confirmation_code) is False:
             raise ValidationError('Неверный код подтверждения')
+        value['user'] = user
         return value
 
 
@@ -213,6 +419,6 @@ class CommentSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = '__all__'
+        fields = ('id', 'author', 'review', 'text', 'pub_date')
         model = Comment
         read_only_fields = ('review',)
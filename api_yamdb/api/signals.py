@@ -0,0 +1,65 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, reviews_bulk_changed)
+from users.models import User
+from .authentication import invalidate_cached_user
+from .cache import bump_catalog_version
+from .events import publish_created
+from .title_index import bump_title_index_version
+
+CATALOG_MODELS = (Title, Genre, Category, GenreTitle, Review)
+
+# Модели, по которым строится индекс фильтров произведений.
+TITLE_INDEX_MODELS = (Title, Genre, Category, GenreTitle)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_catalog_version_on_write(sender, **kwargs):
+    """Любая запись в каталог делает закэшированные ответы устаревшими."""
+
+    if sender in CATALOG_MODELS:
+        bump_catalog_version()
+    if sender in TITLE_INDEX_MODELS:
+        bump_title_index_version()
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+@receiver(reviews_bulk_changed)
+def bump_catalog_version_on_bulk_write(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_index_version_on_genres_write(sender, **kwargs):
+    bump_title_index_version()
+
+
+@receiver(reviews_bulk_changed)
+def bump_title_index_version_on_bulk_load(sender, title_ids, **kwargs):
+    """
+    Без title_ids данные загружены в обход API (import_db,
+    generate_dataset): могли измениться и произведения с жанрами.
+    """
+
+    if title_ids is None:
+        bump_title_index_version()
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def publish_created_event(sender, instance, created, raw, **kwargs):
+    """Новые отзывы и комментарии рассылаются подписчикам SSE."""
+
+    if created and not raw:
+        publish_created(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user_on_write(sender, instance, **kwargs):
+    """Смена роли или блокировка пользователя действует сразу."""
+
+    invalidate_cached_user(instance.pk)
@@ -0,0 +1,218 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from reviews.models import GenreTitle, Title
+from .cache import bump_version, get_version, version_reads
+
+TITLE_INDEX_VERSION_KEY = 'api:titles:index:version'
+
+# Фильтры списка произведений, которые умеет обработать индекс,
+# и остальные допустимые с ними параметры. С любым другим параметром
+# (search, ordering, cursor) список строится обычным запросом.
+INDEX_FILTERS = ('category', 'genre', 'year')
+INDEX_PARAMS = INDEX_FILTERS + ('limit', 'offset', 'format')
+
+# Количество единичных битов в каждом значении байта.
+POPCOUNT = bytes(bin(value).count('1') for value in range(256))
+
+
+def get_title_index_version():
+    return get_version(TITLE_INDEX_VERSION_KEY)
+
+
+def bump_title_index_version():
+    """Произведения, их категории или жанры изменились."""
+
+    bump_version(TITLE_INDEX_VERSION_KEY)
+
+
+def to_bits(ids):
+    """Битовая карта: бит с номером id установлен для каждого id из ids."""
+
+    ids = list(ids)
+    if not ids:
+        return 0
+    data = bytearray(max(ids) // 8 + 1)
+    for pk in ids:
+        data[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(data, 'little')
+
+
+def count_bits(bits):
+    return bin(bits).count('1')
+
+
+def slice_bits(bits, start, stop=None):
+    """
+    Номера установленных битов с start-го по stop-й (не включая)
+    в порядке возрастания. Байты до начала среза пропускаются
+    по таблице POPCOUNT, не перебирая биты.
+    """
+
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    ids = []
+    seen = 0
+    for index, byte in enumerate(data):
+        if not byte:
+            continue
+        if seen + POPCOUNT[byte] <= start:
+            seen += POPCOUNT[byte]
+            continue
+        for bit in range(8):
+            if byte >> bit & 1:
+                if seen >= start:
+                    ids.append(index * 8 + bit)
+                seen += 1
+                if stop is not None and seen >= stop:
+                    return ids
+    return ids
+
+
+class TitleBitmapIndex:
+    """
+    Битовые карты идентификаторов произведений по слагам категорий
+    и жанров и по годам. Одна карта занимает (максимальный id) / 8 байт.
+    Индекс свой у каждого воркера и перестраивается при первом запросе
+    после смены поколения TITLE_INDEX_VERSION_KEY: его меняют запись
+    через API и загрузка данных командами import_db и generate_dataset.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.built_at = None
+        self.state = None
+        self.lock = threading.Lock()
+
+    def build(self):
+        categories = defaultdict(list)
+        years = defaultdict(list)
+        ids = []
+        for pk, category, year in Title.objects.order_by().values_list(
+                'id', 'category__slug', 'year').iterator():
+            ids.append(pk)
+            years[year].append(pk)
+            if category is not None:
+                categories[category].append(pk)
+        genres = defaultdict(list)
+        for pk, genre in GenreTitle.objects.order_by().values_list(
+                'title_id', 'genre__slug').iterator():
+            genres[genre].append(pk)
+        # Карты заменяются одним присваиванием: потоки, читающие индекс
+        # во время перестройки, видят целиком прежнее или новое состояние.
+        self.state = to_bits(ids), {
+            name: {key: to_bits(members) for key, members in maps.items()}
+            for name, maps in (('category', categories), ('genre', genres),
+                               ('year', years))
+        }
+
+    def is_fresh(self, version):
+        return self.version == version and (
+            time.monotonic() - self.built_at < settings.API_CACHE_TIMEOUT)
+
+    def refresh(self, blocking=True):
+        """
+        Перестраивает устаревший индекс. Возвращает False, если индекс
+        устарел, а перестроить его сейчас нельзя: этим занят другой поток.
+        """
+
+        version = get_title_index_version()
+        if self.is_fresh(version):
+            return True
+        if not self.lock.acquire(blocking):
+            return False
+        try:
+            if not self.is_fresh(version):
+                with version_reads(TITLE_INDEX_VERSION_KEY):
+                    self.build()
+                self.version = version
+                self.built_at = time.monotonic()
+        finally:
+            self.lock.release()
+        return True
+
+    def match(self, values):
+        """
+        Карта произведений, подходящих под фильтры values: внутри
+        фильтра значения объединяются, фильтры между собой пересекаются.
+        """
+
+        bits, maps = self.state
+        for name, keys in values.items():
+            selected = 0
+            for key in keys:
+                selected |= maps[name].get(key, 0)
+            bits &= selected
+        return bits
+
+
+title_index = TitleBitmapIndex()
+
+
+class IndexedTitles:
+    """
+    Произведения из карты bits в порядке id для пагинации. Количество
+    и срезы считаются по карте, из БД queryset читает только срез.
+    """
+
+    def __init__(self, queryset, bits):
+        self.queryset = queryset
+        self.bits = bits
+        self.total = None
+
+    def count(self):
+        if self.total is None:
+            self.total = count_bits(self.bits)
+        return self.total
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step is not None:
+            raise TypeError('Поддерживаются только срезы без шага.')
+        ids = slice_bits(self.bits, item.start or 0, item.stop)
+        if not ids:
+            return []
+        return list(self.queryset.filter(pk__in=ids).order_by('id'))
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def get_index_values(request, filterset):
+    """
+    Значения фильтров INDEX_FILTERS из запроса или None, если запрос
+    нельзя обработать индексом.
+    """
+
+    params = {name for name, value in request.query_params.items() if value}
+    if not params <= set(INDEX_PARAMS) or not filterset.is_valid():
+        return None
+    values = {}
+    for name in INDEX_FILTERS:
+        value = filterset.form.cleaned_data.get(name)
+        if value in (None, '', []):
+            continue
+        if name == 'year':
+            value = [int(value)] if value == int(value) else []
+        values[name] = value
+    return values
+
+
+def filter_titles(request, filterset_class, queryset):
+    """
+    Произведения по фильтрам запроса из индекса или None, если индекс
+    выключен, не подходит для запроса или перестраивается.
+    """
+
+    if not settings.TITLE_BITMAP_INDEX:
+        return None
+    filterset = filterset_class(
+        request.query_params, queryset=queryset, request=request)
+    values = get_index_values(request, filterset)
+    if values is None or not title_index.refresh(blocking=False):
+        return None
+    return IndexedTitles(queryset, title_index.match(values))
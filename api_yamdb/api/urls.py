@@ -1,11 +1,17 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView, TokenVerifyView)
 
 from api.views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                       ReviewViewSet, TitleViewSet, UsersViewSet)
+                       ReviewBatchViewSet, ReviewViewSet, TitleViewSet,
+                       UsersViewSet)
+from api_yamdb.replicas import read_only
 from . import views
+from .async_views import async_urls
+from .changes import DATASETS
+from .events import events_view
 
 router_v1 = DefaultRouter()
 
@@ -13,20 +19,37 @@ router_v1.register('titles', TitleViewSet)
 router_v1.register('categories', CategoryViewSet)
 router_v1.register('genres', GenreViewSet)
 router_v1.register('users', UsersViewSet)
+router_v1.register('reviews/batch', ReviewBatchViewSet,
+                   basename='reviews-batch')
 router_v1.register(r'titles/(?P<title_id>\d+)/reviews',
                    ReviewViewSet, basename='reviews')
 router_v1.register(
     r'titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)/comments',
     CommentViewSet, basename='comments')
 
+v1_urls = router_v1.urls
+if settings.ASYNC_READ_VIEWS:
+    v1_urls = async_urls(v1_urls)
+
 auth_urls = [
     path('signup/', views.signup),
     path('token/', views.token),
 
 ]
 
+# Потоки событий стоят раньше роутера: иначе 'events' совпадет
+# с адресом отдельного отзыва.
+event_urls = [
+    re_path(r'^titles/(?P<title_id>\d+)/reviews/events/$',
+            events_view, name='review-events'),
+    re_path(r'^titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)/'
+            r'comments/events/$',
+            events_view, name='comment-events'),
+]
+
 urlpatterns = [
-    path('v1/', include(router_v1.urls)),
+    path('v1/', include(event_urls)),
+    path('v1/', include(v1_urls)),
     path(
         'token/',
         TokenObtainPairView.as_view(),
@@ -40,4 +63,14 @@ urlpatterns = [
         TokenVerifyView.as_view(),
         name='token_verify'),
     path('v1/auth/', include(auth_urls)),
+    path('v1/batch/', read_only(views.MultiplexView.as_view()),
+         name='batch'),
+    re_path(
+        r'^v1/export/(?P<dataset>titles|reviews)\.(?P<extension>ndjson|csv)$',
+        views.ExportView.as_view(),
+        name='export'),
+    re_path(
+        r'^v1/changes/(?P<dataset>{})/$'.format('|'.join(DATASETS)),
+        views.ChangesView.as_view(),
+        name='changes'),
 ]
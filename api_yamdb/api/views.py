@@ -1,30 +1,41 @@
-from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, mixins, filters, status
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from django.core.mail import send_mail
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.generics import get_object_or_404
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.db.models import Avg
+from django.db.models import Exists, OuterRef, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils.http import urlencode
 
 
+from users.outbox import enqueue_mail
 from reviews.models import (
     Title,
     Category,
     Genre,
+    LeaderboardEntry,
     User,
     Review)
+from reviews.stats import SCORES, summarize_scores
 from .serializers import (
     AdminCreationSerializer,
+    TitleBatchSerializer,
     TitleSerializer,
     TitleViewSerializer,
     CategorySerializer,
+    ChangesParamsSerializer,
+    FacetParamsSerializer,
     GenreSerializer,
+    LeaderboardEntrySerializer,
+    LeaderboardParamsSerializer,
     MeSerializer,
+    MultiplexSerializer,
+    ReviewBatchSerializer,
     ReviewSerializer,
     SignUpSerializer,
     TokenSerializer,
@@ -35,10 +46,21 @@ from .permissions import (
     AdminOrModeratorOrAuthor,
     UserIsAuthor)
 
+from .changes import get_changes, get_start_position
+from .export import CONTENT_TYPES, EXPORT_STREAM, export
+from .facets import count_facets
+from .multiplex import multiplex
+from .resolvers import ResolvedObjectMixin, resolve_object
+from .cache import (CachedListModelMixin, CachedResponseMixin,
+                    CachedRetrieveModelMixin, get_catalog_version)
+from .conditional import (ConditionalListModelMixin,
+                          ConditionalRetrieveModelMixin)
 from .filters import TitleFilter
+from .pagination import LimitOffsetOrCursorPagination
+from .title_index import filter_titles
 
 
-class CreateListDestroyViewSet(mixins.ListModelMixin,
+class CreateListDestroyViewSet(CachedListModelMixin,
                                mixins.CreateModelMixin,
                                mixins.DestroyModelMixin,
                                viewsets.GenericViewSet):
@@ -52,23 +74,130 @@ class CreateListDestroyViewSet(mixins.ListModelMixin,
     pass
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalListModelMixin, ConditionalRetrieveModelMixin,
+                   CachedListModelMixin, CachedRetrieveModelMixin,
+                   viewsets.ModelViewSet):
     """
     Получать произведения доступно всем.
     Создавать и редактировать доступно только администратору.
     """
-    queryset = Title.objects.annotate(rating=Avg('reviews__score'))
+    queryset = Title.objects.select_related(
+        'category').prefetch_related('genre').defer('search_vector')
     serializer_class = TitleSerializer
-    pagination_class = LimitOffsetPagination
-    filter_backends = (DjangoFilterBackend,)
+    pagination_class = LimitOffsetOrCursorPagination
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = TitleFilter
+    ordering_fields = ('rating', 'name', 'year')
     permission_classes = [AdminOrReadOnly]
+    cache_query_params = CachedResponseMixin.cache_query_params + ('facets',)
 
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
             return TitleViewSerializer
+        if self.action == 'batch':
+            return TitleBatchSerializer
         return TitleSerializer
 
+    def filter_queryset(self, queryset):
+        """
+        Список с фильтрами category, genre и year отбирается по индексу
+        в памяти воркера, если он включен (TITLE_BITMAP_INDEX).
+        """
+
+        if self.action == 'list':
+            titles = filter_titles(
+                self.request, self.filterset_class, queryset)
+            if titles is not None:
+                return titles
+        return super().filter_queryset(queryset)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Создает список произведений одним запросом и одной транзакцией."""
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        titles = serializer.save()
+        prefetch_related_objects(titles, 'genre')
+        return Response(TitleSerializer(titles, many=True).data,
+                        status=status.HTTP_201_CREATED)
+
+    @action(detail=False)
+    def facets(self, request):
+        """
+        Количество произведений по жанрам, категориям и годам
+        для текущих фильтров списка. Ответ кэшируется до изменения каталога.
+        """
+
+        return self.get_cached_response(self.count_facets, request)
+
+    def count_facets(self, request):
+        params = FacetParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(count_facets(
+            self.filterset_class, request, params.validated_data['facets']))
+
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        """
+        Количество, среднее, медиана и распределение оценок произведения
+        из таблицы TitleScore: не больше одиннадцати строк на произведение.
+        """
+
+        title = get_object_or_404(Title.objects.only('id'), pk=pk)
+        counts = dict(title.scores.values_list('score', 'count'))
+        return Response({
+            **summarize_scores(counts),
+            'histogram': [
+                {'score': score, 'count': counts.get(score, 0)}
+                for score in SCORES
+            ],
+        })
+
+    @action(detail=False)
+    def top(self, request):
+        """
+        Первые limit мест рейтинга лидеров за период window, в категории
+        и жанре, если они указаны. Места читаются по индексу рейтинга,
+        без агрегации отзывов.
+        """
+
+        params = LeaderboardParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+        scope = {}
+        for name, model in (('category', Category), ('genre', Genre)):
+            if name in params:
+                scope[f'{name}_id'] = model.objects.filter(
+                    slug=params[name]).values_list('id', flat=True).first()
+        entries = []
+        if None not in scope.values():
+            entries = LeaderboardEntry.objects.filter(
+                period=params['window'],
+                category_id=scope.get('category_id'),
+                genre_id=scope.get('genre_id'),
+            ).select_related('title__category').prefetch_related(
+                'title__genre'
+            ).defer('title__search_vector').order_by(
+                '-value', 'title_id')[:params['limit']]
+        results = LeaderboardEntrySerializer(entries, many=True).data
+        return Response({
+            'window': params['window'],
+            'category': params.get('category'),
+            'genre': params.get('genre'),
+            'results': [{'rank': rank, **entry}
+                        for rank, entry in enumerate(results, 1)],
+        })
+
+    def get_validator(self):
+        if self.action == 'list':
+            return get_catalog_version()
+        try:
+            return Title.objects.filter(pk=self.kwargs['pk']).values_list(
+                'updated_at', flat=True).first()
+        except (TypeError, ValueError):
+            return None
+
 
 class CategoryViewSet(CreateListDestroyViewSet):
     """
@@ -78,7 +207,7 @@ class CategoryViewSet(CreateListDestroyViewSet):
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = LimitOffsetOrCursorPagination
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
@@ -97,7 +226,7 @@ class GenreViewSet(CreateListDestroyViewSet):
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = LimitOffsetOrCursorPagination
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
@@ -108,7 +237,8 @@ class GenreViewSet(CreateListDestroyViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ResolvedObjectMixin, ConditionalListModelMixin,
+                    ConditionalRetrieveModelMixin, viewsets.ModelViewSet):
     """
     Получать отзывы доступно всем.
     Добавлять отзывы доступно аутентифицированным пользователям.
@@ -117,19 +247,63 @@ class ReviewViewSet(viewsets.ModelViewSet):
 
     serializer_class = ReviewSerializer
     permission_classes = [AdminOrModeratorOrAuthor]
+    object_lookup = {'pk': 'pk', 'title_id': 'title_id'}
+
+    def get_title(self):
+        """
+        Произведение из адреса запроса. При создании отзыва вместе с ним
+        загружается признак того, что автор уже оставил отзыв.
+        """
+
+        queryset = Title.objects.all()
+        user = self.request.user
+        if self.request.method == 'POST' and user.is_authenticated:
+            queryset = queryset.annotate(reviewed=Exists(
+                Review.objects.filter(title=OuterRef('pk'), author=user)))
+        return resolve_object(
+            self.request, queryset, pk=self.kwargs.get('title_id'))
 
     def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        return title.reviews.all().order_by('id')
+        if self.action == 'list':
+            self.get_title()
+        return Review.objects.filter(
+            title_id=self.kwargs.get('title_id')
+        ).select_related('author').order_by('id')
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_title())
 
+    def get_validator(self):
+        if self.action == 'list':
+            return self.get_title().updated_at
+        try:
+            return Review.objects.filter(
+                pk=self.kwargs['pk'], title_id=self.kwargs['title_id']
+            ).values_list('updated_at', flat=True).first()
+        except (TypeError, ValueError):
+            return None
 
-class CommentViewSet(viewsets.ModelViewSet):
+
+class ReviewBatchViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
+    """
+    Пакетное добавление отзывов текущего пользователя
+    на разные произведения одним запросом.
+    """
+
+    serializer_class = ReviewBatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(author=self.request.user)
+
+
+class CommentViewSet(ResolvedObjectMixin, ConditionalListModelMixin,
+                     ConditionalRetrieveModelMixin,
+                     viewsets.ModelViewSet):
     """
     Получать комментарии доступно всем.
     Добавлять отзывы доступно аутентифицированным пользователям.
@@ -138,18 +312,88 @@ class CommentViewSet(viewsets.ModelViewSet):
 
     serializer_class = CommentSerializer
     permission_classes = [AdminOrModeratorOrAuthor]
+    object_lookup = {'pk': 'pk', 'review_id': 'review_id'}
+
+    def get_review(self):
+        return resolve_object(
+            self.request, Review.objects.select_related('author'),
+            pk=self.kwargs.get('review_id'),
+            title_id=self.kwargs.get('title_id'))
 
     def get_queryset(self):
-        review_id = self.kwargs.get('review_id')
-        title_id = self.kwargs.get('title_id')
-        review = get_object_or_404(Review, id=review_id, title_id=title_id)
-        return review.comments.all().order_by('id')
+        review = self.get_review()
+        return review.comments.select_related('author').order_by('id')
 
     def perform_create(self, serializer):
-        review_id = self.kwargs.get('review_id')
-        title_id = self.kwargs.get('title_id')
-        review = get_object_or_404(Review, id=review_id, title_id=title_id)
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_review())
+
+    def get_validator(self):
+        return self.get_review().updated_at
+
+
+class ExportView(APIView):
+    """
+    Полная выгрузка произведений или отзывов в NDJSON или CSV.
+    Ответ передается потоком, поэтому размер таблицы не ограничен.
+    Доступно только администратору.
+    """
+
+    permission_classes = [AdminOnly]
+
+    def get(self, request, dataset, extension):
+        content = export(dataset, extension)
+        scope = getattr(request, 'scope', None)
+        if scope is not None:
+            # Под ASGI выгрузку отдает export_application в своем потоке.
+            scope[EXPORT_STREAM] = content
+            content = ()
+        response = StreamingHttpResponse(
+            content, content_type=CONTENT_TYPES[extension])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{dataset}.{extension}"')
+        return response
+
+
+class ChangesView(APIView):
+    """
+    Лента изменений произведений, отзывов, комментариев, жанров
+    или категорий: объекты, измененные после updated_since или курсора
+    прошлого ответа, и удаленные объекты. Страница читается диапазоном
+    индекса (updated_at, id), поэтому синхронизация стоит столько,
+    сколько изменений накопилось. Доступно только администратору.
+    """
+
+    permission_classes = [AdminOnly]
+
+    def get(self, request, dataset):
+        params = ChangesParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+        position = get_start_position(
+            params.get('cursor'), params.get('updated_since'))
+        data = get_changes(dataset, position, params['limit'])
+        data['next'] = request.build_absolute_uri('{}?{}'.format(
+            request.path,
+            urlencode({'cursor': data['cursor'], 'limit': params['limit']})
+        )) if data['more'] else None
+        return Response(data)
+
+
+class MultiplexView(APIView):
+    """
+    Пакетное чтение: GET-запросы к эндпоинтам API выполняются в одном
+    запросе клиента, без повторной аутентификации и middleware.
+    Для каждого запроса в ответе свои статус и данные; разрешения
+    проверяются так же, как при отдельном запросе.
+    """
+
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = MultiplexSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            multiplex(request, serializer.validated_data['requests']))
 
 
 class UsersViewSet(viewsets.ModelViewSet):
@@ -166,17 +410,14 @@ class UsersViewSet(viewsets.ModelViewSet):
     lookup_field = 'username'
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
-    pagination_class = LimitOffsetPagination
+    pagination_class = LimitOffsetOrCursorPagination
     permission_classes = [AdminOnly]
     http_method_names = ['get', 'post', 'patch', 'delete']
 
     @action(detail=False, methods=['get', 'patch', 'post'],
             permission_classes=[UserIsAuthor, IsAuthenticated])
     def me(self, request):
-        user = get_object_or_404(
-            User,
-            username=self.request.user.username
-        )
+        user = request.user
         if request.method == 'GET':
             serializer = self.get_serializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -209,12 +450,11 @@ def signup(request):
         username=request.data.get('username'),
         email=request.data.get('email'))
     confirmation_code = default_token_generator.make_token(user)
-    send_mail(
+    enqueue_mail(
         f'Привет, {str(user.username)}! Твой код подтверждения ниже!',
         confirmation_code,
         settings.EMAIL_FOR_AUTH_LETTERS,
-        [request.data['email']],
-        fail_silently=True)
+        [request.data['email']])
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -243,11 +483,6 @@ def token(request):
 
     serializer = TokenSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    user = get_object_or_404(User, username=request.data['username'])
-    confirmation_code = request.data['confirmation_code']
-    if default_token_generator.check_token(user, confirmation_code):
-        token = tokens_for_user(user)
-        response = {'token': str(token['access'])}
-        return Response(response, status=status.HTTP_200_OK)
-    return Response(serializer.errors,
-                    status=status.HTTP_400_BAD_REQUEST)
+    token = tokens_for_user(serializer.validated_data['user'])
+    response = {'token': str(token['access'])}
+    return Response(response, status=status.HTTP_200_OK)
@@ -0,0 +1,25 @@
+"""
+ASGI config for YaMDb project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Under ASGI the hottest read-only routes are served by async views
+(see api/async_views.py), SSE event streams by events_application
+(see api/events.py) and exports by export_application (see api/export.py).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
+
+django_application = get_asgi_application()
+
+from api.events import events_application  # noqa: E402
+from api.export import export_application  # noqa: E402
+
+application = events_application(export_application(django_application))
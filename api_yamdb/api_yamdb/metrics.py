@@ -0,0 +1,271 @@
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+# Верхние границы корзин гистограммы длительности запроса, сек.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Показатели очереди писем (users/outbox.py get_outbox_metrics).
+OUTBOX_METRICS = (
+    ('yamdb_outbox_pending', 'pending', 'Письма в очереди на отправку.'),
+    ('yamdb_outbox_failed', 'failed',
+     'Письма, исчерпавшие попытки отправки.'),
+    ('yamdb_outbox_oldest_pending_age_seconds', 'oldest_pending_age',
+     'Возраст самого старого письма в очереди.'),
+    ('yamdb_outbox_sent_last_hour', 'sent',
+     'Письма, отправленные за последний час.'),
+    ('yamdb_outbox_latency_avg_seconds', 'latency_avg',
+     'Средняя задержка доставки за последний час.'),
+    ('yamdb_outbox_latency_max_seconds', 'latency_max',
+     'Наибольшая задержка доставки за последний час.'),
+)
+
+# Счетчик SQL-запросов текущего HTTP-запроса. Контекст копируется
+# в потоки sync_to_async и пула асинхронных представлений, поэтому
+# запросы считаются в том потоке, где на самом деле выполняются.
+request_sql = ContextVar('request_sql', default=None)
+
+
+class Registry:
+    """
+    Метрики запросов одного процесса (воркера gunicorn).
+    Каждый воркер считает свои метрики в памяти и периодически
+    сбрасывает их в файл METRICS_DIR/<pid>.json; эндпоинт метрик
+    складывает файлы всех воркеров. Блокировка берется только внутри
+    процесса и почти никогда не конкурирует.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.flushed_at = 0.0
+
+    def observe(self, route, method, duration, queries, sql_time):
+        key = f'{route}|{method}'
+        with self.lock:
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = {
+                    'count': 0, 'duration': 0.0, 'queries': 0,
+                    'sql_time': 0.0, 'buckets': [0] * (len(BUCKETS) + 1),
+                }
+            stats['count'] += 1
+            stats['duration'] += duration
+            stats['queries'] += queries
+            stats['sql_time'] += sql_time
+            stats['buckets'][bisect_left(BUCKETS, duration)] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {key: {**stats, 'buckets': list(stats['buckets'])}
+                    for key, stats in self.routes.items()}
+
+    def get_path(self, pid=None):
+        return os.path.join(
+            settings.METRICS_DIR, f'{pid or os.getpid()}.json')
+
+    def flush(self, force=False):
+        """Сбрасывает метрики процесса в файл не чаще интервала."""
+
+        now = time.monotonic()
+        if not force and now - self.flushed_at < (
+                settings.METRICS_FLUSH_INTERVAL):
+            return
+        self.flushed_at = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = self.get_path()
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as metrics_file:
+            json.dump(self.snapshot(), metrics_file)
+        os.replace(temporary, path)
+
+    def collect(self):
+        """
+        Метрики всех воркеров. Для текущего процесса берутся данные
+        из памяти, для остальных — из последнего сброшенного файла.
+        """
+
+        merged = {}
+        snapshots = [self.snapshot()]
+        own_file = os.path.basename(self.get_path())
+        if os.path.isdir(settings.METRICS_DIR):
+            for name in os.listdir(settings.METRICS_DIR):
+                if not name.endswith('.json') or name == own_file:
+                    continue
+                try:
+                    with open(os.path.join(settings.METRICS_DIR, name),
+                              encoding='utf-8') as metrics_file:
+                        snapshots.append(json.load(metrics_file))
+                except (OSError, ValueError):
+                    continue
+        for snapshot in snapshots:
+            for key, stats in snapshot.items():
+                total = merged.setdefault(key, {
+                    'count': 0, 'duration': 0.0, 'queries': 0,
+                    'sql_time': 0.0, 'buckets': [0] * (len(BUCKETS) + 1),
+                })
+                for name in ('count', 'duration', 'queries', 'sql_time'):
+                    total[name] += stats[name]
+                total['buckets'] = [
+                    left + right
+                    for left, right in zip(total['buckets'], stats['buckets'])
+                ]
+        return merged
+
+
+registry = Registry()
+
+
+@atexit.register
+def flush_on_exit():
+    if registry.routes:
+        registry.flush(force=True)
+
+
+def render(merged):
+    """Метрики в текстовом формате Prometheus."""
+
+    lines = []
+    metrics = (
+        ('yamdb_http_requests_total', 'counter',
+         'Количество запросов.', 'count'),
+        ('yamdb_db_queries_total', 'counter',
+         'Количество SQL-запросов.', 'queries'),
+        ('yamdb_db_query_duration_seconds_total', 'counter',
+         'Суммарное время SQL-запросов.', 'sql_time'),
+    )
+    items = sorted(
+        (key.split('|'), stats) for key, stats in merged.items())
+    for name, kind, help_text, field in metrics:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (route, method), stats in items:
+            lines.append(
+                f'{name}{{route="{route}",method="{method}"}} '
+                f'{stats[field]}')
+    name = 'yamdb_http_request_duration_seconds'
+    lines.append(f'# HELP {name} Длительность обработки запроса.')
+    lines.append(f'# TYPE {name} histogram')
+    for (route, method), stats in items:
+        labels = f'route="{route}",method="{method}"'
+        cumulative = 0
+        for edge, count in zip((*BUCKETS, '+Inf'), stats['buckets']):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{edge}"}} '
+                         f'{cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {stats["duration"]}')
+        lines.append(f'{name}_count{{{labels}}} {stats["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def render_outbox(values):
+    """Показатели очереди писем в текстовом формате Prometheus."""
+
+    lines = []
+    for name, field, help_text in OUTBOX_METRICS:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {values[field]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Внутренний эндпоинт метрик; снаружи закрыт в nginx. Показатели
+    очереди писем считаются запросами к БД при каждом опросе.
+    """
+
+    from users.outbox import get_outbox_metrics
+
+    return HttpResponse(
+        render(registry.collect()) + render_outbox(get_outbox_metrics()),
+        content_type=CONTENT_TYPE)
+
+
+def count_query(execute, sql_text, params, many, context):
+    sql = request_sql.get()
+    if sql is None:
+        return execute(sql_text, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql_text, params, many, context)
+    finally:
+        sql['queries'] += 1
+        sql['time'] += time.perf_counter() - started
+
+
+def install_counter(connection, **kwargs):
+    """
+    Подключает подсчет запросов к соединению один раз. Обертка ставится
+    первой, чтобы не мешать execute_wrapper(), который снимает последнюю.
+    """
+
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_query)
+
+
+connection_created.connect(install_counter)
+
+
+class MetricsMiddleware:
+    """
+    Считает для каждого маршрута (имя из urls.py, например title-list)
+    количество запросов, гистограмму длительности, число и время
+    SQL-запросов. Работает и под WSGI, и под ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django понимает, что __call__ возвращает корутину.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        for connection in connections.all():
+            install_counter(connection)
+        sql = {'queries': 0, 'time': 0.0}
+        token = request_sql.set(sql)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_sql.reset(token)
+        self.observe(request, started, sql)
+        return response
+
+    async def acall(self, request):
+        sql = {'queries': 0, 'time': 0.0}
+        token = request_sql.set(sql)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_sql.reset(token)
+        self.observe(request, started, sql)
+        return response
+
+    def observe(self, request, started, sql):
+        duration = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match is not None else 'unmatched'
+        registry.observe(route, request.method, duration,
+                         sql['queries'], sql['time'])
+        registry.flush()
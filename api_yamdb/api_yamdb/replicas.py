@@ -0,0 +1,210 @@
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from django.utils.decorators import sync_and_async_middleware
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Отметка в общем кэше: пользователь недавно что-то записал.
+USER_PIN_KEY = 'replicas:primary:{}'
+
+# Выбор БД для чтения в текущем запросе: None — только основная БД,
+# словарь — можно читать с реплики; реплика выбирается при первом
+# чтении и запоминается в словаре до конца запроса.
+read_state = ContextVar('read_state', default=None)
+
+# Отставание реплики PostgreSQL, сек. На основной БД и на реплике,
+# которая применила весь полученный WAL, равно нулю.
+POSTGRESQL_LAG_SQL = """
+    SELECT COALESCE(CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END, 0)
+"""
+
+
+def check_replica(alias):
+    """Реплика доступна и отстает не больше REPLICA_MAX_LAG секунд."""
+
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor != 'postgresql':
+                cursor.execute('SELECT 1')
+                return True
+            cursor.execute(POSTGRESQL_LAG_SQL)
+            return cursor.fetchone()[0] <= settings.REPLICA_MAX_LAG
+    except DatabaseError:
+        connection.close()
+        return False
+
+
+class ReplicaHealth:
+    """
+    Состояние реплик в процессе. Каждая реплика проверяется не чаще
+    раза в REPLICA_HEALTH_INTERVAL секунд, в промежутках используется
+    результат последней проверки.
+    """
+
+    def __init__(self):
+        self.checked = {}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        checked_at, healthy = self.checked.get(alias, (None, False))
+        if checked_at is None or (
+                now - checked_at >= settings.REPLICA_HEALTH_INTERVAL):
+            healthy = check_replica(alias)
+            self.checked[alias] = (now, healthy)
+        return healthy
+
+    def choose(self):
+        """Случайная исправная реплика или None, если таких нет."""
+
+        healthy = [alias for alias in settings.REPLICA_DATABASES
+                   if self.is_healthy(alias)]
+        return random.choice(healthy) if healthy else None
+
+
+health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """
+    Чтение в безопасных запросах к API идет на реплики, все остальное —
+    на основную БД. Какие запросы можно читать с реплики, решает
+    replica_middleware.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = read_state.get()
+        if state is None:
+            return None
+        if 'alias' not in state:
+            state['alias'] = health.choose()
+        return state['alias']
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *settings.REPLICA_DATABASES}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+@contextmanager
+def primary_reads():
+    """Чтение внутри блока идет с основной БД."""
+
+    token = read_state.set(None)
+    try:
+        yield
+    finally:
+        read_state.reset(token)
+
+
+def is_api_request(request):
+    return request.path.startswith('/api/')
+
+
+def get_read_state(request):
+    """
+    С реплики читаются безопасные запросы к API, кроме клиентов,
+    которые недавно что-то записали: они должны видеть свои изменения.
+    """
+
+    if (settings.REPLICA_DATABASES and is_api_request(request)
+            and request.method in SAFE_METHODS
+            and settings.REPLICA_STICKY_COOKIE not in request.COOKIES):
+        return {}
+    return None
+
+
+def read_only(view):
+    """
+    Представление только читает данные, хотя принимает POST:
+    запрос к нему не закрепляет клиента за основной БД.
+    """
+
+    view.read_only = True
+    return view
+
+
+def is_read_only(request):
+    match = getattr(request, 'resolver_match', None)
+    return match is not None and getattr(match.func, 'read_only', False)
+
+
+def get_user_pin_key(user_id):
+    return USER_PIN_KEY.format(user_id)
+
+
+def pin_user_reads(user):
+    """
+    Пользователь, который недавно что-то записал, читает с основной БД
+    до конца запроса. Вызывается, когда пользователь запроса известен:
+    клиенты с токеном обычно не хранят cookie REPLICA_STICKY_COOKIE.
+    """
+
+    state = read_state.get()
+    if state is None or not user.is_authenticated:
+        return
+    if caches[settings.API_CACHE_ALIAS].get(
+            get_user_pin_key(user.pk)) is not None:
+        state['alias'] = None
+
+
+def pin_to_primary(request, response):
+    """
+    После записи клиент REPLICA_STICKY_SECONDS читает с основной БД:
+    по cookie, а пользователь с токеном — по отметке в общем кэше.
+    """
+
+    if (settings.REPLICA_DATABASES and is_api_request(request)
+            and request.method not in SAFE_METHODS
+            and not is_read_only(request)
+            and response.status_code < 400):
+        response.set_cookie(
+            settings.REPLICA_STICKY_COOKIE, '1',
+            max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+            samesite='Lax')
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            caches[settings.API_CACHE_ALIAS].set(
+                get_user_pin_key(user.pk), True,
+                settings.REPLICA_STICKY_SECONDS)
+    return response
+
+
+@sync_and_async_middleware
+def replica_middleware(get_response):
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = read_state.set(get_read_state(request))
+            try:
+                response = await get_response(request)
+            finally:
+                read_state.reset(token)
+            if request.method in SAFE_METHODS:
+                return response
+            # Пользователь сессии загружается из БД, а отметка
+            # пишется в кэш синхронно.
+            return await sync_to_async(pin_to_primary)(request, response)
+    else:
+        def middleware(request):
+            token = read_state.set(get_read_state(request))
+            try:
+                response = get_response(request)
+            finally:
+                read_state.reset(token)
+            return pin_to_primary(request, response)
+    return middleware
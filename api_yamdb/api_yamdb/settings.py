@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from datetime import timedelta
 from pathlib import Path
@@ -32,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api_yamdb.metrics.MetricsMiddleware',
+    'api_yamdb.replicas.replica_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +65,13 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# Под ASGI (api_yamdb/asgi.py) списки и карточки каталога, отзывов
+# и комментариев обслуживаются асинхронными представлениями,
+# запросы к БД выполняются в пуле из ASYNC_READ_THREADS потоков.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='0') == '1'
+
+ASYNC_READ_THREADS = int(os.getenv('ASYNC_READ_THREADS', default=16))
+
 
 # Database
 
@@ -72,10 +82,140 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default=5432)
+        'PORT': os.getenv('DB_PORT', default=5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=0)),
+    }
+}
+
+# Read replicas
+# DB_REPLICA_HOSTS (host или host:port) и DB_REPLICA_NAMES через запятую;
+# недостающие параметры берутся у основной БД. Безопасные запросы к API
+# читают с реплик (api_yamdb/replicas.py).
+
+REPLICA_HOSTS = [
+    host for host in os.getenv('DB_REPLICA_HOSTS', default='').split(',')
+    if host]
+REPLICA_NAMES = [
+    name for name in os.getenv('DB_REPLICA_NAMES', default='').split(',')
+    if name]
+
+REPLICA_DATABASES = []
+
+for number in range(max(len(REPLICA_HOSTS), len(REPLICA_NAMES))):
+    replica = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if number < len(REPLICA_HOSTS):
+        replica['HOST'], _, port = REPLICA_HOSTS[number].partition(':')
+        replica['PORT'] = port or replica['PORT']
+    if number < len(REPLICA_NAMES):
+        replica['NAME'] = REPLICA_NAMES[number]
+    if replica['ENGINE'].endswith('postgresql'):
+        replica['OPTIONS'] = {'connect_timeout': 2}
+    DATABASES[f'replica{number + 1}'] = replica
+    REPLICA_DATABASES.append(f'replica{number + 1}')
+
+DATABASE_ROUTERS = ['api_yamdb.replicas.ReplicaRouter']
+
+# После записи клиент читает с основной БД столько секунд.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', default=15))
+
+REPLICA_STICKY_COOKIE = 'yamdb_primary'
+
+REPLICA_HEALTH_INTERVAL = 5
+
+# Реплика, отстающая сильнее, считается неисправной, сек.
+REPLICA_MAX_LAG = int(os.getenv('REPLICA_MAX_LAG', default=10))
+
+
+# Cache
+
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', default='yamdb'),
     }
 }
 
+if CACHE_BACKEND.endswith('LocMemCache'):
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', default=5000)),
+    }
+
+API_CACHE_ALIAS = 'default'
+
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', default=300))
+
+API_USER_CACHE_TIMEOUT = int(os.getenv('API_USER_CACHE_TIMEOUT', default=60))
+
+API_BATCH_MAX_SIZE = 500
+
+# Наибольший размер страницы курсорной пагинации (?cursor=&limit=).
+API_CURSOR_MAX_SIZE = 1000
+
+# Наибольшее число GET-запросов в одном пакетном чтении /api/v1/batch/.
+API_MULTIPLEX_MAX_SIZE = 50
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Лента изменений /api/v1/changes/: размер страницы по умолчанию
+# и наибольший, и сколько секунд последних изменений она не отдает,
+# пока не завершатся транзакции, начатые раньше.
+CHANGE_FEED_SIZE = 500
+
+CHANGE_FEED_MAX_SIZE = 5000
+
+CHANGE_FEED_LAG = int(os.getenv('CHANGE_FEED_LAG', default=5))
+
+# События SSE о новых отзывах и комментариях (api/events.py).
+# Воркеры с подписчиками слушают сокеты в EVENTS_DIR. Поток закрывается
+# через EVENTS_STREAM_SECONDS, клиент переподключается с Last-Event-ID
+# и получает до EVENTS_REPLAY_SIZE пропущенных событий.
+EVENTS_DIR = os.getenv(
+    'EVENTS_DIR', default=os.path.join(tempfile.gettempdir(), 'yamdb-events'))
+
+EVENTS_HEARTBEAT = float(os.getenv('EVENTS_HEARTBEAT', default=15))
+
+EVENTS_STREAM_SECONDS = int(os.getenv('EVENTS_STREAM_SECONDS', default=300))
+
+EVENTS_QUEUE_SIZE = 100
+
+EVENTS_REPLAY_SIZE = 100
+
+EVENTS_MAX_SIZE = 256 * 1024
+
+TITLE_SEARCH_CONFIG = os.getenv('TITLE_SEARCH_CONFIG', default='russian')
+
+# Индекс фильтров произведений в памяти воркера (api/title_index.py):
+# фильтры category, genre и year без поиска и сортировки отбираются
+# по битовым картам, из БД читается только страница.
+TITLE_BITMAP_INDEX = os.getenv('TITLE_BITMAP_INDEX', default='0') == '1'
+
+# Leaderboards
+# Периоды рейтингов лидеров: название -> количество дней (None — за все
+# время). Оценка произведения сглаживается к LEADERBOARD_PRIOR_MEAN
+# так, будто у него есть еще LEADERBOARD_PRIOR_WEIGHT таких отзывов.
+
+LEADERBOARD_PERIODS = {'all': None, 'month': 30, 'week': 7}
+
+LEADERBOARD_PRIOR_MEAN = 5
+
+LEADERBOARD_PRIOR_WEIGHT = 5
+
+LEADERBOARD_SIZE = 10
+
+LEADERBOARD_MAX_SIZE = 100
+
+# Metrics
+# Каждый воркер gunicorn сбрасывает свои метрики в файл в этой папке.
+
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'yamdb-metrics'))
+
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', default=5))
+
 
 # Password validation
 
@@ -122,9 +262,9 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageNumberOrCursorPagination',
     'PAGE_SIZE': 5,
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -134,12 +274,24 @@ REST_FRAMEWORK = {
 AUTH_USER_MODEL = 'users.User'
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND',
+    default='django.core.mail.backends.filebased.EmailBackend')
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 EMAIL_FOR_AUTH_LETTERS = 'testmail@yamdb.com'
 
+OUTBOX_BATCH_SIZE = 100
+
+OUTBOX_MAX_ATTEMPTS = 5
+
+OUTBOX_RETRY_DELAY = 30
+
+# Сколько секунд письма, взятые обработчиком, скрыты от других
+# обработчиков. Письма упавшего обработчика уходят после этого срока.
+OUTBOX_LEASE = 300
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -0,0 +1,39 @@
+import os
+import shutil
+
+from api_yamdb.settings import EVENTS_DIR, EVENTS_STREAM_SECONDS, METRICS_DIR
+
+# SERVER_MODE=asgi: приложение api_yamdb.asgi под воркерами uvicorn.
+if os.getenv('SERVER_MODE') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    # Поток событий SSE занимает поток воркера до EVENTS_STREAM_SECONDS:
+    # остальные запросы обслуживают другие потоки, а timeout не прерывает
+    # поток событий раньше, чем он закроется сам.
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', default=16))
+    timeout = EVENTS_STREAM_SECONDS + 30
+
+
+def on_starting(server):
+    """
+    Метрики прежнего запуска не должны складываться с новыми,
+    а события — отправляться в сокеты прежних воркеров.
+    """
+
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    shutil.rmtree(EVENTS_DIR, ignore_errors=True)
+
+
+def post_worker_init(worker):
+    """Индекс фильтров произведений строится до первого запроса."""
+
+    from django.conf import settings
+
+    if settings.TITLE_BITMAP_INDEX:
+        from django.db import connections
+
+        from api.title_index import title_index
+
+        title_index.refresh()
+        connections.close_all()
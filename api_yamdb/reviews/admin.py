@@ -11,6 +11,7 @@ class TitleAdmin(admin.ModelAdmin):
         'name',
         'year',
         'description',
+        'rating',
     )
 
 
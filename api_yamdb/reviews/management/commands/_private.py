@@ -0,0 +1,162 @@
+import io
+import json
+import os
+import time
+from csv import DictReader
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+def copy_escape(value):
+    """Представляет значение в текстовом формате COPY PostgreSQL."""
+
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+class BatchLoader:
+    """
+    Потоково загружает строки CSV в таблицу модели пачками.
+    Каждая пачка пишется одной командой (COPY для PostgreSQL,
+    executemany для остальных СУБД) в отдельной транзакции.
+    """
+
+    def __init__(self, model, batch_size, use_copy, stdout=None):
+        # Соединение берется один раз: обращение через прокси
+        # django.db.connection на каждое поле заметно замедляет загрузку.
+        connection = self.connection = connections[DEFAULT_DB_ALIAS]
+        self.model = model
+        self.batch_size = batch_size
+        self.use_copy = use_copy and connection.vendor == 'postgresql'
+        self.stdout = stdout
+        self.fields = [
+            field for field in model._meta.concrete_fields if field.column]
+        self.columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in self.fields)
+        self.table = connection.ops.quote_name(model._meta.db_table)
+
+    def get_values(self, obj, given):
+        """
+        Значения для вставки, как их подготовил бы save().
+        Поля из CSV (given) не перезаписываются auto_now_add.
+        """
+
+        values = []
+        for field in self.fields:
+            if field.attname in given:
+                value = getattr(obj, field.attname)
+            else:
+                value = field.pre_save(obj, add=True)
+            values.append(field.get_db_prep_save(value, self.connection))
+        return values
+
+    def insert(self, rows, ignore_conflicts=False):
+        connection = self.connection
+        with transaction.atomic(), connection.cursor() as cursor:
+            if self.use_copy and not ignore_conflicts:
+                buffer = io.StringIO()
+                for values in rows:
+                    buffer.write('\t'.join(map(copy_escape, values)) + '\n')
+                buffer.seek(0)
+                cursor.cursor.copy_expert(
+                    f'COPY {self.table} ({self.columns}) FROM STDIN', buffer)
+                return
+            placeholders = ', '.join(['%s'] * len(self.fields))
+            cursor.executemany(
+                '{} {} ({}) VALUES ({}) {}'.format(
+                    connection.ops.insert_statement(
+                        ignore_conflicts=ignore_conflicts),
+                    self.table, self.columns, placeholders,
+                    connection.ops.ignore_conflicts_suffix_sql(
+                        ignore_conflicts=ignore_conflicts)),
+                rows)
+
+    def load(self, path, build, skip=0, on_commit=None):
+        """
+        Загружает файл path, пропуская первые skip строк.
+        build(row) возвращает несохраненный объект модели.
+        После каждой пачки вызывается on_commit(число загруженных строк).
+        Первая пачка после возобновления пропускает уже вставленные строки.
+        """
+
+        started = time.monotonic()
+        loaded = skip
+        batch = []
+        ignore_conflicts = skip > 0
+        with open(path, encoding='utf-8') as csv_file:
+            for number, row in enumerate(DictReader(csv_file)):
+                if number < skip:
+                    continue
+                obj, given = build(row)
+                batch.append(self.get_values(obj, given))
+                if len(batch) < self.batch_size:
+                    continue
+                self.insert(batch, ignore_conflicts)
+                loaded += len(batch)
+                batch = []
+                ignore_conflicts = False
+                self.report(path, loaded - skip, started, on_commit, loaded)
+        if batch:
+            self.insert(batch, ignore_conflicts)
+            loaded += len(batch)
+        self.report(path, loaded - skip, started, on_commit, loaded)
+        return loaded - skip
+
+    def load_objects(self, objects, given=(), label=None):
+        """
+        Загружает несохраненные объекты модели пачками.
+        Поля given берутся из объектов как есть (см. get_values).
+        """
+
+        started = time.monotonic()
+        label = label or self.model._meta.db_table
+        loaded = 0
+        batch = []
+        for obj in objects:
+            batch.append(self.get_values(obj, given))
+            if len(batch) < self.batch_size:
+                continue
+            self.insert(batch)
+            loaded += len(batch)
+            batch = []
+        if batch:
+            self.insert(batch)
+            loaded += len(batch)
+        self.report(label, loaded, started, None, loaded)
+        return loaded
+
+    def report(self, path, count, started, on_commit, loaded):
+        if on_commit is not None:
+            on_commit(loaded)
+        if self.stdout is not None:
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f'{os.path.basename(path)}: {count} строк, '
+                f'{count / elapsed:.0f} строк/с')
+
+
+class ImportState:
+    """Отметки о загруженных строках для возобновления импорта."""
+
+    def __init__(self, path, resume):
+        self.path = path
+        self.state = {}
+        if resume and os.path.exists(path):
+            with open(path, encoding='utf-8') as state_file:
+                self.state = json.load(state_file)
+
+    def get(self, name):
+        return self.state.get(name, 0)
+
+    def set(self, name, loaded):
+        self.state[name] = loaded
+        with open(self.path, 'w', encoding='utf-8') as state_file:
+            json.dump(self.state, state_file)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
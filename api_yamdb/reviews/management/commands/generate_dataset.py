@@ -0,0 +1,218 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, reviews_bulk_changed)
+from users.models import User
+from ._private import BatchLoader
+
+# Даты отзывов и комментариев отсчитываются от фиксированного момента,
+# чтобы данные не зависели от дня запуска.
+START_DATE = datetime(2015, 1, 1, tzinfo=timezone.utc)
+
+ADJECTIVES = ('Тихий', 'Последний', 'Красный', 'Далекий', 'Северный',
+              'Забытый', 'Новый', 'Темный', 'Золотой', 'Старый')
+NOUNS = ('дом', 'берег', 'город', 'сад', 'путь', 'лес', 'остров',
+         'ветер', 'мост', 'свет')
+
+
+def parse_roles(value):
+    roles = {}
+    for item in value.split(','):
+        role, share = item.split('=')
+        if role not in dict(User.CHOISES):
+            raise CommandError(f'Неизвестная роль {role}')
+        roles[role] = float(share)
+    return roles
+
+
+def skewed_counts(total, size, exponent, cap=None):
+    """
+    Распределяет total элементов по size корзинам по закону Ципфа:
+    корзина ранга r получает долю, пропорциональную 1 / r ** exponent.
+    Корзина не получает больше cap элементов, излишек уходит
+    следующим по рангу.
+    """
+
+    if not size:
+        return []
+    cap = total if cap is None else cap
+    weights = [1 / rank ** exponent for rank in range(1, size + 1)]
+    scale = total / sum(weights)
+    counts = [min(cap, int(weight * scale)) for weight in weights]
+    remainder = min(total, cap * size) - sum(counts)
+    while remainder > 0:
+        for rank in range(size):
+            if counts[rank] < cap:
+                counts[rank] += 1
+                remainder -= 1
+                if not remainder:
+                    break
+    return counts
+
+
+def next_id(model):
+    return (model.objects.aggregate(value=Max('pk'))['value'] or 0) + 1
+
+
+class Command(BaseCommand):
+    """Генерирует воспроизводимый набор данных заданного объема."""
+
+    help = """
+    Генерирует пользователей, категории, жанры, произведения, отзывы
+    и комментарии. При одинаковом --seed данные совпадают.
+    Отзывы и комментарии распределены неравномерно: несколько
+    произведений получают большую часть отзывов."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--genres', type=int, default=200)
+        parser.add_argument('--titles', type=int, default=100000)
+        parser.add_argument('--reviews', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=1000000)
+        parser.add_argument(
+            '--roles', type=parse_roles,
+            default='user=0.9,moderator=0.08,admin=0.02',
+            help='Доли ролей пользователей.')
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='Показатель распределения Ципфа для отзывов и комментариев.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Количество строк в одной транзакции.')
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY на PostgreSQL.')
+
+    def handle(self, *args, **options):
+        if isinstance(options['roles'], str):
+            options['roles'] = parse_roles(options['roles'])
+        if not options['users'] or not options['titles']:
+            raise CommandError('Нужны хотя бы один пользователь '
+                               'и одно произведение.')
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.ids = {
+            model: next_id(model)
+            for model in (User, Category, Genre, Title, GenreTitle, Review,
+                          Comment)
+        }
+
+        self.load(User, self.build_users())
+        self.load(Category, self.build_slugged(Category, 'category',
+                                               options['categories']))
+        self.load(Genre, self.build_slugged(Genre, 'genre',
+                                            options['genres']))
+        self.load(Title, self.build_titles())
+        self.load(GenreTitle, self.build_genre_titles())
+        self.load(Review, self.build_reviews(), given=('pub_date',))
+        self.load(Comment, self.build_comments(), given=('pub_date',))
+
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), list(self.ids)):
+                cursor.execute(sql)
+        reviews_bulk_changed.send(sender=Review, title_ids=None)
+        self.stdout.write('Набор данных сгенерирован.')
+
+    def load(self, model, objects, given=()):
+        BatchLoader(
+            model, self.options['batch_size'], not self.options['no_copy'],
+            self.stdout
+        ).load_objects(objects, given)
+
+    def random_date(self):
+        return START_DATE + timedelta(
+            seconds=self.rng.randrange(6 * 365 * 24 * 3600))
+
+    def build_users(self):
+        roles, weights = zip(*self.options['roles'].items())
+        first = self.ids[User]
+        for number in range(self.options['users']):
+            pk = first + number
+            yield User(
+                id=pk, username=f'user{pk}', email=f'user{pk}@yamdb.fake',
+                role=self.rng.choices(roles, weights)[0],
+                bio=f'Биография пользователя {pk}')
+
+    def build_slugged(self, model, name, count):
+        first = self.ids[model]
+        for number in range(count):
+            pk = first + number
+            yield model(id=pk, name=f'{name.title()} {pk}',
+                        slug=f'{name}-{pk}')
+
+    def build_titles(self):
+        first = self.ids[Title]
+        categories = self.options['categories']
+        for number in range(self.options['titles']):
+            pk = first + number
+            category = (self.ids[Category] + self.rng.randrange(categories)
+                        if categories else None)
+            yield Title(
+                id=pk,
+                name=(f'{self.rng.choice(ADJECTIVES)} '
+                      f'{self.rng.choice(NOUNS)} {pk}'),
+                year=self.rng.randint(1900, 2022),
+                description=(f'{self.rng.choice(ADJECTIVES)} '
+                             f'{self.rng.choice(NOUNS)}: описание {pk}'),
+                category_id=category)
+
+    def build_genre_titles(self):
+        genres = self.options['genres']
+        pk = self.ids[GenreTitle]
+        for number in range(self.options['titles']):
+            count = min(genres, self.rng.randint(1, 3))
+            for genre in self.rng.sample(range(genres), count):
+                yield GenreTitle(
+                    id=pk, title_id=self.ids[Title] + number,
+                    genre_id=self.ids[Genre] + genre)
+                pk += 1
+
+    def build_reviews(self):
+        """
+        Отзывы распределяются по произведениям по Ципфу; у каждого
+        произведения авторы отзывов различны (unique_name_author).
+        """
+
+        users = self.options['users']
+        titles = list(range(self.options['titles']))
+        self.rng.shuffle(titles)
+        counts = skewed_counts(
+            self.options['reviews'], len(titles), self.options['skew'],
+            cap=users)
+        pk = self.ids[Review]
+        for title, count in zip(titles, counts):
+            for author in self.rng.sample(range(users), count):
+                yield Review(
+                    id=pk, title_id=self.ids[Title] + title,
+                    author_id=self.ids[User] + author,
+                    text=f'Отзыв {pk}', score=self.rng.randint(1, 10),
+                    pub_date=self.random_date())
+                pk += 1
+        self.reviews = pk - self.ids[Review]
+
+    def build_comments(self):
+        """
+        Отзывы идут по убыванию популярности произведений, поэтому
+        комментарии по Ципфу достаются в основном популярным отзывам.
+        """
+
+        counts = skewed_counts(
+            self.options['comments'], self.reviews, self.options['skew'])
+        pk = self.ids[Comment]
+        for review, count in enumerate(counts):
+            for _ in range(count):
+                yield Comment(
+                    id=pk, review_id=self.ids[Review] + review,
+                    author_id=(self.ids[User]
+                               + self.rng.randrange(self.options['users'])),
+                    text=f'Комментарий {pk}', pub_date=self.random_date())
+                pk += 1
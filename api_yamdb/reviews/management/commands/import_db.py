@@ -1,9 +1,13 @@
-from csv import DictReader
+import os
 
 from django.core.management import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection
 
-from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, reviews_bulk_changed)
 from users.models import User
+from ._private import BatchLoader, ImportState
 
 MESSAGE = """
 При необходиомсти загрузить данные из CSV файла,
@@ -12,6 +16,76 @@ MESSAGE = """
 для создания новых таблиц."""
 
 
+def build_user(row):
+    return User(
+        id=row['id'],
+        username=row['username'],
+        email=row['email'],
+        role=row['role'],
+        bio=row['bio'],
+        first_name=row['first_name'],
+        last_name=row['last_name']
+    ), ()
+
+
+def build_category(row):
+    return Category(id=row['id'], name=row['name'], slug=row['slug']), ()
+
+
+def build_genre(row):
+    return Genre(id=row['id'], name=row['name'], slug=row['slug']), ()
+
+
+def build_title(row):
+    return Title(
+        id=row['id'],
+        name=row['name'],
+        year=row['year'],
+        category_id=row['category']
+    ), ()
+
+
+def build_genre_title(row):
+    return GenreTitle(
+        id=row['id'],
+        title_id=row['title_id'],
+        genre_id=row['genre_id']
+    ), ()
+
+
+def build_review(row):
+    return Review(
+        id=row['id'],
+        title_id=row['title_id'],
+        text=row['text'],
+        author_id=row['author'],
+        score=row['score'],
+        pub_date=row['pub_date']
+    ), ('pub_date',)
+
+
+def build_comment(row):
+    return Comment(
+        id=row['id'],
+        review_id=row['review_id'],
+        text=row['text'],
+        author_id=row['author'],
+        pub_date=row['pub_date']
+    ), ('pub_date',)
+
+
+# Файлы в порядке загрузки: связанные таблицы идут после основных.
+SOURCES = (
+    ('users.csv', User, build_user),
+    ('category.csv', Category, build_category),
+    ('genre.csv', Genre, build_genre),
+    ('titles.csv', Title, build_title),
+    ('genre_title.csv', GenreTitle, build_genre_title),
+    ('review.csv', Review, build_review),
+    ('comments.csv', Comment, build_comment),
+)
+
+
 class Command(BaseCommand):
     """Отображет юзеру информацию при вводе help."""
     help = """
@@ -19,6 +93,20 @@ class Command(BaseCommand):
     genre.csv, genre_title.csv,
     users.csv, review.csv, comments.csv """
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default='./static/data',
+            help='Папка с CSV файлами.')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество строк в одной транзакции.')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить импорт, прерванный ошибкой.')
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY на PostgreSQL.')
+
     def handle(self, *args, **options):
         print(MESSAGE)
 
@@ -26,70 +114,29 @@ class Command(BaseCommand):
         print('Начинаем импортировать данные в БД.')
 
         """Код для импорта данных в БД."""
-        for row in DictReader(open('./static/data/users.csv')):
-            users = User(
-                id=row['id'],
-                username=row['username'],
-                email=row['email'],
-                role=row['role'],
-                bio=row['bio'],
-                first_name=row['first_name'],
-                last_name=row['last_name']
-            )
-            users.save()
-
-        for row in DictReader(open('./static/data/category.csv')):
-            categories = Category(
-                id=row['id'],
-                name=row['name'],
-                slug=row['slug']
-            )
-            categories.save()
-
-        for row in DictReader(open('./static/data/genre.csv')):
-            genres = Genre(
-                id=row['id'],
-                name=row['name'],
-                slug=row['slug']
-            )
-            genres.save()
-
-        for row in DictReader(open('./static/data/titles.csv')):
-            titles = Title(
-                id=row['id'],
-                name=row['name'],
-                year=row['year'],
-                category=Category.objects.get(id=row['category']))
-            titles.save()
-
-        for row in DictReader(open('./static/data/genre_title.csv')):
-            genre_title = GenreTitle(
-                id=row['id'],
-                title=Title.objects.get(id=row['title_id']),
-                genre=Genre.objects.get(id=row['genre_id'])
-            )
-            genre_title.save()
-
-        for row in DictReader(open('./static/data/review.csv')):
-            reviews = Review(
-                id=row['id'],
-                title=Title.objects.get(id=row['title_id']),
-                text=row['text'],
-                author=User.objects.get(id=row['author']),
-                score=row['score'],
-                pub_date=row['pub_date']
-            )
-            reviews.save()
-
-        for row in DictReader(open('./static/data/comments.csv')):
-            comments = Comment(
-                id=row['id'],
-                review=Review.objects.get(id=row['review_id']),
-                text=row['text'],
-                author=User.objects.get(id=row['author']),
-                pub_date=row['pub_date']
-            )
-            comments.save()
+        state = ImportState(
+            os.path.join(options['path'], '.import_state.json'),
+            options['resume'])
+        for file_name, model, build in SOURCES:
+            loader = BatchLoader(
+                model, options['batch_size'], not options['no_copy'],
+                self.stdout)
+            loader.load(
+                os.path.join(options['path'], file_name),
+                build,
+                skip=state.get(file_name),
+                on_commit=lambda loaded, name=file_name: state.set(
+                    name, loaded))
+
+        """Сбрасываем счетчики id после вставки явных значений."""
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [model for _, model, _ in SOURCES]):
+                cursor.execute(sql)
+
+        """Пересчитываем хранимый рейтинг произведений."""
+        reviews_bulk_changed.send(sender=Review, title_ids=None)
+        state.clear()
 
         """Отображет информацию об окончании процесса импорта данных в БД."""
         print('Закончили импортировать данные в БД.')
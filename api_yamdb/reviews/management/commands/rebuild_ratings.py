@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """Пересчитывает хранимые рейтинги произведений."""
+
+    help = """
+    Пересчитывает количество отзывов, сумму оценок и рейтинг
+    всех произведений по таблице отзывов.
+    Используется после loaddata и других загрузок в обход API."""
+
+    def handle(self, *args, **options):
+        updated = Title.objects.all().refresh_ratings()
+        self.stdout.write(f'Пересчитан рейтинг произведений: {updated}.')
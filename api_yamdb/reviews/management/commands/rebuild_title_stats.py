@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from reviews.stats import rebuild_title_stats
+
+
+class Command(BaseCommand):
+    """Пересчитывает статистику оценок и рейтинги лидеров."""
+
+    help = """
+    Пересчитывает распределение оценок, отзывы за дни периодов
+    и рейтинги лидеров всех произведений по таблице отзывов.
+    Используется после загрузок в обход API и сигналов."""
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_title_stats()
+        self.stdout.write('Статистика произведений пересчитана.')
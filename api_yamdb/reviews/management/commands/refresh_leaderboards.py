@@ -0,0 +1,44 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from reviews.stats import expire_activity
+
+
+def get_seconds_to_midnight():
+    """Секунды до начала следующих суток по времени TIME_ZONE."""
+
+    now = timezone.localtime()
+    midnight = timezone.make_aware(datetime.combine(
+        now.date() + timedelta(days=1), datetime.min.time()))
+    return (midnight - now).total_seconds()
+
+
+class Command(BaseCommand):
+    """Исключает из рейтингов за периоды устаревшие отзывы."""
+
+    help = """
+    Удаляет отзывы за дни, вышедшие за границы периодов, и перестраивает
+    рейтинги лидеров за неделю и месяц. Запускается раз в сутки, с --loop
+    работает как постоянный сервис и обновляет рейтинги при запуске
+    и в начале каждых суток."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, обновляя рейтинги в начале суток.')
+        parser.add_argument(
+            '--delay', type=float, default=60.0,
+            help='Задержка обновления после начала суток, сек.')
+
+    def handle(self, *args, **options):
+        while True:
+            with transaction.atomic():
+                expire_activity()
+            self.stdout.write('Рейтинги лидеров обновлены.')
+            if not options['loop']:
+                return
+            time.sleep(get_seconds_to_midnight() + options['delay'])
@@ -1,8 +1,47 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models
+from django.db.models import (Case, Count, ExpressionWrapper, F, IntegerField,
+                              OuterRef, Q, Subquery, Sum, Value, When)
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .search import search_titles
 
 User = get_user_model()
 
+# Отправляется массовыми операциями с отзывами, которые минуют
+# post_save и post_delete. Аргумент title_ids - затронутые произведения,
+# None означает все произведения.
+reviews_bulk_changed = Signal()
+
+# Отзывы, удаляемые в текущем контексте вместе с комментариями.
+deleting_reviews = ContextVar('deleting_reviews', default=frozenset())
+
+# Произведения, удаляемые в текущем контексте вместе с отзывами:
+# их рейтинг и статистику пересчитывать не нужно.
+deleting_titles = ContextVar('deleting_titles', default=frozenset())
+
+
+@contextmanager
+def deletion_scope():
+    """
+    Отметки об удаляемых объектах (их ставят сигналы pre_delete)
+    снимаются после удаления, даже если оно завершилось ошибкой.
+    """
+
+    tokens = [(variable, variable.set(variable.get()))
+              for variable in (deleting_reviews, deleting_titles)]
+    try:
+        yield
+    finally:
+        for variable, token in tokens:
+            variable.reset(token)
+
 
 class Genre(models.Model):
     """Модель жанров."""
@@ -15,11 +54,19 @@ class Genre(models.Model):
         unique=True,
         max_length=50
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
 
     class Meta:
         verbose_name = 'Жанр'
         verbose_name_plural = 'Жанры'
         ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['updated_at', 'id'], name='genre_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -36,16 +83,102 @@ class Category(models.Model):
         unique=True,
         max_length=50
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
 
     class Meta:
         verbose_name = 'Категория'
         verbose_name_plural = 'Категории'
         ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['updated_at', 'id'], name='category_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+    """Запросы к произведениям с поддержкой хранимого рейтинга."""
+
+    def refresh_ratings(self, **fields):
+        """
+        Пересчитывает количество отзывов, сумму оценок и рейтинг
+        выбранных произведений по таблице отзывов.
+        В fields можно передать другие поля для того же UPDATE.
+        """
+
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')).order_by().values('title')
+        review_count = reviews.annotate(value=Count('id')).values('value')
+        score_sum = reviews.annotate(value=Sum('score')).values('value')
+        rating = reviews.annotate(value=ExpressionWrapper(
+            Sum('score') / Count('id'), output_field=IntegerField()
+        )).values('value')
+        return self.update(
+            review_count=Coalesce(Subquery(review_count), Value(0)),
+            score_sum=Coalesce(Subquery(score_sum), Value(0)),
+            rating=Subquery(rating),
+            **fields
+        )
+
+    def add_score(self, score, **fields):
+        """Учитывает новый отзыв с оценкой score."""
+
+        return self.update(
+            review_count=F('review_count') + 1,
+            score_sum=F('score_sum') + score,
+            rating=ExpressionWrapper(
+                (F('score_sum') + score) / (F('review_count') + 1),
+                output_field=IntegerField()),
+            **fields
+        )
+
+    def change_score(self, delta, **fields):
+        """Учитывает изменение оценки существующего отзыва на delta."""
+
+        return self.update(
+            score_sum=F('score_sum') + delta,
+            rating=ExpressionWrapper(
+                (F('score_sum') + delta) / F('review_count'),
+                output_field=IntegerField()),
+            **fields
+        )
+
+    def remove_score(self, score, **fields):
+        """Учитывает удаление отзыва с оценкой score."""
+
+        return self.update(
+            review_count=F('review_count') - 1,
+            score_sum=F('score_sum') - score,
+            rating=Case(
+                When(review_count__lte=1, then=None),
+                default=ExpressionWrapper(
+                    (F('score_sum') - score) / (F('review_count') - 1),
+                    output_field=IntegerField()),
+                output_field=IntegerField(),
+            ),
+            **fields
+        )
+
+    def delete(self):
+        with deletion_scope():
+            return super().delete()
+
+    def touch(self):
+        """Обновляет отметку времени изменения произведений."""
+
+        return self.update(updated_at=timezone.now())
+
+    def search(self, value):
+        """Полнотекстовый поиск по названию и описанию."""
+
+        return search_titles(self, value, connections[self.db].vendor)
+
+
 class Title(models.Model):
     """Модель произведений."""
 
@@ -66,21 +199,58 @@ class Title(models.Model):
         null=True,
         on_delete=models.SET_NULL,
         verbose_name='Категория',
-        related_name='titles'
+        related_name='titles',
+        db_index=False
     )
     genre = models.ManyToManyField(
         Genre,
         through='GenreTitle',
     )
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов',
+        default=0,
+        editable=False
+    )
+    score_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False
+    )
+    rating = models.PositiveSmallIntegerField(
+        'Рейтинг',
+        null=True,
+        editable=False,
+        db_index=True
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['category', 'year'], name='title_category_year_idx'),
+            models.Index(
+                fields=['updated_at', 'id'], name='title_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def delete(self, *args, **kwargs):
+        with deletion_scope():
+            return super().delete(*args, **kwargs)
+
 
 class GenreTitle(models.Model):
     """Промежуточная таблица для жанров и произведений."""
@@ -89,29 +259,76 @@ class GenreTitle(models.Model):
         Title, on_delete=models.CASCADE
     )
     genre = models.ForeignKey(
-        Genre, on_delete=models.CASCADE
+        Genre, on_delete=models.CASCADE, db_index=False
     )
 
     class Meta:
         verbose_name = 'Жанр и произведение'
         verbose_name_plural = 'Жанры и произведения'
         ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['genre', 'title'], name='genretitle_genre_title_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title} {self.genre}'
 
 
+class ReviewQuerySet(models.QuerySet):
+    """
+    Запросы к отзывам.
+    Массовые операции сообщают о затронутых произведениях
+    сигналом reviews_bulk_changed.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        reviews_bulk_changed.send(
+            sender=Review, title_ids={obj.title_id for obj in objs})
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        title_ids = {obj.title_id for obj in objs}
+        if 'title' in fields:
+            title_ids.update(self.filter(
+                pk__in=[obj.pk for obj in objs]
+            ).values_list('title_id', flat=True))
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        reviews_bulk_changed.send(sender=Review, title_ids=title_ids)
+        return rows
+
+    def delete(self):
+        with deletion_scope():
+            return super().delete()
+
+    def update(self, **kwargs):
+        if 'score' not in kwargs and 'title' not in kwargs:
+            return super().update(**kwargs)
+        title_ids = set(self.values_list('title_id', flat=True))
+        rows = super().update(**kwargs)
+        if 'title' in kwargs:
+            title_ids.add(getattr(kwargs['title'], 'pk', kwargs['title']))
+        reviews_bulk_changed.send(sender=Review, title_ids=title_ids)
+        return rows
+
+
 class Review(models.Model):
     """Модель отзывов."""
 
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='reviews')
     title = models.ForeignKey(
-        Title, on_delete=models.CASCADE, related_name='reviews')
+        Title, on_delete=models.CASCADE, related_name='reviews',
+        db_index=False)
     text = models.TextField()
     pub_date = models.DateTimeField(
         'Дата добавления', auto_now_add=True, db_index=True)
     score = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(
+        'Дата изменения', auto_now=True)
+
+    objects = ReviewQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -123,10 +340,35 @@ class Review(models.Model):
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['title', 'id'], name='review_title_id_idx'),
+            models.Index(
+                fields=['updated_at', 'id'], name='review_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def delete(self, *args, **kwargs):
+        with deletion_scope():
+            return super().delete(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_score()
+        return instance
+
+    def remember_score(self):
+        """
+        Запоминает сохраненные в БД оценку и произведение,
+        чтобы при изменении отзыва пересчитать рейтинг по разнице.
+        """
+
+        loaded = self.get_deferred_fields()
+        self._loaded_score = None if 'score' in loaded else self.score
+        self._loaded_title_id = None if 'title_id' in loaded else self.title_id
+
 
 class Comment(models.Model):
     """Модель комментариев."""
@@ -134,15 +376,138 @@ class Comment(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='comments')
     review = models.ForeignKey(
-        Review, on_delete=models.CASCADE, related_name='comments')
+        Review, on_delete=models.CASCADE, related_name='comments',
+        db_index=False)
     text = models.TextField()
     pub_date = models.DateTimeField(
         'Дата добавления', auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(
+        'Дата изменения', auto_now=True)
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['review', 'id'], name='comment_review_id_idx'),
+            models.Index(
+                fields=['updated_at', 'id'], name='comment_updated_idx'),
+        ]
 
     def __str__(self):
         return self.review
+
+
+class TitleScore(models.Model):
+    """Количество отзывов произведения с каждой оценкой."""
+
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='scores',
+        db_index=False)
+    score = models.PositiveSmallIntegerField('Оценка')
+    count = models.PositiveIntegerField('Количество отзывов', default=0)
+
+    class Meta:
+        verbose_name = 'Оценки произведения'
+        verbose_name_plural = 'Оценки произведений'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'score'], name='unique_title_score')
+        ]
+
+
+class TitleActivity(models.Model):
+    """
+    Отзывы произведения за день: основа рейтингов лидеров за период.
+    Хранятся дни только внутри самого длинного периода.
+    """
+
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='activity',
+        db_index=False)
+    day = models.DateField('День', db_index=True)
+    review_count = models.PositiveIntegerField(
+        'Количество отзывов', default=0)
+    score_sum = models.PositiveIntegerField('Сумма оценок', default=0)
+
+    class Meta:
+        verbose_name = 'Отзывы за день'
+        verbose_name_plural = 'Отзывы за день'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'day'], name='unique_title_day')
+        ]
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Место произведения в рейтинге лидеров за период. Рейтинги ведутся
+    для всего каталога, категории, жанра и их сочетания (пустые
+    category и genre означают все категории и жанры), поэтому первые
+    k мест читаются по индексу без агрегации отзывов.
+    """
+
+    period = models.CharField('Период', max_length=16)
+    category = models.ForeignKey(
+        Category, null=True, on_delete=models.CASCADE, db_index=False)
+    genre = models.ForeignKey(
+        Genre, null=True, on_delete=models.CASCADE, db_index=False)
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    review_count = models.PositiveIntegerField('Количество отзывов')
+    score_sum = models.PositiveIntegerField('Сумма оценок')
+    value = models.FloatField('Оценка в рейтинге')
+
+    class Meta:
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Рейтинги лидеров'
+        # По индексу на каждый вид рейтинга: условие IS NULL не позволяет
+        # PostgreSQL читать общий индекс сразу в порядке убывания оценки.
+        indexes = [
+            models.Index(
+                fields=['period', '-value', 'title'],
+                name='leaderboard_all_idx',
+                condition=Q(category__isnull=True, genre__isnull=True)),
+            models.Index(
+                fields=['period', 'category', '-value', 'title'],
+                name='leaderboard_category_idx',
+                condition=Q(category__isnull=False, genre__isnull=True)),
+            models.Index(
+                fields=['period', 'genre', '-value', 'title'],
+                name='leaderboard_genre_idx',
+                condition=Q(category__isnull=True, genre__isnull=False)),
+            models.Index(
+                fields=['period', 'category', 'genre', '-value', 'title'],
+                name='leaderboard_category_genre_idx',
+                condition=Q(category__isnull=False, genre__isnull=False)),
+        ]
+
+
+class Tombstone(models.Model):
+    """Отметка об удалении объекта каталога для ленты изменений."""
+
+    model = models.CharField(
+        'Модель',
+        max_length=32
+    )
+    object_id = models.PositiveIntegerField(
+        'Идентификатор объекта'
+    )
+    deleted_at = models.DateTimeField(
+        'Дата удаления',
+        default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = 'Удаленный объект'
+        verbose_name_plural = 'Удаленные объекты'
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['model', 'deleted_at', 'id'],
+                name='tombstone_model_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
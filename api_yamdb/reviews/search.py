@@ -0,0 +1,113 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.db.models.expressions import RawSQL
+
+POSTGRESQL_SEARCH_SQL = """
+CREATE OR REPLACE FUNCTION reviews_title_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('{config}', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS reviews_title_search_vector ON reviews_title;
+CREATE TRIGGER reviews_title_search_vector
+    BEFORE INSERT OR UPDATE OF name, description ON reviews_title
+    FOR EACH ROW EXECUTE PROCEDURE reviews_title_search_vector();
+CREATE INDEX IF NOT EXISTS reviews_title_search_vector_gin
+    ON reviews_title USING gin (search_vector);
+UPDATE reviews_title SET name = name WHERE search_vector IS NULL;
+"""
+
+SQLITE_SEARCH_SQL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS reviews_title_fts USING fts5(
+        name, description, content='reviews_title', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS reviews_title_fts_insert
+        AFTER INSERT ON reviews_title BEGIN
+        INSERT INTO reviews_title_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reviews_title_fts_delete
+        AFTER DELETE ON reviews_title BEGIN
+        INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name,
+                                      description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reviews_title_fts_update
+        AFTER UPDATE OF name, description ON reviews_title BEGIN
+        INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name,
+                                      description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO reviews_title_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END""",
+    "INSERT INTO reviews_title_fts(reviews_title_fts) VALUES ('rebuild')",
+)
+
+SQLITE_RANK_SQL = (
+    'SELECT -bm25(reviews_title_fts, 10.0, 1.0) FROM reviews_title_fts '
+    'WHERE reviews_title_fts MATCH %s AND rowid = reviews_title.id')
+
+SQLITE_MATCH_SQL = (
+    'SELECT rowid FROM reviews_title_fts WHERE reviews_title_fts MATCH %s')
+
+# FTS5 не знает морфологии: у слова запроса отбрасывается окончание,
+# а основа ищется как префикс («семья» находит «семье» и «семьей»).
+ENDING_RE = re.compile(
+    r'(ами|ями|ого|его|ому|ему|ыми|ими|ой|ей|ий|ый|ая|яя|ое|ее|ую|юю|'
+    r'ом|ем|ах|ях|ов|ев|а|я|о|е|у|ю|ы|и|ь|й)$')
+
+MIN_STEM_LENGTH = 3
+
+
+def get_prefix(word):
+    """Основа слова для префиксного поиска FTS5."""
+
+    word = word.lower()
+    stem = ENDING_RE.sub('', word)
+    return stem if len(stem) >= MIN_STEM_LENGTH else word
+
+
+def install_search_index(connection):
+    """
+    Создает полнотекстовый индекс произведений и триггеры,
+    которые поддерживают его при любой записи в таблицу:
+    tsvector с GIN-индексом на PostgreSQL и FTS5 на SQLite.
+    """
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(POSTGRESQL_SEARCH_SQL.format(
+                config=settings.TITLE_SEARCH_CONFIG))
+        elif connection.vendor == 'sqlite':
+            for sql in SQLITE_SEARCH_SQL:
+                cursor.execute(sql)
+
+
+def search_titles(queryset, value, vendor):
+    """
+    Отбирает произведения по словам из названия и описания
+    и упорядочивает их по релевантности (поле search_rank).
+    """
+
+    if vendor == 'postgresql':
+        query = SearchQuery(
+            value, config=settings.TITLE_SEARCH_CONFIG,
+            search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', 'id')
+    words = re.findall(r'\w+', value)
+    if not words:
+        return queryset.none()
+    query = ' '.join(f'"{get_prefix(word)}"*' for word in words)
+    return queryset.filter(
+        pk__in=RawSQL(SQLITE_MATCH_SQL, (query,))
+    ).annotate(
+        search_rank=RawSQL(SQLITE_RANK_SQL, (query,),
+                           output_field=FloatField())
+    ).order_by('-search_rank', 'id')
@@ -0,0 +1,190 @@
+from django.core.signals import request_finished
+from django.db import connections, transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (Category, Comment, Genre, GenreTitle, Review, Title,
+                     Tombstone, deleting_reviews, deleting_titles,
+                     reviews_bulk_changed)
+from .search import install_search_index
+from .stats import (rebuild_title_stats, record_score, record_score_change,
+                    refresh_leaderboards)
+from .tombstones import install_tombstone_triggers
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw, **kwargs):
+    """
+    Пересчитывает хранимый рейтинг, распределение оценок и рейтинги
+    лидеров произведения после записи отзыва и обновляет отметку
+    времени изменения произведения. Обновление рейтинга блокирует
+    строку произведения до конца транзакции, поэтому отзывы на одно
+    произведение обновляют статистику по очереди.
+    """
+
+    if raw:
+        return
+    loaded_score = getattr(instance, '_loaded_score', None)
+    loaded_title_id = getattr(instance, '_loaded_title_id', None)
+    titles = Title.objects.filter(pk=instance.title_id)
+    now = timezone.now()
+    with transaction.atomic():
+        if created:
+            titles.add_score(instance.score, updated_at=now)
+            record_score(instance.title_id, instance.score,
+                         instance.pub_date, 1)
+            refresh_leaderboards([instance.title_id])
+        elif loaded_score is None or loaded_title_id != instance.title_id:
+            title_ids = {instance.title_id, loaded_title_id}
+            Title.objects.filter(
+                pk__in=title_ids).refresh_ratings(updated_at=now)
+            rebuild_title_stats(title_ids)
+        elif loaded_score != instance.score:
+            titles.change_score(instance.score - loaded_score,
+                                updated_at=now)
+            record_score_change(instance.title_id, loaded_score,
+                                instance.score, instance.pub_date)
+            refresh_leaderboards([instance.title_id])
+        else:
+            titles.touch()
+    instance.remember_score()
+
+
+@receiver(pre_delete, sender=Review)
+def mark_review_deleting(sender, instance, **kwargs):
+    deleting_reviews.set(deleting_reviews.get() | {instance.pk})
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """Исключает оценку удаленного отзыва из рейтинга произведения."""
+
+    deleting_reviews.set(deleting_reviews.get() - {instance.pk})
+    if instance.title_id in deleting_titles.get():
+        return
+    titles = Title.objects.filter(pk=instance.title_id)
+    loaded_score = getattr(instance, '_loaded_score', None)
+    with transaction.atomic():
+        if loaded_score is None:
+            titles.refresh_ratings(updated_at=timezone.now())
+            rebuild_title_stats([instance.title_id])
+        else:
+            titles.remove_score(loaded_score, updated_at=timezone.now())
+            record_score(instance.title_id, loaded_score,
+                         instance.pub_date, -1)
+            refresh_leaderboards([instance.title_id])
+
+
+@receiver(reviews_bulk_changed)
+def update_rating_on_bulk_change(sender, title_ids, **kwargs):
+    """Пересчитывает рейтинг произведений после массовых операций."""
+
+    titles = Title.objects.all()
+    if title_ids is not None:
+        titles = titles.filter(pk__in=title_ids)
+    with transaction.atomic():
+        titles.refresh_ratings(updated_at=timezone.now())
+        rebuild_title_stats(title_ids)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_review(sender, instance, raw=False, **kwargs):
+    """
+    Изменение комментариев обновляет отметку времени отзыва.
+    При каскадном удалении вместе с отзывом обновлять нечего.
+    """
+
+    if not raw and instance.review_id not in deleting_reviews.get():
+        Review.objects.filter(pk=instance.review_id).update(
+            updated_at=timezone.now())
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def touch_genre_title(sender, instance, raw=False, **kwargs):
+    if not raw and instance.title_id not in deleting_titles.get():
+        Title.objects.filter(pk=instance.title_id).touch()
+        refresh_leaderboards([instance.title_id])
+
+
+@receiver(pre_delete, sender=Title)
+def mark_title_deleting(sender, instance, **kwargs):
+    deleting_titles.set(deleting_titles.get() | {instance.pk})
+
+
+@receiver(post_delete, sender=Title)
+def unmark_title_deleting(sender, instance, **kwargs):
+    deleting_titles.set(deleting_titles.get() - {instance.pk})
+
+
+@receiver(request_finished)
+def clear_deleting(sender, **kwargs):
+    """
+    Отметки, оставшиеся после удаления, начатого с другой модели
+    (например, пользователя) и прерванного ошибкой, не переходят
+    в следующий запрос потока.
+    """
+
+    deleting_reviews.set(frozenset())
+    deleting_titles.set(frozenset())
+
+
+@receiver(post_save, sender=Title)
+def update_title_leaderboards(sender, instance, created, raw, **kwargs):
+    """Смена категории переносит произведение в другие рейтинги."""
+
+    if not created and not raw:
+        refresh_leaderboards([instance.pk])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_title_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    """Изменение жанров произведения обновляет его отметку времени."""
+
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        Title.objects.filter(pk=instance.pk).touch()
+        refresh_leaderboards([instance.pk])
+    elif pk_set:
+        Title.objects.filter(pk__in=pk_set).touch()
+        refresh_leaderboards(pk_set)
+
+
+@receiver(post_save, sender=Genre)
+def touch_genre_titles(sender, instance, created, raw, **kwargs):
+    if not created and not raw:
+        Title.objects.filter(genre=instance).touch()
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_category_titles(sender, instance, created=False, raw=False,
+                          **kwargs):
+    """Изменение категории или жанра меняет представление произведений."""
+
+    if not created and not raw:
+        Title.objects.filter(category=instance).touch()
+
+
+@receiver(post_migrate)
+def create_search_index(sender, app_config, using, **kwargs):
+    """Создает полнотекстовый индекс после создания таблиц."""
+
+    connection = connections[using]
+    if (app_config.name == 'reviews' and Title._meta.db_table
+            in connection.introspection.table_names()):
+        install_search_index(connection)
+
+
+@receiver(post_migrate)
+def create_tombstone_triggers(sender, app_config, using, **kwargs):
+    """Создает триггеры ленты изменений после создания таблиц."""
+
+    connection = connections[using]
+    if (app_config.name == 'reviews' and Tombstone._meta.db_table
+            in connection.introspection.table_names()):
+        install_tombstone_triggers(connection)
@@ -0,0 +1,246 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import LeaderboardEntry, Review, Title, TitleActivity, TitleScore
+
+# Допустимые оценки отзыва (см. ReviewSerializer.validate_score).
+SCORES = range(0, 11)
+
+# Строки рейтингов лидеров для всего каталога, категории, жанра
+# и их сочетания. base — произведения с отзывами за период.
+# Тип NULL указан явно: иначе PostgreSQL выведет для него text.
+LEADERBOARD_SQL = """
+    WITH base (period, title_id, category_id, review_count, score_sum)
+    AS ({base})
+    INSERT INTO reviews_leaderboardentry
+        (period, title_id, category_id, genre_id, review_count, score_sum,
+         value)
+    SELECT period, title_id, category_id, genre_id, review_count, score_sum,
+           (%s + score_sum) * 1.0 / (%s + review_count)
+    FROM (
+        SELECT period, title_id, CAST(NULL AS INTEGER) AS category_id,
+               CAST(NULL AS INTEGER) AS genre_id, review_count, score_sum
+        FROM base
+        UNION ALL
+        SELECT period, title_id, category_id, CAST(NULL AS INTEGER),
+               review_count, score_sum
+        FROM base WHERE category_id IS NOT NULL
+        UNION ALL
+        SELECT base.period, base.title_id, CAST(NULL AS INTEGER),
+               genre.genre_id,
+               base.review_count, base.score_sum
+        FROM base
+        JOIN reviews_genretitle genre ON genre.title_id = base.title_id
+        UNION ALL
+        SELECT base.period, base.title_id, base.category_id, genre.genre_id,
+               base.review_count, base.score_sum
+        FROM base
+        JOIN reviews_genretitle genre ON genre.title_id = base.title_id
+        WHERE base.category_id IS NOT NULL
+    ) scoped
+"""
+
+
+def get_period_start(days, today=None):
+    """Первый день периода из days дней, заканчивающегося сегодня."""
+
+    today = today or timezone.localdate()
+    return today - timedelta(days=days - 1)
+
+
+def get_activity_start():
+    """Дни раньше этого не входят ни в один период рейтингов."""
+
+    days = [days for days in settings.LEADERBOARD_PERIODS.values() if days]
+    return get_period_start(max(days)) if days else None
+
+
+def add_counts(model, lookup, **deltas):
+    """
+    Прибавляет deltas к строке агрегата, создавая ее при первом
+    увеличении. Вызывается под блокировкой строки произведения.
+    """
+
+    updated = model.objects.filter(**lookup).update(
+        **{name: F(name) + delta for name, delta in deltas.items()})
+    if not updated and min(deltas.values()) > 0:
+        model.objects.create(**lookup, **deltas)
+
+
+def record_score(title_id, score, pub_date, sign):
+    """
+    Учитывает в распределении оценок и отзывах за день появление
+    (sign=1) или исчезновение (sign=-1) отзыва с оценкой score.
+    """
+
+    add_counts(TitleScore, {'title_id': title_id, 'score': score},
+               count=sign)
+    day = timezone.localdate(pub_date)
+    start = get_activity_start()
+    if start is not None and day >= start:
+        add_counts(TitleActivity, {'title_id': title_id, 'day': day},
+                   review_count=sign, score_sum=sign * score)
+
+
+def record_score_change(title_id, old_score, new_score, pub_date):
+    """Учитывает изменение оценки отзыва с old_score на new_score."""
+
+    add_counts(TitleScore, {'title_id': title_id, 'score': old_score},
+               count=-1)
+    add_counts(TitleScore, {'title_id': title_id, 'score': new_score},
+               count=1)
+    day = timezone.localdate(pub_date)
+    start = get_activity_start()
+    if start is not None and day >= start:
+        TitleActivity.objects.filter(title_id=title_id, day=day).update(
+            score_sum=F('score_sum') + new_score - old_score)
+
+
+def execute(model, sql, params=()):
+    connection = connections[router.db_for_write(model)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def insert_from(model, columns, queryset):
+    """Вставляет в таблицу model строки, выбранные queryset."""
+
+    sql, params = queryset.query.sql_with_params()
+    execute(model, 'INSERT INTO {} ({}) {}'.format(
+        model._meta.db_table, ', '.join(columns), sql), params)
+
+
+def delete_rows(model, title_ids=None, **lookup):
+    """
+    Удаляет строки агрегата одним запросом, без загрузки объектов,
+    которую вызвали бы обработчики сигналов удаления.
+    """
+
+    queryset = model.objects.filter(**lookup)
+    if title_ids is not None:
+        queryset = queryset.filter(title_id__in=title_ids)
+    sql, params = queryset.values('pk').query.sql_with_params()
+    execute(model, f'DELETE FROM {model._meta.db_table} WHERE id IN ({sql})',
+            params)
+
+
+def get_period_base(period, days, title_ids=None):
+    """Произведения с количеством и суммой оценок за период."""
+
+    if days is None:
+        queryset = Title.objects.filter(review_count__gt=0).values_list(
+            'id', 'category_id', 'review_count', 'score_sum')
+        if title_ids is not None:
+            queryset = queryset.filter(pk__in=title_ids)
+    else:
+        queryset = TitleActivity.objects.filter(
+            day__gte=get_period_start(days)
+        ).values('title_id', 'title__category_id').annotate(
+            reviews=Sum('review_count'), scores=Sum('score_sum')
+        ).filter(reviews__gt=0)
+        if title_ids is not None:
+            queryset = queryset.filter(title_id__in=title_ids)
+    sql, params = queryset.order_by().query.sql_with_params()
+    return (f'SELECT %s, period_base.* FROM ({sql}) period_base',
+            (period, *params))
+
+
+def refresh_leaderboards(title_ids=None, periods=None):
+    """
+    Перестраивает места произведений title_ids (None — всех)
+    в рейтингах лидеров за периоды periods (None — за все).
+    Оценка в рейтинге — среднее, сглаженное к LEADERBOARD_PRIOR_MEAN
+    весом LEADERBOARD_PRIOR_WEIGHT отзывов: одна высокая оценка
+    не поднимает произведение выше многих.
+    """
+
+    periods = {
+        period: days
+        for period, days in settings.LEADERBOARD_PERIODS.items()
+        if periods is None or period in periods
+    }
+    delete_rows(LeaderboardEntry, title_ids, period__in=list(periods))
+    parts = [get_period_base(period, days, title_ids)
+             for period, days in periods.items()]
+    base = ' UNION ALL '.join(sql for sql, params in parts)
+    params = [param for sql, params in parts for param in params]
+    weight = settings.LEADERBOARD_PRIOR_WEIGHT
+    execute(LeaderboardEntry, LEADERBOARD_SQL.format(base=base), (
+        *params, weight * settings.LEADERBOARD_PRIOR_MEAN, weight))
+
+
+def rebuild_title_stats(title_ids=None):
+    """
+    Пересчитывает распределение оценок, отзывы за дни периодов
+    и рейтинги лидеров произведений title_ids (None — всех)
+    по таблице отзывов.
+    """
+
+    reviews = Review.objects.order_by()
+    if title_ids is not None:
+        title_ids = [pk for pk in title_ids if pk is not None]
+        reviews = reviews.filter(title_id__in=title_ids)
+    delete_rows(TitleScore, title_ids)
+    insert_from(
+        TitleScore, ('title_id', 'score', 'count'),
+        reviews.values('title_id', 'score').annotate(value=Count('id')))
+    delete_rows(TitleActivity, title_ids)
+    start = get_activity_start()
+    if start is not None:
+        insert_from(
+            TitleActivity, ('title_id', 'day', 'review_count', 'score_sum'),
+            reviews.filter(pub_date__gte=timezone.make_aware(
+                datetime.combine(start, time.min))
+            ).annotate(day=TruncDate('pub_date')).values(
+                'title_id', 'day'
+            ).annotate(reviews=Count('id'), scores=Sum('score')))
+    refresh_leaderboards(title_ids)
+
+
+def expire_activity():
+    """
+    Убирает из рейтингов за периоды отзывы, вышедшие за их границы.
+    Запускается раз в сутки командой refresh_leaderboards.
+    """
+
+    start = get_activity_start()
+    if start is not None:
+        delete_rows(TitleActivity, day__lt=start)
+    refresh_leaderboards(periods=[
+        period for period, days in settings.LEADERBOARD_PERIODS.items()
+        if days])
+
+
+def get_nth_score(counts, number):
+    """Оценка отзыва с порядковым номером number (с нуля) по возрастанию."""
+
+    seen = 0
+    for score in sorted(counts):
+        seen += counts[score]
+        if seen > number:
+            return score
+    return None
+
+
+def summarize_scores(counts):
+    """
+    Количество, среднее и медиана оценок по распределению
+    counts: {оценка: количество отзывов}.
+    """
+
+    total = sum(counts.values())
+    if not total:
+        return {'count': 0, 'mean': None, 'median': None}
+    median = (get_nth_score(counts, (total - 1) // 2)
+              + get_nth_score(counts, total // 2)) / 2
+    return {
+        'count': total,
+        'mean': round(sum(
+            score * count for score, count in counts.items()) / total, 2),
+        'median': median,
+    }
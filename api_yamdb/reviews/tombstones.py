@@ -0,0 +1,53 @@
+from .models import Category, Comment, Genre, Review, Title, Tombstone
+
+# Модели ленты изменений: их удаление записывается в Tombstone.
+CHANGE_FEED_MODELS = (Title, Review, Comment, Genre, Category)
+
+# Отметки пишет триггер на уровне оператора: каскадное удаление тысяч
+# комментариев добавляет одну вставку из переходной таблицы, а не
+# запрос на каждую строку.
+POSTGRESQL_TOMBSTONE_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION reviews_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO {tombstones} (model, object_id, deleted_at)
+    SELECT TG_ARGV[0], id, clock_timestamp() FROM deleted_rows;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+POSTGRESQL_TOMBSTONE_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS {table}_tombstone ON {table};
+CREATE TRIGGER {table}_tombstone AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS deleted_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE reviews_tombstone('{model}');
+"""
+
+SQLITE_TOMBSTONE_TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS {table}_tombstone AFTER DELETE ON {table} BEGIN
+    INSERT INTO {tombstones} (model, object_id, deleted_at)
+    VALUES ('{model}', old.id, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+END
+"""
+
+
+def install_tombstone_triggers(connection):
+    """
+    Создает триггеры, которые записывают в Tombstone любое удаление
+    объектов CHANGE_FEED_MODELS, в том числе каскадное и массовое.
+    """
+
+    tombstones = Tombstone._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(POSTGRESQL_TOMBSTONE_FUNCTION_SQL.format(
+                tombstones=tombstones))
+            template = POSTGRESQL_TOMBSTONE_TRIGGER_SQL
+        elif connection.vendor == 'sqlite':
+            template = SQLITE_TOMBSTONE_TRIGGER_SQL
+        else:
+            return
+        for model in CHANGE_FEED_MODELS:
+            cursor.execute(template.format(
+                table=model._meta.db_table, model=model._meta.model_name,
+                tombstones=tombstones))
@@ -1,5 +1,17 @@
 from django.contrib import admin
 
-from .models import User
+from .models import OutboxMessage, User
 
 admin.site.register(User)
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'subject',
+        'recipients',
+        'created_at',
+        'attempts',
+        'sent_at',
+    )
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management import BaseCommand
+
+from users.outbox import get_outbox_metrics, send_pending
+
+
+class Command(BaseCommand):
+    """Фоновая отправка писем из очереди."""
+
+    help = """
+    Отправляет письма из очереди пачками через одно соединение
+    с почтовым сервером. Неудачные попытки повторяются с
+    экспоненциальной задержкой. С --loop работает как постоянный
+    обработчик очереди."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Количество писем в одной пачке.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, ожидая новые письма.')
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза между проверками пустой очереди, сек.')
+        parser.add_argument(
+            '--metrics', action='store_true',
+            help='Вывести глубину очереди и задержку доставки.')
+
+    def handle(self, *args, **options):
+        if options['metrics']:
+            for name, value in get_outbox_metrics().items():
+                self.stdout.write(f'{name} {value}')
+            return
+        while True:
+            sent, failed = send_pending(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(
+                    f'Отправлено писем: {sent}, отложено: {failed}.')
+                continue
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
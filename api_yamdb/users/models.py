@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -49,3 +50,35 @@ class User(AbstractUser):
     @property
     def is_user(self):
         return self.role == User.USER
+
+
+class OutboxMessage(models.Model):
+    """
+    Письмо, ожидающее отправки фоновым обработчиком (send_outbox).
+    Запрос только сохраняет письмо и не ждет почтового сервера.
+    """
+
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipients = models.JSONField('Получатели')
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(sent_at__isnull=True),
+                name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return self.subject
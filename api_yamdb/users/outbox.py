@@ -0,0 +1,146 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+def enqueue_mail(subject, body, from_email, recipients):
+    """Ставит письмо в очередь на отправку."""
+
+    return OutboxMessage.objects.create(
+        subject=subject, body=body, from_email=from_email,
+        recipients=list(recipients))
+
+
+def get_retry_delay(attempts):
+    """Экспоненциальная задержка перед следующей попыткой."""
+
+    return timedelta(
+        seconds=settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def claim_pending(batch_size):
+    """
+    Забирает пачку писем, срок отправки которых наступил, в короткой
+    транзакции. Строки блокируются с SKIP LOCKED, попытка засчитывается
+    сразу, а следующая попытка переносится на OUTBOX_LEASE секунд:
+    пока письма отправляются, другие обработчики их не возьмут, а письма
+    упавшего обработчика будут отправлены повторно.
+    """
+
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(sent_at__isnull=True,
+                    next_attempt_at__lte=timezone.now(),
+                    attempts__lt=settings.OUTBOX_MAX_ATTEMPTS)
+            .order_by('next_attempt_at', 'id')[:batch_size])
+        if messages:
+            OutboxMessage.objects.filter(
+                pk__in=[message.pk for message in messages]
+            ).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=timezone.now() + timedelta(
+                    seconds=settings.OUTBOX_LEASE))
+    for message in messages:
+        message.attempts += 1
+    return messages
+
+
+def defer(message, error):
+    """Откладывает письмо после ошибки с экспоненциальной задержкой."""
+
+    message.last_error = repr(error)
+    message.next_attempt_at = (
+        timezone.now() + get_retry_delay(message.attempts))
+
+
+def deliver(messages, connection):
+    """Отправляет письма через открытое соединение."""
+
+    sent = 0
+    for message in messages:
+        try:
+            EmailMessage(
+                message.subject, message.body, message.from_email,
+                message.recipients, connection=connection).send()
+        except Exception as error:
+            defer(message, error)
+        else:
+            message.sent_at = timezone.now()
+            message.last_error = ''
+            sent += 1
+    return sent
+
+
+def send_pending(batch_size=None, connection=None):
+    """
+    Отправляет одну пачку писем, срок отправки которых наступил.
+    Все письма пачки уходят через одно соединение с почтовым сервером,
+    открытое вне транзакции БД. Если соединение открыть не удалось,
+    откладываются все письма пачки.
+    Возвращает число отправленных и отложенных писем.
+    """
+
+    messages = claim_pending(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not messages:
+        return 0, 0
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for message in messages:
+            defer(message, error)
+        sent = 0
+    else:
+        try:
+            sent = deliver(messages, connection)
+        finally:
+            connection.close()
+    OutboxMessage.objects.bulk_update(
+        messages, ['last_error', 'next_attempt_at', 'sent_at'])
+    return sent, len(messages) - sent
+
+
+def get_outbox_metrics(window=timedelta(hours=1)):
+    """
+    Глубина очереди и задержка доставки писем за последний период.
+    Задержка считается от постановки в очередь до отправки, в секундах.
+    """
+
+    now = timezone.now()
+    queue = OutboxMessage.objects.filter(sent_at__isnull=True).aggregate(
+        pending=Count(
+            'id', filter=Q(attempts__lt=settings.OUTBOX_MAX_ATTEMPTS)),
+        failed=Count(
+            'id', filter=Q(attempts__gte=settings.OUTBOX_MAX_ATTEMPTS)),
+        oldest=Min(
+            'created_at',
+            filter=Q(attempts__lt=settings.OUTBOX_MAX_ATTEMPTS)),
+    )
+    delivered = OutboxMessage.objects.filter(
+        sent_at__gte=now - window
+    ).aggregate(
+        sent=Count('id'),
+        latency_avg=Avg(F('sent_at') - F('created_at')),
+        latency_max=Max(F('sent_at') - F('created_at')),
+    )
+    return {
+        'pending': queue['pending'],
+        'failed': queue['failed'],
+        'oldest_pending_age': (
+            (now - queue['oldest']).total_seconds()
+            if queue['oldest'] else 0.0),
+        'sent': delivered['sent'],
+        'latency_avg': (
+            delivered['latency_avg'].total_seconds()
+            if delivered['latency_avg'] else 0.0),
+        'latency_max': (
+            delivered['latency_max'].total_seconds()
+            if delivered['latency_max'] else 0.0),
+    }
@@ -0,0 +1,32 @@
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(ROOT_DIR, 'api_yamdb')
+
+
+def get_sqlite_env(name):
+    """Переменные окружения проекта для локальной SQLite без кэш-сервера."""
+
+    return {
+        'DB_ENGINE': 'django.db.backends.sqlite3',
+        'DB_NAME': name,
+        'CACHE_BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'DJANGO_SETTINGS_MODULE': 'api_yamdb.settings',
+    }
+
+
+def setup_django(env=None):
+    """Настраивает Django в текущем процессе и создает таблицы."""
+
+    for path in (PROJECT_DIR, ROOT_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    os.environ.update(env or {})
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command('migrate', run_syncdb=True, verbosity=0)
@@ -0,0 +1,24 @@
+"""
+Конфигурация gunicorn для нагрузочного теста с --db-latency.
+LOADTEST_DB_LATENCY добавляет к каждому SQL-запросу паузу, мс,
+как сетевая задержка до отдельного сервера БД.
+"""
+import os
+import time
+
+
+def post_worker_init(worker):
+    from django.db.backends.signals import connection_created
+
+    latency = float(os.getenv('LOADTEST_DB_LATENCY', 0)) / 1000
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def install(connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, delay)
+
+    if latency:
+        connection_created.connect(install, weak=False)
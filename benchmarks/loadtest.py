@@ -0,0 +1,392 @@
+"""
+Нагрузочный тест всего стека: gunicorn + api_yamdb.wsgi:application.
+
+    python benchmarks/loadtest.py --workers 4 --concurrency 32 --duration 30
+    python benchmarks/loadtest.py --asgi --workers 4 --concurrency 32
+
+Скрипт создает локальную SQLite (или использует БД из окружения
+с --env-db), наполняет ее командой generate_dataset, запускает
+gunicorn (с --asgi — api_yamdb.asgi под воркерами uvicorn)
+и воспроизводит смесь запросов. Для каждого шаблона адреса
+из api/urls.py выводятся пропускная способность и задержки
+p50/p95/p99.
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from environment import PROJECT_DIR, get_sqlite_env, setup_django
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Границы корзин гистограммы задержек, мс.
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+DEFAULT_MIX = 'browse=50,filter=25,review=10,comments=15'
+
+# Отзывы для веток комментариев берутся с начала таблицы, где
+# generate_dataset размещает отзывы популярных произведений.
+REVIEWS_SAMPLE = 10000
+
+
+def seed(titles, users, token_lifetime):
+    """
+    Наполняет пустую БД командой generate_dataset: отзывы и комментарии
+    распределены неравномерно, как в продакшене.
+    Возвращает данные, нужные сценариям: ключи объектов и JWT.
+    """
+
+    from django.core.management import call_command
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from reviews.models import Category, Genre, Review, Title, User
+
+    if not Title.objects.exists():
+        call_command(
+            'generate_dataset', users=users, titles=titles, categories=20,
+            genres=40, reviews=titles * 5, comments=titles * 5, seed=0,
+            stdout=io.StringIO())
+
+    tokens = []
+    for user in User.objects.filter(role=User.USER)[:users]:
+        token = AccessToken.for_user(user)
+        token.set_exp(lifetime=token_lifetime)
+        tokens.append(str(token))
+    return {
+        'title_ids': list(Title.objects.values_list('pk', flat=True)),
+        'reviews': list(
+            Review.objects.order_by('id').values_list('title_id', 'pk')[
+                :REVIEWS_SAMPLE]),
+        'genres': list(Genre.objects.values_list('slug', flat=True)),
+        'categories': list(Category.objects.values_list('slug', flat=True)),
+        'tokens': tokens,
+    }
+
+
+def browse(rng, data):
+    yield 'GET', f'/api/v1/titles/?limit=20&offset={rng.randint(0, 200)}'
+    yield 'GET', f'/api/v1/titles/{rng.choice(data["title_ids"])}/'
+
+
+def filtered(rng, data):
+    genres = rng.sample(data['genres'], 2)
+    yield 'GET', f'/api/v1/titles/?genre={",".join(genres)}&limit=20'
+    yield 'GET', (f'/api/v1/titles/?category={rng.choice(data["categories"])}'
+                  f'&year={rng.randint(1950, 2019)}')
+    yield 'GET', '/api/v1/genres/'
+    yield 'GET', '/api/v1/categories/'
+
+
+def post_review(rng, data):
+    yield 'POST', (
+        f'/api/v1/titles/{rng.choice(data["title_ids"])}/reviews/',
+        {'text': 'Отзыв под нагрузкой', 'score': rng.randint(1, 10)})
+
+
+def comments(rng, data):
+    title_id, review_id = rng.choice(data['reviews'])
+    yield 'GET', f'/api/v1/titles/{title_id}/reviews/'
+    path = f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    yield 'GET', path
+    yield 'POST', (path, {'text': 'Комментарий под нагрузкой'})
+
+
+SCENARIOS = {
+    'browse': browse,
+    'filter': filtered,
+    'review': post_review,
+    'comments': comments,
+}
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, weight = item.split('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f'Неизвестный сценарий {name}')
+        mix[name] = int(weight)
+    return mix
+
+
+class RoutePatterns:
+    """Шаблон адреса из urls.py для пути запроса."""
+
+    def __init__(self):
+        self.patterns = {}
+
+    def __call__(self, path):
+        from django.urls import Resolver404, resolve
+
+        path = path.split('?')[0]
+        if path not in self.patterns:
+            try:
+                route = resolve(path).route
+            except Resolver404:
+                route = path
+            route = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'{\1}', route)
+            self.patterns[path] = '/' + route.replace('^', '').replace(
+                '$', '')
+        return self.patterns[path]
+
+
+class Recorder:
+    """Потокобезопасный сбор задержек и статусов по шаблонам адресов."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def add(self, route, method, status, latency):
+        key = f'{method} {route}'
+        with self.lock:
+            self.latencies[key].append(latency)
+            self.statuses[key][status] += 1
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+
+    index = max(0, min(len(values) - 1, round(share * len(values)) - 1))
+    return values[index]
+
+
+def histogram(values):
+    counts = Counter()
+    for value in values:
+        bucket = next(
+            (str(edge) for edge in HISTOGRAM_BUCKETS if value <= edge), 'inf')
+        counts[bucket] += 1
+    return {str(edge): counts[str(edge)]
+            for edge in (*HISTOGRAM_BUCKETS, 'inf')}
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    for key, latencies in sorted(recorder.latencies.items()):
+        latencies = sorted(latencies)
+        statuses = recorder.statuses[key]
+        routes[key] = {
+            'requests': len(latencies),
+            'errors': sum(count for status, count in statuses.items()
+                          if status == 'error' or int(status) >= 500),
+            'rps': round(len(latencies) / elapsed, 2),
+            'p50': round(percentile(latencies, 0.50), 2),
+            'p95': round(percentile(latencies, 0.95), 2),
+            'p99': round(percentile(latencies, 0.99), 2),
+            'max': round(latencies[-1], 2),
+            'statuses': {str(status): count
+                         for status, count in sorted(
+                             statuses.items(), key=lambda item: str(item[0]))},
+            'histogram_ms': histogram(latencies),
+        }
+    total = sum(route['requests'] for route in routes.values())
+    return {
+        'elapsed': round(elapsed, 2),
+        'requests': total,
+        'rps': round(total / elapsed, 2),
+        'errors': sum(route['errors'] for route in routes.values()),
+        'routes': routes,
+    }
+
+
+def worker(port, data, mix, deadline, recorder, seed_value, route_pattern):
+    """Поток нагрузки: выбирает сценарии по весам и выполняет их запросы."""
+
+    rng = random.Random(seed_value)
+    names, weights = zip(*mix.items())
+    token = rng.choice(data['tokens'])
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.monotonic() < deadline:
+        scenario = SCENARIOS[rng.choices(names, weights)[0]]
+        for method, request in scenario(rng, data):
+            path, body = request if method == 'POST' else (request, None)
+            headers = {'Accept': 'application/json'}
+            if body is not None:
+                body = json.dumps(body)
+                headers['Content-Type'] = 'application/json'
+                headers['Authorization'] = f'Bearer {token}'
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                status = 'error'
+            latency = (time.perf_counter() - started) * 1000
+            recorder.add(route_pattern(path), method, status, latency)
+    connection.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(args, env, port):
+    command = [
+        sys.executable, '-c', 'from gunicorn.app.wsgiapp import run; run()',
+        'api_yamdb.asgi:application' if args.asgi
+        else 'api_yamdb.wsgi:application',
+        '--bind', f'127.0.0.1:{port}',
+        '--workers', str(args.workers),
+        '--threads', str(args.threads),
+        '--worker-class', args.worker_class,
+        '--log-level', 'warning',
+        *args.gunicorn_args.split(),
+    ]
+    if args.db_latency:
+        command += ['--config', os.path.join(BENCHMARKS_DIR,
+                                             'gunicorn_hooks.py')]
+        env = {**env, 'LOADTEST_DB_LATENCY': str(args.db_latency)}
+    server = subprocess.Popen(
+        command, cwd=PROJECT_DIR, env={**os.environ, **env})
+    started = time.monotonic()
+    while time.monotonic() - started < 30:
+        if server.poll() is not None:
+            raise RuntimeError('gunicorn завершился при запуске')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('gunicorn не ответил за 30 секунд')
+
+
+def run_load(port, data, mix, duration, concurrency, route_pattern):
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(port, data, mix, deadline, recorder, number,
+                  route_pattern))
+        for number in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.monotonic() - started
+
+
+def print_report(report):
+    print(f'{"Маршрут":<62} {"запр.":>7} {"ош.":>5} {"rps":>8} '
+          f'{"p50":>8} {"p95":>8} {"p99":>8}')
+    for route, stats in report['routes'].items():
+        print(f'{route:<62} {stats["requests"]:>7} {stats["errors"]:>5} '
+              f'{stats["rps"]:>8} {stats["p50"]:>8} {stats["p95"]:>8} '
+              f'{stats["p99"]:>8}')
+    print(f'Всего: {report["requests"]} запросов за {report["elapsed"]} с, '
+          f'{report["rps"]} rps, ошибок: {report["errors"]}')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--workers', type=int, default=2,
+                        help='Количество воркеров gunicorn.')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='Потоков в каждом воркере gunicorn.')
+    parser.add_argument('--worker-class',
+                        help='Класс воркеров gunicorn, по умолчанию sync '
+                             '(uvicorn с --asgi).')
+    parser.add_argument('--asgi', action='store_true',
+                        help='Запустить api_yamdb.asgi вместо WSGI.')
+    parser.add_argument('--gunicorn-args', default='',
+                        help='Дополнительные аргументы gunicorn.')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='Количество одновременных клиентов.')
+    parser.add_argument('--duration', type=float, default=20,
+                        help='Длительность замера, сек.')
+    parser.add_argument('--warmup', type=float, default=3,
+                        help='Прогрев перед замером, сек.')
+    parser.add_argument('--db-latency', type=float, default=0,
+                        help='Задержка каждого SQL-запроса, мс: имитирует '
+                             'сеть до отдельного сервера БД.')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help=f'Веса сценариев, по умолчанию {DEFAULT_MIX}.')
+    parser.add_argument('--titles', type=int, default=2000,
+                        help='Количество произведений в тестовой БД.')
+    parser.add_argument('--users', type=int, default=200,
+                        help='Количество пользователей с JWT.')
+    parser.add_argument('--env-db', action='store_true',
+                        help='Использовать БД и кэш из окружения.')
+    parser.add_argument('--output', help='Файл для отчета в формате JSON.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if isinstance(args.mix, str):
+        args.mix = parse_mix(args.mix)
+    if args.worker_class is None:
+        args.worker_class = ('uvicorn.workers.UvicornWorker' if args.asgi
+                             else 'sync')
+    env = {}
+    if not args.env_db:
+        directory = tempfile.mkdtemp(prefix='yamdb-loadtest-')
+        env = get_sqlite_env(os.path.join(directory, 'db.sqlite3'))
+    setup_django(env)
+
+    from django.db import connection, connections
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+    data = seed(args.titles, args.users,
+                timedelta(seconds=args.warmup + args.duration + 600))
+    connections.close_all()
+
+    port = free_port()
+    server = start_gunicorn(args, env, port)
+    route_pattern = RoutePatterns()
+    try:
+        if args.warmup:
+            run_load(port, data, args.mix, args.warmup, args.concurrency,
+                     route_pattern)
+        recorder, elapsed = run_load(
+            port, data, args.mix, args.duration, args.concurrency,
+            route_pattern)
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = summarize(recorder, elapsed)
+    report['config'] = {
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': args.worker_class,
+        'asgi': args.asgi,
+        'db_latency': args.db_latency,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'mix': args.mix,
+        'database': connection.vendor,
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Запуск микробенчмарков на SQLite в памяти, без сети и внешних сервисов.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --compare benchmarks/baseline.json
+
+В режиме сравнения скрипт завершается с кодом 1, если какой-либо
+бенчмарк замедлился больше допустимого порога.
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+
+from environment import get_sqlite_env, setup_django
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--output', help='Файл для результатов в формате JSON.')
+    parser.add_argument(
+        '--compare', help='Файл базовых результатов для сравнения.')
+    parser.add_argument(
+        '--threshold', type=float, default=0.2,
+        help='Допустимое замедление, доля (0.2 = 20%%).')
+    parser.add_argument(
+        '--sizes', default='1000,10000',
+        help='Размеры выборки для сериализатора произведений.')
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='Количество замеров каждого бенчмарка.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    setup_django(get_sqlite_env(':memory:'))
+
+    import django
+
+    from benchmarks.suite import compare, run_suite
+
+    sizes = tuple(int(size) for size in args.sizes.split(','))
+    report = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'machine': platform.machine(),
+            'database': 'sqlite3 :memory:',
+        },
+        'benchmarks': run_suite(sizes, args.repeat, stdout=sys.stdout),
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+    if not args.compare:
+        return 0
+    with open(args.compare, encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)['benchmarks']
+    regressions = compare(report['benchmarks'], baseline, args.threshold)
+    for regression in regressions:
+        print('Замедление {name}: {baseline:.4f} -> {current:.4f} ms '
+              '({change:+.1%})'.format(**regression))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Микробенчмарки сериализаторов, фильтров и разрешений API.
+Функции модуля работают с уже настроенным Django и текущей БД;
+запуск из командной строки описан в benchmarks/run.py.
+"""
+import statistics
+import time
+from types import SimpleNamespace
+
+SIZES = (1000, 10000)
+
+METHODS = ('get', 'post', 'patch', 'delete')
+
+
+def seed(size):
+    """Создает size произведений с жанрами, категориями и пользователями."""
+
+    from reviews.models import (Category, Genre, GenreTitle, Review, Title,
+                                User)
+
+    # SQLite не возвращает ключи из bulk_create, поэтому объекты
+    # перечитываются из БД.
+    Category.objects.bulk_create(
+        Category(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(20))
+    categories = list(Category.objects.order_by('id'))
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(50))
+    genres = list(Genre.objects.order_by('id'))
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=1950 + i % 70,
+              description='Описание произведения ' * 5,
+              category=categories[i % len(categories)])
+        for i in range(size))
+    titles = list(Title.objects.order_by('id').only('id'))
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title=title, genre=genres[(i + shift) % len(genres)])
+        for i, title in enumerate(titles) for shift in (0, 7))
+    users = {
+        role: User.objects.create(
+            username=f'bench-{role}', email=f'bench-{role}@yamdb.fake',
+            role=role)
+        for role in (User.USER, User.MODERATOR, User.ADMIN)
+    }
+    Review.objects.create(
+        title=titles[0], author=users[User.USER], text='Отзыв', score=8)
+    return users
+
+
+def measure(func, repeat, number):
+    """Время одного вызова func в миллисекундах по repeat замерам."""
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) * 1000 / number)
+    return {
+        'min': round(min(timings), 4),
+        'median': round(statistics.median(timings), 4),
+        'repeat': repeat,
+        'number': number,
+    }
+
+
+def bench_title_serializer(size):
+    from api.serializers import TitleViewSerializer
+    from reviews.models import Title
+
+    titles = list(
+        Title.objects.select_related('category').prefetch_related('genre')
+        .defer('search_vector').order_by('id')[:size])
+
+    def run():
+        return TitleViewSerializer(titles, many=True).data
+
+    return run
+
+
+def bench_review_validation(users):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.serializers import ReviewSerializer
+    from reviews.models import Title
+
+    title = Title.objects.order_by('id').last()
+    title.reviewed = False
+    request = Request(APIRequestFactory().post('/'))
+    request.user = users['user']
+    context = {
+        'request': request,
+        'view': SimpleNamespace(get_title=lambda: title),
+    }
+
+    def run():
+        serializer = ReviewSerializer(
+            data={'text': 'Отличное произведение', 'score': 9},
+            context=context)
+        serializer.is_valid(raise_exception=True)
+
+    return run
+
+
+def bench_title_filter():
+    from api.filters import TitleFilter
+    from reviews.models import Title
+
+    params = (
+        {'genre': 'genre-1,genre-8'},
+        {'category': 'category-3', 'year': '1953'},
+        {'genre': 'genre-2', 'category': 'category-2,category-5'},
+        {'name': 'Произведение 10,Произведение 20', 'year': '1960'},
+    )
+    queryset = Title.objects.defer('search_vector').order_by('id')
+
+    def run():
+        for data in params:
+            list(TitleFilter(data, queryset=queryset).qs[:10])
+
+    return run
+
+
+def bench_permissions(users):
+    from django.contrib.auth.models import AnonymousUser
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.permissions import (AdminOnly, AdminOrModeratorOrAuthor,
+                                 AdminOrReadOnly)
+    from reviews.models import Review
+
+    review = Review.objects.select_related('author').get()
+    factory = APIRequestFactory()
+    requests = []
+    for user in (AnonymousUser(), *users.values()):
+        for method in METHODS:
+            request = Request(getattr(factory, method)('/'))
+            request.user = user
+            requests.append(request)
+    permissions = (AdminOrReadOnly(), AdminOnly(), AdminOrModeratorOrAuthor())
+
+    def run():
+        for permission in permissions:
+            for request in requests:
+                if permission.has_permission(request, None):
+                    permission.has_object_permission(request, None, review)
+
+    return run
+
+
+def run_suite(sizes=SIZES, repeat=5, number=1, stdout=None):
+    """
+    Наполняет БД и замеряет все бенчмарки.
+    Возвращает словарь {имя бенчмарка: результаты замера}.
+    """
+
+    users = seed(max(sizes))
+    cases = [
+        (f'title_serializer_{size}', bench_title_serializer(size), 1)
+        for size in sizes
+    ]
+    cases += [
+        ('review_serializer_validate', bench_review_validation(users), 100),
+        ('title_filter_combined', bench_title_filter(), 10),
+        ('permissions', bench_permissions(users), 100),
+    ]
+    results = {}
+    for name, func, multiplier in cases:
+        results[name] = measure(func, repeat, number * multiplier)
+        if stdout is not None:
+            stdout.write(f'{name}: {results[name]["min"]:.4f} ms\n')
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Сравнивает лучшие замеры с базовыми.
+    Возвращает бенчмарки, замедлившиеся больше чем на threshold (доля).
+    """
+
+    regressions = []
+    for name, current in sorted(results.items()):
+        if name not in baseline:
+            continue
+        change = current['min'] / baseline[name]['min'] - 1
+        if change > threshold:
+            regressions.append({
+                'name': name,
+                'baseline': baseline[name]['min'],
+                'current': current['min'],
+                'change': round(change, 4),
+            })
+    return regressions
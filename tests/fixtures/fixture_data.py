@@ -0,0 +1,51 @@
+import pytest
+
+
+def create_catalog(size, prefix='test'):
+    """
+    Создает size произведений с жанрами, отзывами и комментариями.
+    Возвращает идентификаторы объектов для подстановки в адреса запросов.
+    """
+    from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                                Title, User)
+
+    categories = Category.objects.bulk_create(
+        Category(name=f'Категория {i}', slug=f'{prefix}-category-{i}')
+        for i in range(size)
+    )
+    genres = Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'{prefix}-genre-{i}') for i in range(size)
+    )
+    authors = User.objects.bulk_create(
+        User(username=f'{prefix}-author-{i}',
+             email=f'{prefix}-author-{i}@yamdb.fake')
+        for i in range(size)
+    )
+    titles = Title.objects.bulk_create(
+        Title(name=f'Произведение {i}', year=2000, category=category)
+        for i, category in enumerate(categories)
+    )
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title=title, genre=genre)
+        for title in titles for genre in genres[:2]
+    )
+    title = titles[0]
+    reviews = Review.objects.bulk_create(
+        Review(title=title, author=author, text='Отзыв', score=5)
+        for author in authors
+    )
+    review = reviews[0]
+    Comment.objects.bulk_create(
+        Comment(review=review, author=author, text='Комментарий')
+        for author in authors
+    )
+    return {
+        'title_id': title.id,
+        'review_id': review.id,
+        'username': authors[0].username,
+    }
+
+
+@pytest.fixture
+def catalog_factory(db):
+    return create_catalog
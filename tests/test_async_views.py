@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import include, path
+
+from api.async_views import ASYNC_ROUTES, async_urls
+from api.urls import router_v1
+from api_yamdb.metrics import metrics_view
+
+# URLconf режима ASGI: тот же роутер, что и в api/urls.py,
+# с асинхронными представлениями горячих маршрутов.
+urlpatterns = [
+    path('api/v1/', include(async_urls(router_v1.urls))),
+    path('internal/metrics/', metrics_view, name='metrics'),
+]
+
+
+def async_get(url):
+    return async_to_sync(AsyncClient().get)(url)
+
+
+class TestAsyncUrls:
+
+    def test_hot_routes_are_async(self):
+        patterns = async_urls(router_v1.urls)
+        names = {pattern.name for pattern in patterns}
+        assert set(ASYNC_ROUTES) <= names, (
+            'Проверьте, что ASYNC_ROUTES совпадают с именами маршрутов роутера'
+        )
+        for pattern in patterns:
+            is_async = asyncio.iscoroutinefunction(pattern.callback)
+            assert is_async == (pattern.name in ASYNC_ROUTES), (
+                f'Проверьте, что асинхронным стало только представление '
+                f'маршрутов чтения, а не {pattern.name}'
+            )
+
+
+@pytest.mark.urls('tests.test_async_views')
+@pytest.mark.django_db(transaction=True)
+class TestAsyncViews:
+
+    def test_async_responses_match_sync(self, anon_client, catalog_factory):
+        ids = catalog_factory(3)
+        title = f'/api/v1/titles/{ids["title_id"]}/'
+        urls = (
+            '/api/v1/titles/',
+            '/api/v1/titles/?genre=test-genre-1',
+            title,
+            '/api/v1/categories/',
+            '/api/v1/genres/',
+            f'{title}reviews/',
+            f'{title}reviews/{ids["review_id"]}/comments/',
+        )
+        for url in urls:
+            expected = anon_client.get(url)
+            response = async_get(url)
+            assert response.status_code == expected.status_code == 200
+            assert response.json() == expected.json(), (
+                f'Проверьте, что асинхронное представление {url} '
+                f'отдает тот же ответ, что и синхронное'
+            )
+
+    def test_async_route_not_found(self):
+        assert async_get('/api/v1/titles/0/').status_code == 404
+
+    def test_write_through_async_route(self):
+        client = AsyncClient()
+        response = async_to_sync(client.post)(
+            '/api/v1/genres/', {'name': 'Жанр', 'slug': 'genre'})
+        assert response.status_code == 401, (
+            'Проверьте, что запросы на запись через асинхронный маршрут '
+            'проходят обычные проверки доступа'
+        )
+
+    def test_metrics_count_async_queries(self, catalog_factory, settings,
+                                         tmp_path):
+        from api_yamdb.metrics import registry
+
+        settings.METRICS_DIR = str(tmp_path)
+        registry.routes.clear()
+        catalog_factory(2)
+        async_get('/api/v1/titles/')
+        stats = registry.snapshot()['title-list|GET']
+        registry.routes.clear()
+        assert stats['count'] == 1
+        assert stats['queries'] >= 1, (
+            'Проверьте, что метрики считают SQL-запросы, выполненные '
+            'в пуле потоков асинхронных представлений'
+        )
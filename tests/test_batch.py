@@ -0,0 +1,170 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def title_items(count, category='test-category-0', genre='test-genre-0'):
+    return [
+        {'name': f'Пакет {i}', 'year': 2001, 'category': category,
+         'genre': [genre, 'test-genre-1']}
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestTitleBatch:
+
+    url = '/api/v1/titles/batch/'
+
+    def test_create(self, admin_client, catalog_factory):
+        catalog_factory(2)
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(
+                self.url, title_items(50), format='json')
+        assert response.status_code == 201, response.json()
+        data = response.json()
+        assert len(data) == 50
+        assert data[0]['genre'] == ['test-genre-0', 'test-genre-1']
+        assert data[0]['category'] == 'test-category-0'
+        assert len(context.captured_queries) <= 8, (
+            'Проверьте, что пакетное создание произведений выполняет '
+            'постоянное число запросов к БД'
+        )
+
+    def test_item_errors(self, admin_client, catalog_factory):
+        catalog_factory(2)
+        items = title_items(3)
+        items[1]['category'] = 'unknown'
+        items[2]['genre'] = ['unknown']
+        response = admin_client.post(self.url, items, format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert 'category' in errors[1]
+        assert 'genre' in errors[2]
+        response = admin_client.get('/api/v1/titles/')
+        assert response.json()['count'] == 2, (
+            'Проверьте, что пакет с ошибками не сохраняется частично'
+        )
+
+    def test_only_admin(self, user_client, catalog_factory):
+        catalog_factory(1)
+        response = user_client.post(self.url, title_items(1), format='json')
+        assert response.status_code == 403
+
+
+@pytest.mark.django_db
+class TestReviewBatch:
+
+    url = '/api/v1/reviews/batch/'
+
+    def test_create(self, user_client, catalog_factory):
+        from reviews.models import Title
+
+        catalog_factory(5)
+        title_ids = list(Title.objects.values_list('id', flat=True))
+        items = [{'title': pk, 'text': 'Отзыв', 'score': 10}
+                 for pk in title_ids]
+        response = user_client.post(self.url, items, format='json')
+        assert response.status_code == 201, response.json()
+        assert response.json()[0]['author'] == 'TestUser'
+        assert Title.objects.get(pk=title_ids[1]).rating == 10, (
+            'Проверьте, что пакетное создание отзывов обновляет рейтинг'
+        )
+
+    def test_item_errors(self, user_client, catalog_factory):
+        from reviews.models import Title
+
+        catalog_factory(2)
+        title_id = Title.objects.values_list('id', flat=True).first()
+        items = [
+            {'title': title_id, 'text': 'Отзыв', 'score': 5},
+            {'title': title_id, 'text': 'Повтор', 'score': 5},
+            {'title': 0, 'text': 'Отзыв', 'score': 5},
+            {'title': title_id, 'text': 'Отзыв', 'score': 11},
+        ]
+        response = user_client.post(self.url, items, format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert 'score' in errors[3]
+
+    def test_duplicates(self, user_client, catalog_factory):
+        from reviews.models import Title
+
+        catalog_factory(2)
+        title_id = Title.objects.values_list('id', flat=True).first()
+        items = [
+            {'title': title_id, 'text': 'Отзыв', 'score': 5},
+            {'title': title_id, 'text': 'Повтор', 'score': 5},
+            {'title': 0, 'text': 'Отзыв', 'score': 5},
+        ]
+        response = user_client.post(self.url, items, format='json')
+        assert response.status_code == 400
+        assert response.json() == [
+            {}, {'title': ['Вы уже оставили свой отзыв.']},
+            {'title': ['Произведение 0 не найдено.']},
+        ]
+
+    @pytest.fixture
+    def unchecked(self, monkeypatch):
+        """Первая проверка пакета пропускает все: запись идет в гонке."""
+        from api.serializers import ReviewBatchListSerializer
+
+        validate_batch = ReviewBatchListSerializer.validate_batch
+        calls = []
+
+        def skip_first(self, items):
+            calls.append(items)
+            if len(calls) == 1:
+                return [{} for _ in items]
+            return validate_batch(self, items)
+
+        monkeypatch.setattr(
+            ReviewBatchListSerializer, 'validate_batch', skip_first)
+
+    def test_conflicts_rechecked(self, user_client, catalog_factory,
+                                 unchecked):
+        from reviews.models import Review, Title
+
+        catalog_factory(2)
+        title_ids = list(Title.objects.values_list('id', flat=True))
+        Review.objects.create(title_id=title_ids[0], text='Отзыв', score=5,
+                              author=user_client.handler._force_user)
+        response = user_client.post(self.url, [
+            {'title': title_ids[1], 'text': 'Отзыв', 'score': 5},
+            {'title': title_ids[0], 'text': 'Повтор', 'score': 5},
+        ], format='json')
+        assert response.status_code == 400
+        assert response.json() == [
+            {}, {'title': ['Вы уже оставили свой отзыв.']}]
+
+    # Внешние ключи PostgreSQL проверяются при фиксации транзакции.
+    @pytest.mark.django_db(transaction=True)
+    def test_missing_title_not_reported_as_duplicate(
+            self, user_client, catalog_factory, unchecked):
+        response = user_client.post(self.url, [
+            {'title': 0, 'text': 'Отзыв', 'score': 5}], format='json')
+        assert response.status_code == 400
+        assert response.json() == [
+            {'title': ['Произведение 0 не найдено.']}], (
+            'Проверьте, что нарушение внешнего ключа не выдается '
+            'за повторный отзыв'
+        )
+
+    def test_other_integrity_error(self, user_client, catalog_factory,
+                                   monkeypatch):
+        from django.db import IntegrityError
+
+        from reviews.models import ReviewQuerySet, Title
+
+        def fail(self, objs, *args, **kwargs):
+            raise IntegrityError
+
+        catalog_factory(2)
+        monkeypatch.setattr(ReviewQuerySet, 'bulk_create', fail)
+        title_id = Title.objects.values_list('id', flat=True).first()
+        response = user_client.post(self.url, [
+            {'title': title_id, 'text': 'Отзыв', 'score': 5}], format='json')
+        assert response.status_code == 400
+        assert response.json() == {'non_field_errors': [
+            'Не удалось сохранить отзывы, повторите запрос.']}
@@ -0,0 +1,33 @@
+import pytest
+
+from benchmarks.suite import compare, run_suite
+
+
+class TestBenchmarks:
+
+    def test_compare_flags_regressions(self):
+        baseline = {'fast': {'min': 1.0}, 'slow': {'min': 1.0}}
+        results = {
+            'fast': {'min': 1.1},
+            'slow': {'min': 1.5},
+            'new': {'min': 9.0},
+        }
+        regressions = compare(results, baseline, threshold=0.2)
+        assert [item['name'] for item in regressions] == ['slow'], (
+            'Проверьте, что сравнение отмечает только бенчмарки, '
+            'замедлившиеся больше порога'
+        )
+        assert regressions[0]['change'] == 0.5
+
+    @pytest.mark.django_db
+    def test_run_suite(self):
+        results = run_suite(sizes=(10, 20), repeat=1)
+        assert set(results) == {
+            'title_serializer_10', 'title_serializer_20',
+            'review_serializer_validate', 'title_filter_combined',
+            'permissions',
+        }
+        for name, result in results.items():
+            assert result['min'] > 0, (
+                f'Проверьте, что бенчмарк `{name}` возвращает время замера'
+            )
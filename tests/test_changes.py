@@ -0,0 +1,116 @@
+import pytest
+from django.utils import timezone
+
+URL = '/api/v1/changes/{}/'
+
+
+@pytest.fixture(autouse=True)
+def no_lag(settings):
+    settings.CHANGE_FEED_LAG = 0
+
+
+def get_feed(client, dataset, **params):
+    response = client.get(URL.format(dataset), params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def changed_ids(data):
+    return [row['id'] for row in data['changed']]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestChanges:
+
+    def test_full_sync_then_delta(self, admin_client, catalog_factory):
+        from reviews.models import Title
+
+        ids = catalog_factory(3)
+        titles = list(Title.objects.values_list('id', flat=True))
+        data = get_feed(admin_client, 'titles')
+        assert sorted(changed_ids(data)) == titles
+        assert data['deleted'] == [] and data['more'] is False
+        assert data['changed'][0]['genre'], (
+            'Проверьте, что произведения в ленте в том же виде, '
+            'что и в /api/v1/titles/'
+        )
+        cursor = data['cursor']
+        assert get_feed(admin_client, 'titles', cursor=cursor)[
+            'changed'] == [], (
+            'Проверьте, что по курсору отдаются только новые изменения'
+        )
+
+        response = admin_client.patch(
+            f'/api/v1/titles/{titles[1]}/', {'name': 'Новое название'})
+        assert response.status_code == 200
+        data = get_feed(admin_client, 'titles', cursor=cursor)
+        assert changed_ids(data) == [titles[1]]
+        assert data['changed'][0]['name'] == 'Новое название'
+
+        review = f'/api/v1/titles/{ids["title_id"]}/reviews/{ids["review_id"]}/'
+        comments_cursor = get_feed(admin_client, 'comments')['cursor']
+        assert admin_client.delete(review).status_code == 204
+        data = get_feed(admin_client, 'reviews', updated_since=timezone.now(
+        ) - timezone.timedelta(minutes=1))
+        assert [row['id'] for row in data['deleted']] == [ids['review_id']]
+        assert len(get_feed(admin_client, 'comments', cursor=comments_cursor)[
+            'deleted']) == 3, (
+            'Проверьте, что каскадное удаление комментариев попадает в ленту'
+        )
+        assert changed_ids(get_feed(
+            admin_client, 'titles', cursor=cursor)) == [
+            titles[1], ids['title_id']], (
+            'Проверьте, что пересчет рейтинга отмечает произведение '
+            'измененным'
+        )
+
+    def test_pages(self, admin_client, catalog_factory):
+        from reviews.models import Genre
+
+        catalog_factory(5)
+        genres = list(Genre.objects.values_list('id', flat=True))
+        data = get_feed(admin_client, 'genres', limit=2)
+        assert changed_ids(data) == genres[:2] and data['more']
+        seen = changed_ids(data)
+        while data['next']:
+            response = admin_client.get(data['next'])
+            data = response.json()
+            seen += changed_ids(data)
+        assert seen == genres, (
+            'Проверьте, что страницы ленты идут без пропусков и повторов'
+        )
+        assert 'slug' in data['changed'][0] and data['changed'][0]['updated_at']
+
+    def test_same_timestamp(self, admin_client, catalog_factory):
+        from reviews.models import Category
+
+        catalog_factory(4)
+        Category.objects.update(updated_at=timezone.now())
+        categories = list(Category.objects.values_list('id', flat=True))
+        data = get_feed(admin_client, 'categories', limit=3)
+        data = get_feed(admin_client, 'categories', cursor=data['cursor'])
+        assert changed_ids(data) == categories[3:], (
+            'Проверьте, что курсор различает объекты с одинаковой отметкой '
+            'времени по id'
+        )
+
+    def test_recent_changes_wait_for_lag(self, admin_client, catalog_factory,
+                                         settings):
+        settings.CHANGE_FEED_LAG = 60
+        catalog_factory(2)
+        data = get_feed(admin_client, 'genres')
+        assert data['changed'] == [], (
+            'Проверьте, что изменения последних CHANGE_FEED_LAG секунд '
+            'не отдаются'
+        )
+        settings.CHANGE_FEED_LAG = 0
+        assert len(get_feed(admin_client, 'genres', cursor=data['cursor'])[
+            'changed']) == 2
+
+    def test_errors(self, admin_client, user_client):
+        assert admin_client.get(
+            URL.format('titles'), {'cursor': 'garbage'}).status_code == 400
+        assert admin_client.get(
+            URL.format('titles'), {'updated_since': 'вчера'}).status_code == 400
+        assert admin_client.get(URL.format('users')).status_code == 404
+        assert user_client.get(URL.format('titles')).status_code == 403
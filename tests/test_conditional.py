@@ -0,0 +1,87 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+CONDITIONAL_URLS = (
+    '/api/v1/titles/{title_id}/',
+    '/api/v1/titles/{title_id}/reviews/',
+    '/api/v1/titles/{title_id}/reviews/{review_id}/',
+    '/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+)
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    @pytest.mark.parametrize('url_template', CONDITIONAL_URLS)
+    def test_not_modified(self, anon_client, catalog_factory, url_template):
+        url = url_template.format(**catalog_factory(2))
+        response = anon_client.get(url)
+        assert response.status_code == 200
+        assert response.has_header('ETag'), (
+            f'Проверьте, что ответ `{url_template}` содержит заголовок ETag'
+        )
+        assert response.has_header('Last-Modified'), (
+            f'Проверьте, что ответ `{url_template}` содержит Last-Modified'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = anon_client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 304, (
+            f'Проверьте, что `{url_template}` возвращает 304 '
+            'для актуального ETag'
+        )
+        assert len(context.captured_queries) == 1, (
+            'Проверьте, что ответ 304 стоит одного запроса к БД'
+        )
+
+    def test_review_fields(self, anon_client, catalog_factory):
+        url = '/api/v1/titles/{title_id}/reviews/{review_id}/'.format(
+            **catalog_factory(1))
+        assert set(anon_client.get(url).json()) == {
+            'id', 'author', 'text', 'pub_date', 'score', 'title'}, (
+            'Проверьте, что отметка времени изменения отзыва '
+            'не попадает в ответ'
+        )
+
+    def test_comment_fields(self, anon_client, catalog_factory):
+        url = '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'.format(
+            **catalog_factory(1))
+        comment = anon_client.get(url).json()['results'][0]
+        assert set(comment) == {
+            'id', 'author', 'review', 'text', 'pub_date'}, (
+            'Проверьте, что отметка времени изменения комментария '
+            'не попадает в ответ'
+        )
+
+    def test_not_modified_since(self, anon_client, catalog_factory):
+        url = '/api/v1/titles/{title_id}/reviews/'.format(
+            **catalog_factory(1))
+        response = anon_client.get(url)
+        response = anon_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == 304, (
+            'Проверьте, что отзывы поддерживают If-Modified-Since'
+        )
+
+    def test_review_changes_etag(self, anon_client, user_client,
+                                 catalog_factory):
+        url = '/api/v1/titles/{title_id}/reviews/'.format(
+            **catalog_factory(1))
+        etag = anon_client.get(url)['ETag']
+        user_client.post(url, {'text': 'Отзыв', 'score': 8})
+        response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый отзыв меняет ETag списка отзывов'
+        )
+
+    def test_comment_changes_etag(self, anon_client, user_client,
+                                  catalog_factory):
+        url = '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'.format(
+            **catalog_factory(1))
+        etag = anon_client.get(url)['ETag']
+        user_client.post(url, {'text': 'Комментарий'})
+        response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый комментарий меняет ETag списка комментариев'
+        )
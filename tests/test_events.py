@@ -0,0 +1,202 @@
+import asyncio
+import os
+import runpy
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+
+
+@pytest.fixture(autouse=True)
+def events_settings(settings, tmp_path):
+    from api.events import broker
+
+    settings.EVENTS_DIR = str(tmp_path / 'events')
+    settings.EVENTS_HEARTBEAT = 0.1
+    settings.EVENTS_STREAM_SECONDS = 1
+    # Сокет воркера открывается заново в папке этого теста.
+    broker.pid = None
+
+
+def add_review(title_id, username='events-author', score=7):
+    from reviews.models import Review, User
+
+    author = User.objects.create(
+        username=username, email=f'{username}@yamdb.fake')
+    return Review.objects.create(
+        title_id=title_id, author=author, text='Новый отзыв', score=score)
+
+
+def read_events(response):
+    """Пары (id, событие) из всего потока ответа до его закрытия."""
+
+    content = b''.join(response.streaming_content).decode()
+    events = []
+    for message in content.split('\n\n'):
+        fields = dict(
+            line.split(': ', 1) for line in message.splitlines()
+            if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((int(fields['id']), fields['event']))
+    return content, events
+
+
+@pytest.mark.django_db(transaction=True)
+class TestEvents:
+
+    def test_new_review_is_streamed(self, anon_client, catalog_factory):
+        ids = catalog_factory(2)
+        url = f'/api/v1/titles/{ids["title_id"]}/reviews/events/'
+        response = anon_client.get(url)
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/event-stream'
+        review = add_review(ids['title_id'])
+        content, events = read_events(response)
+        assert content.startswith('retry: ')
+        assert events == [(review.id, 'review')], (
+            'Проверьте, что подписчик получает отзыв, созданный после '
+            'подписки, и только его'
+        )
+        assert '"text": "Новый отзыв"' in content
+        assert ': ping' in content, (
+            'Проверьте, что в тихом потоке отправляются комментарии-пинги'
+        )
+
+    def test_connection_closed_while_streaming(self, anon_client,
+                                               catalog_factory):
+        from django.db import connection
+
+        ids = catalog_factory(2)
+        first = add_review(ids['title_id'], 'events-first')
+        response = anon_client.get(
+            f'/api/v1/titles/{ids["title_id"]}/reviews/events/',
+            HTTP_LAST_EVENT_ID=str(first.id - 1))
+        assert response.status_code == 200
+        assert connection.connection is None, (
+            'Проверьте, что открытый поток событий не держит '
+            'соединение с БД'
+        )
+        assert read_events(response)[1] == [(first.id, 'review')]
+
+    def test_other_channels_are_not_streamed(self, anon_client,
+                                             catalog_factory):
+        from reviews.models import Title
+
+        ids = catalog_factory(2)
+        other = Title.objects.exclude(pk=ids['title_id']).first()
+        response = anon_client.get(
+            f'/api/v1/titles/{ids["title_id"]}/reviews/events/')
+        add_review(other.id)
+        assert read_events(response)[1] == []
+
+    def test_comments_stream(self, user_client, anon_client, catalog_factory):
+        ids = catalog_factory(2)
+        url = (f'/api/v1/titles/{ids["title_id"]}/reviews/'
+               f'{ids["review_id"]}/comments/')
+        response = anon_client.get(f'{url}events/')
+        assert response.status_code == 200
+        created = user_client.post(url, {'text': 'Комментарий'})
+        assert created.status_code == 201
+        assert read_events(response)[1] == [
+            (created.json()['id'], 'comment')]
+
+    def test_batch_reviews_stream(self, user_client, anon_client,
+                                  catalog_factory):
+        from reviews.models import Title
+
+        ids = catalog_factory(2)
+        other = Title.objects.exclude(pk=ids['title_id']).first()
+        response = anon_client.get(
+            f'/api/v1/titles/{ids["title_id"]}/reviews/events/')
+        created = user_client.post('/api/v1/reviews/batch/', [
+            {'title': ids['title_id'], 'text': 'Отзыв', 'score': 8},
+            {'title': other.id, 'text': 'Отзыв', 'score': 6},
+        ], format='json')
+        assert created.status_code == 201, created.json()
+        assert read_events(response)[1] == [
+            (created.json()[0]['id'], 'review')], (
+            'Проверьте, что отзывы из пакетной записи рассылаются '
+            'подписчикам произведения'
+        )
+
+    def test_replay_after_last_event_id(self, anon_client, catalog_factory):
+        ids = catalog_factory(2)
+        first = add_review(ids['title_id'], 'events-first')
+        second = add_review(ids['title_id'], 'events-second')
+        response = anon_client.get(
+            f'/api/v1/titles/{ids["title_id"]}/reviews/events/',
+            HTTP_LAST_EVENT_ID=str(first.id))
+        assert read_events(response)[1] == [(second.id, 'review')], (
+            'Проверьте, что после переподключения с Last-Event-ID '
+            'отдаются пропущенные отзывы'
+        )
+
+    def test_not_found(self, anon_client, catalog_factory):
+        ids = catalog_factory(2)
+        urls = (
+            '/api/v1/titles/0/reviews/events/',
+            f'/api/v1/titles/{ids["title_id"]}/reviews/0/comments/events/',
+        )
+        for url in urls:
+            assert anon_client.get(url).status_code == 404
+        response = anon_client.get(
+            f'/api/v1/titles/{ids["title_id"]}/reviews/{ids["review_id"]}/')
+        assert response.status_code == 200, (
+            'Проверьте, что маршрут событий не перекрывает адрес отзыва'
+        )
+
+    def test_asgi_stream(self, catalog_factory):
+        from django.core.asgi import get_asgi_application
+
+        from api.events import events_application
+
+        ids = catalog_factory(2)
+        application = events_application(get_asgi_application())
+        scope = {
+            'type': 'http', 'method': 'GET', 'headers': [],
+            'path': f'/api/v1/titles/{ids["title_id"]}/reviews/events/',
+        }
+        messages = []
+
+        async def receive():
+            await asyncio.sleep(10)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+            if message['type'] == 'http.response.start':
+                await sync_to_async(add_review)(ids['title_id'])
+
+        async_to_sync(application)(scope, receive, send)
+        assert messages[0]['status'] == 200
+        content = b''.join(
+            message.get('body', b'') for message in messages[1:]).decode()
+        assert 'event: review' in content, (
+            'Проверьте, что под ASGI подписчик получает новые отзывы'
+        )
+        assert messages[-1] == {'type': 'http.response.body', 'body': b''}
+
+
+class TestGunicornConfig:
+
+    def load_config(self, monkeypatch, mode):
+        from django.conf import settings
+
+        monkeypatch.setenv('SERVER_MODE', mode)
+        return runpy.run_path(
+            os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+
+    def test_wsgi_workers(self, monkeypatch):
+        from api_yamdb.settings import EVENTS_STREAM_SECONDS
+
+        config = self.load_config(monkeypatch, 'wsgi')
+        assert config['worker_class'] == 'gthread' and config['threads'] > 1, (
+            'Проверьте, что под WSGI поток событий не занимает '
+            'единственный поток воркера'
+        )
+        assert config['timeout'] > EVENTS_STREAM_SECONDS, (
+            'Проверьте, что timeout воркера больше EVENTS_STREAM_SECONDS'
+        )
+
+    def test_asgi_workers(self, monkeypatch):
+        config = self.load_config(monkeypatch, 'asgi')
+        assert config['worker_class'] == 'uvicorn.workers.UvicornWorker'
@@ -0,0 +1,113 @@
+import csv
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+def read_stream(response):
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_titles_ndjson_matches_api(self, admin_client, catalog_factory,
+                                       settings):
+        settings.EXPORT_CHUNK_SIZE = 2
+        catalog_factory(5)
+        response = admin_client.get('/api/v1/export/titles.ndjson')
+        assert response.status_code == 200
+        assert response.streaming, (
+            'Проверьте, что выгрузка передается потоковым ответом'
+        )
+        rows = [json.loads(line)
+                for line in read_stream(response).splitlines()]
+        api = admin_client.get('/api/v1/titles/?limit=100').json()
+        assert rows == api['results'], (
+            'Проверьте, что выгрузка произведений совпадает '
+            'с ответом `/api/v1/titles/`'
+        )
+
+    def test_reviews_csv(self, admin_client, catalog_factory):
+        ids = catalog_factory(3)
+        response = admin_client.get('/api/v1/export/reviews.csv')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/csv')
+        rows = list(csv.DictReader(StringIO(read_stream(response))))
+        assert len(rows) == 3
+        assert rows[0]['author'] == ids['username']
+        assert rows[0]['title'] == str(ids['title_id'])
+
+    def test_titles_csv_flattens_relations(self, admin_client,
+                                           catalog_factory):
+        catalog_factory(2)
+        response = admin_client.get('/api/v1/export/titles.csv')
+        rows = list(csv.DictReader(StringIO(read_stream(response))))
+        assert rows[0]['category'] == 'test-category-0'
+        assert rows[0]['genre'] == 'test-genre-0,test-genre-1', (
+            'Проверьте, что жанры в CSV перечислены слагами через запятую'
+        )
+
+    def test_export_admin_only(self, user_client, anon_client):
+        assert user_client.get(
+            '/api/v1/export/titles.ndjson').status_code == 403
+        assert anon_client.get(
+            '/api/v1/export/titles.ndjson').status_code == 401
+
+    def test_export_command(self, catalog_factory):
+        catalog_factory(3)
+        output = StringIO()
+        call_command('export_catalog', 'titles', '--chunk-size', '2',
+                     stdout=output)
+        names = [json.loads(line)['name']
+                 for line in output.getvalue().splitlines()]
+        assert names == ['Произведение 0', 'Произведение 1',
+                         'Произведение 2']
+
+
+def asgi_get(path, token):
+    """Ответ приложения api_yamdb.asgi: статус и тело."""
+    from asgiref.sync import async_to_sync
+
+    from api_yamdb.asgi import application
+
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+        'headers': [(b'host', b'testserver'),
+                    (b'authorization', f'Bearer {token}'.encode())],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(application)(scope, receive, send)
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return messages[0]['status'], body.decode()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsgiExport:
+
+    def test_export_under_asgi(self, admin, user, catalog_factory, settings):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        settings.EXPORT_CHUNK_SIZE = 2
+        catalog_factory(5)
+        token = AccessToken.for_user(admin)
+        status, body = asgi_get('/api/v1/export/titles.ndjson', token)
+        assert status == 200
+        assert len(body.splitlines()) == 5, (
+            'Проверьте, что под ASGI выгрузка отдает все строки'
+        )
+        status, body = asgi_get('/api/v1/export/reviews.csv', token)
+        assert status == 200
+        assert len(list(csv.DictReader(StringIO(body)))) == 5
+        status, _ = asgi_get(
+            '/api/v1/export/reviews.csv', AccessToken.for_user(user))
+        assert status == 403
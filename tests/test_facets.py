@@ -0,0 +1,98 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+URL = '/api/v1/titles/facets/'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFacets:
+
+    @pytest.fixture
+    def titles(self, catalog_factory):
+        """
+        Три произведения 2000 года в категориях test-category-0..2
+        с жанрами test-genre-0 и test-genre-1, четвертое — 1999 года
+        в категории test-category-0 с жанром test-genre-2.
+        """
+        from reviews.models import Category, Genre, GenreTitle, Title
+
+        catalog_factory(3)
+        title = Title.objects.create(
+            name='Старое', year=1999,
+            category=Category.objects.get(slug='test-category-0'))
+        GenreTitle.objects.create(
+            title=title, genre=Genre.objects.get(slug='test-genre-2'))
+        return title
+
+    def get_facets(self, client, params=None):
+        response = client.get(URL, params)
+        assert response.status_code == 200
+        return response.json()
+
+    def test_counts(self, anon_client, titles):
+        data = self.get_facets(anon_client)
+        assert data['genre'] == [
+            {'slug': 'test-genre-0', 'name': 'Жанр 0', 'count': 3},
+            {'slug': 'test-genre-1', 'name': 'Жанр 1', 'count': 3},
+            {'slug': 'test-genre-2', 'name': 'Жанр 2', 'count': 1},
+        ]
+        assert data['category'][0] == {
+            'slug': 'test-category-0', 'name': 'Категория 0', 'count': 2}
+        assert data['year'] == [
+            {'year': 2000, 'count': 3}, {'year': 1999, 'count': 1}]
+
+    def test_counts_follow_other_filters(self, anon_client, titles):
+        data = self.get_facets(
+            anon_client, {'genre': 'test-genre-2', 'year': 1999})
+        assert data['category'] == [
+            {'slug': 'test-category-0', 'name': 'Категория 0', 'count': 1}]
+        assert [row['slug'] for row in data['genre']] == ['test-genre-2'], (
+            'Проверьте, что счетчики жанров учитывают фильтр по году'
+        )
+        assert data['year'] == [{'year': 1999, 'count': 1}], (
+            'Проверьте, что счетчики годов учитывают фильтр по жанру'
+        )
+
+    def test_own_filter_is_ignored(self, anon_client, titles):
+        data = self.get_facets(
+            anon_client, {'category': 'test-category-1', 'facets': 'category'})
+        assert len(data['category']) == 3, (
+            'Проверьте, что счетчики измерения не зависят от его '
+            'собственного фильтра: по ним выбирают другое значение'
+        )
+        assert list(data) == ['category']
+
+    def test_grouped_queries(self, anon_client, titles):
+        with CaptureQueriesContext(connection) as context:
+            self.get_facets(anon_client, {'genre': 'test-genre-0,test-genre-2',
+                                          'search': 'Произведение'})
+        assert len(context) == 3, (
+            'Проверьте, что каждое измерение считается одним '
+            'сгруппированным запросом'
+        )
+
+    def test_follow_catalog_changes(self, admin_client, anon_client, titles):
+        self.get_facets(anon_client)
+        response = admin_client.post('/api/v1/titles/', {
+            'name': 'Новое', 'year': 1999, 'category': 'test-category-2',
+            'genre': ['test-genre-2'],
+        })
+        assert response.status_code == 201
+        data = self.get_facets(anon_client)
+        assert {'year': 1999, 'count': 2} in data['year'], (
+            'Проверьте, что фасеты обновляются после добавления произведения'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles.id}/')
+        data = self.get_facets(anon_client)
+        assert {'year': 1999, 'count': 1} in data['year']
+        assert {'slug': 'test-genre-2', 'name': 'Жанр 2',
+                'count': 1} in data['genre']
+
+    def test_invalid_params(self, anon_client):
+        for params in ({'facets': 'author'}, {'facets': ','},
+                       {'year': 'abc'}):
+            response = anon_client.get(URL, params)
+            assert response.status_code == 400, (
+                f'Проверьте, что параметры {params} отклоняются'
+            )
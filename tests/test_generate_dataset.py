@@ -0,0 +1,72 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+def generate(**options):
+    call_command(
+        'generate_dataset', users=30, categories=3, genres=5, titles=40,
+        reviews=300, comments=200, seed=7, stdout=StringIO(), **options)
+
+
+def snapshot():
+    from reviews.models import Comment, Review, Title, User
+
+    return (
+        list(User.objects.order_by('id').values_list('username', 'role')),
+        list(Title.objects.order_by('id').values_list(
+            'name', 'year', 'category_id')),
+        list(Review.objects.order_by('id').values_list(
+            'title_id', 'author_id', 'score', 'pub_date')),
+        list(Comment.objects.order_by('id').values_list(
+            'review_id', 'author_id')),
+    )
+
+
+class TestGenerateDataset:
+
+    def test_skewed_counts(self):
+        from reviews.management.commands.generate_dataset import (
+            skewed_counts)
+
+        counts = skewed_counts(100, 10, 1.0, cap=20)
+        assert sum(counts) == 100
+        assert max(counts) == 20
+        assert counts == sorted(counts, reverse=True), (
+            'Проверьте, что корзины с меньшим рангом получают больше'
+        )
+
+    @pytest.mark.django_db
+    def test_dataset(self):
+        from reviews.models import Comment, Review, Title, User
+
+        generate()
+        assert User.objects.count() == 30
+        assert Title.objects.count() == 40
+        assert Review.objects.count() == 300
+        assert Comment.objects.count() == 200
+        assert not Title.objects.filter(genre__isnull=True).exists()
+        counts = sorted(
+            Title.objects.values_list('review_count', flat=True),
+            reverse=True)
+        assert counts[0] >= 5 * counts[len(counts) // 2], (
+            'Проверьте, что отзывы распределены неравномерно'
+        )
+        title = Title.objects.order_by('-review_count').first()
+        assert title.rating is not None, (
+            'Проверьте, что после генерации пересчитан рейтинг'
+        )
+
+    @pytest.mark.django_db
+    def test_dataset_is_reproducible(self):
+        from reviews.models import Category, Genre, Title, User
+
+        generate()
+        first = snapshot()
+        for model in (Title, Category, Genre, User):
+            model.objects.all().delete()
+        generate()
+        assert snapshot() == first, (
+            'Проверьте, что одинаковый --seed дает одинаковые данные'
+        )
@@ -0,0 +1,103 @@
+import shutil
+from io import StringIO
+from os.path import join
+
+import pytest
+from django.core.management import call_command
+
+from .conftest import root_dir
+
+DATA_DIR = join(root_dir, 'tests', 'fixtures', 'import_data')
+
+COMMENT_TEXT = (
+    'Цитата: "в кавычках", запятая\tтабуляция\n'
+    'вторая строка и \\N и C:\\path'
+)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / 'data'
+    shutil.copytree(DATA_DIR, path)
+    return path
+
+
+def import_db(path, *args):
+    call_command('import_db', '--path', str(path), '--batch-size', '2',
+                 *args, stdout=StringIO())
+
+
+def get_counts():
+    from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                                Title, User)
+
+    return {
+        model.__name__: model.objects.count()
+        for model in (User, Category, Genre, Title, GenreTitle, Review,
+                      Comment)
+    }
+
+
+EXPECTED_COUNTS = {'User': 3, 'Category': 2, 'Genre': 2, 'Title': 3,
+                   'GenreTitle': 3, 'Review': 5, 'Comment': 3}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestImportDb:
+
+    @pytest.mark.parametrize('options', [(), ('--no-copy',)])
+    def test_import(self, data_dir, options):
+        from reviews.models import Comment, Title
+
+        import_db(data_dir, *options)
+        assert get_counts() == EXPECTED_COUNTS
+        ratings = dict(Title.objects.values_list('id', 'rating'))
+        assert ratings == {1: 6, 2: 7, 3: None}, (
+            'Проверьте, что после импорта рейтинг произведений пересчитан'
+        )
+        assert Comment.objects.get(pk=2).text == COMMENT_TEXT, (
+            'Проверьте, что кавычки, табуляция, перевод строки и обратная '
+            'косая черта из CSV сохраняются как есть'
+        )
+        assert Title.objects.get(pk=2).genre.count() == 2
+        assert not (data_dir / '.import_state.json').exists()
+
+    def test_sequences_reset(self, data_dir):
+        from reviews.models import Category, Title
+
+        import_db(data_dir)
+        title = Title.objects.create(
+            name='Новое', year=2020, category=Category.objects.get(pk=1))
+        assert title.pk > 3, (
+            'Проверьте, что после импорта с явными id новые записи '
+            'получают следующие id'
+        )
+
+    @pytest.mark.parametrize('options', [(), ('--no-copy',)])
+    def test_resume(self, data_dir, monkeypatch, options):
+        from reviews.management.commands._private import BatchLoader
+        from reviews.models import Review
+
+        insert = BatchLoader.insert
+        calls = []
+
+        def failing_insert(self, rows, ignore_conflicts=False):
+            # Вторая пачка отзывов записана, но отметка о ней не сохранена.
+            insert(self, rows, ignore_conflicts)
+            if self.model is Review:
+                calls.append(rows)
+                if len(calls) == 2:
+                    raise RuntimeError('Обрыв соединения')
+
+        monkeypatch.setattr(BatchLoader, 'insert', failing_insert)
+        with pytest.raises(RuntimeError):
+            import_db(data_dir, *options)
+        assert Review.objects.count() == 4
+        assert (data_dir / '.import_state.json').exists()
+
+        monkeypatch.setattr(BatchLoader, 'insert', insert)
+        import_db(data_dir, '--resume', *options)
+        assert get_counts() == EXPECTED_COUNTS, (
+            'Проверьте, что возобновленный импорт не дублирует строки'
+        )
+        assert Review.objects.get(pk=5).score == 8
@@ -0,0 +1,70 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+def token_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+def user_queries(context):
+    return [query['sql'] for query in context.captured_queries
+            if 'users_user' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+
+    def test_repeated_request_does_not_load_user(self, user):
+        client = token_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.json()['username'] == user.username
+        assert not user_queries(context), (
+            'Проверьте, что пользователь из токена берется из кэша, '
+            'а `/api/v1/users/me/` не загружает его повторно'
+        )
+
+    def test_me_update_keeps_password(self, user):
+        user.set_password('secret-password')
+        user.save()
+        client = token_client(user)
+        client.get('/api/v1/users/me/')
+        response = client.patch('/api/v1/users/me/', {'bio': 'Биография'})
+        assert response.status_code == 200
+        user.refresh_from_db()
+        assert user.bio == 'Биография'
+        assert user.check_password('secret-password'), (
+            'Проверьте, что изменение профиля пользователем из кэша '
+            'не затирает пароль'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_role_change_invalidates_cache(self, user, admin_client):
+        client = token_client(user)
+        assert client.get('/api/v1/users/').status_code == 403
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', {'role': 'admin'})
+        assert response.status_code == 200
+        assert client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что смена роли через `/api/v1/users/` '
+            'сразу сбрасывает пользователя в кэше'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_deactivated_user_rejected(self, user):
+        client = token_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        user.is_active = False
+        user.save()
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что заблокированный пользователь не проходит '
+            'аутентификацию после сброса кэша'
+        )
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture
+def metrics_registry(settings, tmp_path):
+    from api_yamdb.metrics import registry
+
+    settings.METRICS_DIR = str(tmp_path)
+    registry.routes.clear()
+    yield registry
+    registry.routes.clear()
+
+
+def parse_metrics(text):
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            values[name] = float(value)
+    return values
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_route_metrics(self, anon_client, catalog_factory,
+                           metrics_registry):
+        ids = catalog_factory(2)
+        for _ in range(3):
+            anon_client.get('/api/v1/titles/')
+        anon_client.get(f'/api/v1/titles/{ids["title_id"]}/reviews/')
+
+        response = anon_client.get('/internal/metrics/')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        values = parse_metrics(response.content.decode())
+        labels = '{route="title-list",method="GET"}'
+        assert values[f'yamdb_http_requests_total{labels}'] == 3, (
+            'Проверьте, что метрики считают запросы по имени маршрута'
+        )
+        assert values[f'yamdb_db_queries_total{labels}'] >= 1, (
+            'Проверьте, что метрики считают SQL-запросы маршрута'
+        )
+        assert values[
+            'yamdb_http_request_duration_seconds_bucket'
+            '{route="title-list",method="GET",le="+Inf"}'] == 3
+        assert values[
+            'yamdb_http_requests_total'
+            '{route="reviews-list",method="GET"}'] == 1
+
+    def test_metrics_merged_across_workers(self, anon_client,
+                                           metrics_registry):
+        anon_client.get('/api/v1/genres/')
+        metrics_registry.flush(force=True)
+        own = metrics_registry.get_path()
+        with open(own, encoding='utf-8') as metrics_file:
+            snapshot = json.load(metrics_file)
+        other = os.path.join(os.path.dirname(own), '1.json')
+        with open(other, 'w', encoding='utf-8') as metrics_file:
+            json.dump(snapshot, metrics_file)
+
+        values = parse_metrics(
+            anon_client.get('/internal/metrics/').content.decode())
+        assert values[
+            'yamdb_http_requests_total{route="genre-list",method="GET"}'
+        ] == 2, (
+            'Проверьте, что эндпоинт складывает метрики всех воркеров'
+        )
@@ -0,0 +1,73 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+URL = '/api/v1/batch/'
+
+
+def post_batch(client, urls):
+    response = client.post(URL, {'requests': urls}, format='json')
+    assert response.status_code == 200, response.json()
+    return response.json()
+
+
+@pytest.mark.django_db
+class TestMultiplex:
+
+    def test_title_page(self, anon_client, catalog_factory):
+        ids = catalog_factory(3)
+        title = f'titles/{ids["title_id"]}/'
+        urls = [
+            title,
+            f'{title}reviews/?limit=2',
+            f'{title}reviews/{ids["review_id"]}/comments/',
+            '/api/v1/categories/',
+            'genres/?search=test',
+        ]
+        data = post_batch(anon_client, urls)
+        assert [row['url'] for row in data] == urls
+        for row in data:
+            path = row['url']
+            if not path.startswith('/'):
+                path = f'/api/v1/{path}'
+            expected = anon_client.get(path)
+            assert row['status'] == expected.status_code == 200
+            assert row['body'] == expected.json(), (
+                f'Проверьте, что ответ на {row["url"]} в пакете совпадает '
+                f'с ответом на отдельный запрос'
+            )
+
+    def test_statuses(self, anon_client, user_client, catalog_factory):
+        catalog_factory(2)
+        urls = ['titles/0/', 'users/me/', 'unknown/',
+                'http://example.com/api/v1/titles/', 'reviews/batch/']
+        statuses = [row['status'] for row in post_batch(anon_client, urls)]
+        assert statuses == [404, 401, 404, 404, 401], (
+            'Проверьте, что в пакете сохраняется статус каждого запроса'
+        )
+        data = post_batch(user_client, ['users/me/', 'reviews/batch/'])
+        assert [row['status'] for row in data] == [200, 405]
+        assert data[0]['body']['username'] == 'TestUser', (
+            'Проверьте, что запросы пакета выполняются от имени клиента'
+        )
+
+    def test_duplicates_run_once(self, anon_client, catalog_factory):
+        ids = catalog_factory(2)
+        url = f'titles/{ids["title_id"]}/reviews/'
+        with CaptureQueriesContext(connection) as single:
+            post_batch(anon_client, [url])
+        with CaptureQueriesContext(connection) as repeated:
+            data = post_batch(anon_client, [url] * 5)
+        assert len(data) == 5 and data[0] == data[4]
+        assert len(repeated) == len(single), (
+            'Проверьте, что одинаковые запросы пакета выполняются один раз'
+        )
+
+    def test_size_limit(self, anon_client, settings):
+        too_many = ['genres/'] * (settings.API_MULTIPLEX_MAX_SIZE + 1)
+        for urls in ([], too_many, 'genres/'):
+            response = anon_client.post(
+                URL, {'requests': urls}, format='json')
+            assert response.status_code == 400, (
+                'Проверьте, что пустой или слишком большой пакет отклоняется'
+            )
@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+
+class FailingBackend(EmailBackend):
+    """Почтовый сервер, отклоняющий письма на первый адрес."""
+
+    opened = 0
+
+    def open(self):
+        FailingBackend.opened += 1
+
+    def send_messages(self, messages):
+        for message in messages:
+            if 'broken@yamdb.fake' in message.to:
+                raise ConnectionError('Сервер недоступен')
+        return super().send_messages(messages)
+
+
+class DownBackend(EmailBackend):
+    """Почтовый сервер, к которому нельзя подключиться."""
+
+    def open(self):
+        raise ConnectionRefusedError('Соединение отклонено')
+
+
+class ClaimingBackend(EmailBackend):
+    """Во время отправки другой обработчик пытается взять письма."""
+
+    claimed = None
+
+    def send_messages(self, messages):
+        from users.outbox import claim_pending
+
+        ClaimingBackend.claimed = claim_pending(10)
+        return super().send_messages(messages)
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def signup(self, client, number):
+        return client.post('/api/v1/auth/signup/', {
+            'username': f'outbox{number}',
+            'email': f'outbox{number}@yamdb.fake',
+        })
+
+    def test_signup_enqueues_without_sending(self, anon_client):
+        from users.models import OutboxMessage
+
+        response = self.signup(anon_client, 0)
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что `/api/v1/auth/signup/` не отправляет письмо '
+            'во время запроса'
+        )
+        message = OutboxMessage.objects.get()
+        assert message.recipients == ['outbox0@yamdb.fake']
+        assert message.sent_at is None
+
+    def test_send_outbox_delivers_batch(self, anon_client):
+        from users.models import OutboxMessage
+        from users.outbox import get_outbox_metrics
+
+        for number in range(3):
+            self.signup(anon_client, number)
+        assert get_outbox_metrics()['pending'] == 3
+        call_command('send_outbox', batch_size=2)
+        assert sorted(message.to[0] for message in mail.outbox) == [
+            f'outbox{number}@yamdb.fake' for number in range(3)
+        ], 'Проверьте, что `send_outbox` отправляет все письма очереди'
+        assert not OutboxMessage.objects.filter(sent_at__isnull=True)
+        metrics = get_outbox_metrics()
+        assert metrics['pending'] == 0
+        assert metrics['sent'] == 3
+        assert metrics['latency_max'] >= metrics['latency_avg'] >= 0
+
+    def test_failed_message_retried_with_backoff(self, settings):
+        from users.models import OutboxMessage
+        from users.outbox import enqueue_mail, send_pending
+
+        settings.OUTBOX_RETRY_DELAY = 10
+        broken = enqueue_mail('Код', '1', 'from@yamdb.fake',
+                              ['broken@yamdb.fake'])
+        enqueue_mail('Код', '2', 'from@yamdb.fake', ['ok@yamdb.fake'])
+        FailingBackend.opened = 0
+        assert send_pending(connection=FailingBackend()) == (1, 1)
+        assert FailingBackend.opened == 1, (
+            'Проверьте, что пачка писем отправляется через одно соединение'
+        )
+        assert [message.to for message in mail.outbox] == [
+            ['ok@yamdb.fake']]
+
+        broken.refresh_from_db()
+        assert broken.attempts == 1
+        assert 'Сервер недоступен' in broken.last_error
+        assert broken.next_attempt_at > timezone.now() + timedelta(
+            seconds=9), (
+            'Проверьте, что неудачная отправка откладывается с задержкой'
+        )
+        assert send_pending(connection=FailingBackend()) == (0, 0)
+
+        OutboxMessage.objects.filter(pk=broken.pk).update(
+            next_attempt_at=timezone.now())
+        send_pending(connection=FailingBackend())
+        broken.refresh_from_db()
+        assert broken.attempts == 2
+        assert broken.next_attempt_at > timezone.now() + timedelta(
+            seconds=19), (
+            'Проверьте, что задержка растет с каждой попыткой'
+        )
+
+    def test_server_down_defers_batch(self, settings):
+        from users.models import OutboxMessage
+        from users.outbox import enqueue_mail, send_pending
+
+        settings.OUTBOX_RETRY_DELAY = 10
+        settings.EMAIL_BACKEND = 'tests.test_outbox.DownBackend'
+        for number in range(2):
+            enqueue_mail('Код', str(number), 'from@yamdb.fake',
+                         [f'user{number}@yamdb.fake'])
+        assert send_pending() == (0, 2), (
+            'Проверьте, что недоступный почтовый сервер не прерывает '
+            'обработку очереди'
+        )
+        call_command('send_outbox')
+        for message in OutboxMessage.objects.all():
+            assert message.attempts == 1
+            assert 'Соединение отклонено' in message.last_error
+            assert message.next_attempt_at > timezone.now() + timedelta(
+                seconds=9), (
+                'Проверьте, что письма откладываются, если соединение '
+                'открыть не удалось'
+            )
+
+    def test_claimed_messages_hidden(self):
+        from users.models import OutboxMessage
+        from users.outbox import enqueue_mail, send_pending
+
+        enqueue_mail('Код', '1', 'from@yamdb.fake', ['ok@yamdb.fake'])
+        assert send_pending(connection=ClaimingBackend()) == (1, 0)
+        assert ClaimingBackend.claimed == [], (
+            'Проверьте, что письма, которые отправляются, не берет '
+            'другой обработчик'
+        )
+        assert OutboxMessage.objects.get().sent_at is not None
+
+    def test_metrics_endpoint(self, anon_client):
+        from users.outbox import enqueue_mail
+
+        enqueue_mail('Код', '1', 'from@yamdb.fake', ['ok@yamdb.fake'])
+        response = anon_client.get('/internal/metrics/')
+        assert 'yamdb_outbox_pending 1' in response.content.decode(), (
+            'Проверьте, что метрики очереди писем отдаются эндпоинтом метрик'
+        )
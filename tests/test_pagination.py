@@ -0,0 +1,87 @@
+import pytest
+
+
+def get_page(client, url, params=None):
+    response = client.get(url, params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def ids(page):
+    return [row['id'] for row in page['results']]
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    def test_next_and_previous(self, anon_client, catalog_factory):
+        from reviews.models import Title
+
+        catalog_factory(5)
+        expected = list(Title.objects.order_by('id').values_list(
+            'id', flat=True))
+        first = get_page(anon_client, '/api/v1/titles/',
+                         {'cursor': '', 'limit': 2})
+        assert set(first) == {'next', 'previous', 'results'}, (
+            'Проверьте, что курсорная страница не считает общее количество'
+        )
+        assert ids(first) == expected[:2] and first['previous'] is None
+        second = get_page(anon_client, first['next'])
+        assert ids(second) == expected[2:4]
+        assert ids(get_page(anon_client, second['previous'])) == expected[:2]
+        third = get_page(anon_client, second['next'])
+        assert ids(third) == expected[4:] and third['next'] is None
+
+    def test_nested_routes(self, anon_client, catalog_factory):
+        catalog = catalog_factory(4)
+        url = f'/api/v1/titles/{catalog["title_id"]}/reviews/'
+        first = get_page(anon_client, url, {'cursor': '', 'limit': 3})
+        assert len(first['results']) == 3
+        rest = get_page(anon_client, first['next'])
+        assert len(rest['results']) == 1 and rest['next'] is None
+
+    def test_limit_cap(self, anon_client, catalog_factory, monkeypatch):
+        from api.pagination import IdCursorPagination
+
+        catalog_factory(5)
+        monkeypatch.setattr(IdCursorPagination, 'max_page_size', 3)
+        page = get_page(anon_client, '/api/v1/titles/',
+                        {'cursor': '', 'limit': 1000})
+        assert len(page['results']) == 3, (
+            'Проверьте, что размер курсорной страницы ограничен'
+        )
+
+    def test_stable_across_inserts(self, anon_client, catalog_factory):
+        from reviews.models import Title
+
+        catalog_factory(4)
+        first = get_page(anon_client, '/api/v1/titles/',
+                         {'cursor': '', 'limit': 2})
+        Title.objects.create(name='Новое', year=2020)
+        seen = ids(first)
+        url = first['next']
+        while url:
+            page = get_page(anon_client, url)
+            seen += ids(page)
+            url = page['next']
+        assert seen == sorted(set(seen)), (
+            'Проверьте, что новые записи не сдвигают страницы курсора'
+        )
+        assert seen == list(Title.objects.order_by('id').values_list(
+            'id', flat=True))
+
+    def test_without_cursor(self, anon_client, catalog_factory):
+        catalog = catalog_factory(4)
+        page = get_page(anon_client, '/api/v1/titles/',
+                        {'limit': 2, 'offset': 1})
+        assert set(page) == {'count', 'next', 'previous', 'results'}
+        assert page['count'] == 4 and len(page['results']) == 2
+        assert 'offset=3' in page['next'], (
+            'Проверьте, что без cursor работает пагинация limit/offset'
+        )
+        page = get_page(
+            anon_client, f'/api/v1/titles/{catalog["title_id"]}/reviews/')
+        assert set(page) == {'count', 'next', 'previous', 'results'}
+        assert page['count'] == 4 and page['next'] is None, (
+            'Проверьте, что без cursor работает постраничная пагинация'
+        )
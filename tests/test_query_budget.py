@@ -0,0 +1,65 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+SMALL = 2
+LARGE = 20
+
+# Максимальное число SQL-запросов на один ответ эндпоинта.
+QUERY_BUDGETS = {
+    '/api/v1/titles/?limit=100': 3,
+    '/api/v1/titles/{title_id}/': 3,
+    '/api/v1/categories/?limit=100': 2,
+    '/api/v1/genres/?limit=100': 2,
+    '/api/v1/titles/{title_id}/reviews/': 3,
+    '/api/v1/titles/{title_id}/reviews/{review_id}/': 3,
+    '/api/v1/titles/{title_id}/reviews/{review_id}/comments/': 3,
+    '/api/v1/titles/{title_id}/reviews/?cursor=': 2,
+}
+
+ADMIN_QUERY_BUDGETS = {
+    '/api/v1/users/?limit=100': 2,
+    '/api/v1/users/{username}/': 1,
+    '/api/v1/users/me/': 0,
+}
+
+
+def count_queries(client, url):
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f'Проверьте, что GET-запрос к `{url}` возвращает статус 200'
+    )
+    return len(context.captured_queries)
+
+
+def assert_budget(client, catalog_factory, url_template, budget):
+    url = url_template.format(**catalog_factory(SMALL, 'small'))
+    small = count_queries(client, url)
+    url = url_template.format(**catalog_factory(LARGE, 'large'))
+    large = count_queries(client, url)
+    assert large <= budget, (
+        f'Проверьте, что GET-запрос к `{url_template}` выполняет не более '
+        f'{budget} SQL-запросов, сейчас: {large}'
+    )
+    assert small == large, (
+        f'Проверьте, что число SQL-запросов к `{url_template}` не зависит '
+        f'от количества объектов: {small} и {large}'
+    )
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+
+    @pytest.mark.parametrize('url_template,budget', QUERY_BUDGETS.items())
+    def test_read_endpoints(self, anon_client, catalog_factory,
+                            url_template, budget):
+        assert_budget(anon_client, catalog_factory, url_template, budget)
+
+    @pytest.mark.parametrize(
+        'url_template,budget', ADMIN_QUERY_BUDGETS.items())
+    def test_admin_endpoints(self, admin_client, catalog_factory,
+                             url_template, budget):
+        assert_budget(admin_client, catalog_factory, url_template, budget)
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+TITLES = 20000
+GENRES = 200
+CATEGORIES = 50
+REVIEWS_PER_TITLE = 3
+
+LARGE_TABLES = ('reviews_title', 'reviews_genretitle',
+                'reviews_review', 'reviews_comment')
+
+HOT_URLS = (
+    '/api/v1/titles/{title_id}/reviews/',
+    '/api/v1/titles/{title_id}/reviews/?cursor=',
+    '/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+    '/api/v1/titles/?genre=genre-7',
+    '/api/v1/titles/?genre=genre-7,genre-8&limit=20',
+    '/api/v1/titles/?category=category-3&year=2003',
+)
+
+
+def find_full_scans(plan):
+    """
+    Узлы плана, читающие большую таблицу целиком: последовательное
+    сканирование или обход индекса без условия по индексу.
+    """
+    scans = []
+    if plan.get('Relation Name') in LARGE_TABLES:
+        if plan['Node Type'] == 'Seq Scan' or (
+                'Index Cond' not in plan and 'Filter' in plan):
+            scans.append(f'{plan["Node Type"]} on {plan["Relation Name"]}')
+    for child in plan.get('Plans', ()):
+        scans.extend(find_full_scans(child))
+    return scans
+
+
+@pytest.fixture
+def large_catalog(db):
+    from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                                Title, User)
+
+    categories = Category.objects.bulk_create(
+        Category(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(CATEGORIES))
+    genres = Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(GENRES))
+    authors = User.objects.bulk_create(
+        User(username=f'author-{i}', email=f'author-{i}@yamdb.fake')
+        for i in range(REVIEWS_PER_TITLE))
+    titles = Title.objects.bulk_create(
+        (Title(name=f'Произведение {i}', year=2000 + i % 20,
+               category=categories[i % CATEGORIES])
+         for i in range(TITLES)), batch_size=5000)
+    GenreTitle.objects.bulk_create(
+        (GenreTitle(title=title, genre=genres[(i + shift) % GENRES])
+         for i, title in enumerate(titles) for shift in (0, 1)),
+        batch_size=5000)
+    reviews = Review.objects.bulk_create(
+        (Review(title=title, author=author, text='Отзыв', score=5)
+         for title in titles for author in authors), batch_size=5000)
+    Comment.objects.bulk_create(
+        (Comment(review=review, author=authors[0], text='Комментарий')
+         for review in reviews), batch_size=5000)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return {'title_id': titles[TITLES // 2].id,
+            'review_id': reviews[TITLES // 2 * REVIEWS_PER_TITLE].id}
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql',
+                    reason='Планы запросов проверяются на PostgreSQL')
+@pytest.mark.django_db
+class TestQueryPlans:
+
+    def assert_no_full_scans(self, client, urls, params):
+        for url_template in urls:
+            url = url_template.format(**params)
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.status_code == 200
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN (FORMAT JSON) ' + query['sql'])
+                    plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scans = find_full_scans(plan[0]['Plan'])
+                assert not scans, (
+                    f'Проверьте индексы для `{url_template}`: запрос '
+                    f'читает таблицу целиком ({", ".join(scans)}).\n'
+                    f'{query["sql"]}'
+                )
+
+    def test_hot_queries_use_indexes(self, anon_client, admin_client,
+                                     large_catalog, settings):
+        self.assert_no_full_scans(anon_client, HOT_URLS, large_catalog)
+
+        # Лента изменений с небольшим остатком читает индекс (updated_at, id).
+        settings.CHANGE_FEED_LAG = 0
+        since = timezone.now().isoformat().replace('+', '%2B')
+        self.assert_no_full_scans(admin_client, [
+            f'/api/v1/changes/{dataset}/?updated_since={since}'
+            for dataset in ('titles', 'reviews', 'comments')
+        ], large_catalog)
@@ -0,0 +1,129 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Avg, Count, Sum
+
+
+def get_ratings():
+    from reviews.models import Title
+
+    return {
+        title.id: (title.review_count, title.score_sum, title.rating)
+        for title in Title.objects.all()
+    }
+
+
+def count_ratings():
+    """Рейтинги, посчитанные по таблице отзывов."""
+    from reviews.models import Title
+
+    return {
+        title.id: (title.count, title.total or 0,
+                   None if title.average is None else int(title.average))
+        for title in Title.objects.annotate(
+            count=Count('reviews'), total=Sum('reviews__score'),
+            average=Avg('reviews__score'))
+    }
+
+
+def assert_ratings(message):
+    assert get_ratings() == count_ratings(), message
+
+
+def add_review(title_id, score, username):
+    from reviews.models import Review, User
+
+    author = User.objects.create(
+        username=username, email=f'{username}@yamdb.fake')
+    return Review.objects.create(
+        title_id=title_id, author=author, text='Отзыв', score=score)
+
+
+@pytest.mark.django_db
+class TestStoredRating:
+
+    @pytest.fixture
+    def titles(self, catalog_factory):
+        from reviews.models import Title
+
+        catalog_factory(3)
+        call_command('rebuild_ratings', stdout=StringIO())
+        return list(Title.objects.order_by('id').values_list('id', flat=True))
+
+    def test_create_change_delete(self, titles):
+        review = add_review(titles[0], 10, 'rating-author')
+        assert get_ratings()[titles[0]] == (4, 25, 6), (
+            'Проверьте, что новый отзыв учитывается в рейтинге, '
+            'а среднее округляется вниз'
+        )
+        review.score = 1
+        review.save()
+        assert get_ratings()[titles[0]] == (4, 16, 4)
+        review.delete()
+        assert_ratings('Проверьте, что удаление отзыва исключает его оценку')
+
+        review = add_review(titles[1], 7, 'rating-single')
+        assert get_ratings()[titles[1]] == (1, 7, 7)
+        review.delete()
+        assert get_ratings()[titles[1]] == (0, 0, None), (
+            'Проверьте, что без отзывов рейтинг пуст'
+        )
+
+    def test_move_review(self, titles):
+        from reviews.models import Review
+
+        review = Review.objects.filter(title_id=titles[0]).first()
+        review.title_id = titles[1]
+        review.score = 9
+        review.save()
+        assert get_ratings()[titles[1]] == (1, 9, 9)
+        assert get_ratings()[titles[0]] == (2, 10, 5)
+        assert_ratings(
+            'Проверьте, что перенос отзыва пересчитывает оба произведения')
+
+    def test_title_cascade_delete(self, titles):
+        from reviews.models import Title
+
+        add_review(titles[1], 8, 'rating-cascade')
+        Title.objects.get(pk=titles[0]).delete()
+        assert titles[0] not in get_ratings()
+        assert_ratings('Проверьте, что удаление произведения не ломает '
+                       'рейтинги остальных')
+
+    def test_bulk_paths(self, titles):
+        from reviews.models import Review, User
+
+        authors = User.objects.bulk_create(
+            User(username=f'rating-bulk-{i}', email=f'rating-bulk-{i}@x.fake')
+            for i in range(3))
+        Review.objects.bulk_create(
+            Review(title_id=titles[1], author=author, text='Отзыв', score=i)
+            for i, author in enumerate(authors, start=2))
+        assert_ratings('Проверьте, что bulk_create обновляет рейтинг')
+
+        Review.objects.filter(title_id=titles[1]).update(score=8)
+        assert get_ratings()[titles[1]] == (3, 24, 8)
+
+        reviews = list(Review.objects.filter(title_id=titles[1]))
+        reviews[0].title_id = titles[2]
+        reviews[1].score = 1
+        Review.objects.bulk_update(reviews[:2], ['title', 'score'])
+        assert_ratings('Проверьте, что bulk_update пересчитывает прежнее '
+                       'и новое произведение')
+
+        Review.objects.filter(title_id=titles[2]).update(title=titles[0])
+        assert get_ratings()[titles[2]] == (0, 0, None)
+        assert_ratings('Проверьте, что перенос отзывов через update '
+                       'пересчитывает оба произведения')
+
+    def test_rebuild_ratings(self, titles):
+        from reviews.models import Title
+
+        add_review(titles[1], 6, 'rating-rebuild-1')
+        add_review(titles[1], 9, 'rating-rebuild-2')
+        Title.objects.update(review_count=0, score_sum=0, rating=None)
+        call_command('rebuild_ratings', stdout=StringIO())
+        assert get_ratings()[titles[1]] == (2, 15, 7)
+        assert_ratings('Проверьте, что rebuild_ratings совпадает '
+                       'с усечением Avg оценок')
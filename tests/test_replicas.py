@@ -0,0 +1,203 @@
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from api_yamdb.replicas import health
+
+
+@pytest.fixture
+def replica(settings):
+    """Реплика — второе соединение с той же тестовой БД."""
+
+    connections.databases['replica1'] = dict(
+        connections['default'].settings_dict)
+    settings.REPLICA_DATABASES = ['replica1']
+    health.checked.clear()
+    yield 'replica1'
+    connections['replica1'].close()
+    del connections['replica1']
+    del connections.databases['replica1']
+    health.checked.clear()
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connections['default']) as primary, \
+            CaptureQueriesContext(connections['replica1']) as replica:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(primary), len(replica)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReplicaRouter:
+
+    def test_safe_api_reads_use_replica(self, anon_client, catalog_factory,
+                                        replica):
+        ids = catalog_factory(2)
+        primary, replica_queries = count_queries(
+            anon_client, f'/api/v1/titles/{ids["title_id"]}/reviews/')
+        assert replica_queries and not primary, (
+            'Проверьте, что безопасные запросы к API читают с реплики'
+        )
+
+    def test_reads_after_write_stay_on_primary(self, admin_client,
+                                               catalog_factory, replica):
+        ids = catalog_factory(2)
+        response = admin_client.post(
+            '/api/v1/genres/', {'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 201
+        assert 'yamdb_primary' in response.cookies, (
+            'Проверьте, что после записи клиент получает cookie, '
+            'закрепляющую его чтение за основной БД'
+        )
+        with CaptureQueriesContext(connections['replica1']) as context:
+            admin_client.post(
+                '/api/v1/genres/', {'name': 'Комедия', 'slug': 'comedy'})
+        assert not context, 'Проверьте, что запись идет в основную БД'
+
+        primary, replica_queries = count_queries(
+            admin_client, f'/api/v1/titles/{ids["title_id"]}/reviews/')
+        assert primary and not replica_queries, (
+            'Проверьте, что клиент после записи читает с основной БД'
+        )
+
+    def test_failed_write_does_not_pin(self, user_client, replica):
+        response = user_client.post(
+            '/api/v1/genres/', {'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 403
+        assert 'yamdb_primary' not in response.cookies
+
+    def test_batch_reads_use_replica(self, anon_client, catalog_factory,
+                                     replica):
+        ids = catalog_factory(2)
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica1']) as context:
+            response = anon_client.post('/api/v1/batch/', {'requests': [
+                f'titles/{ids["title_id"]}/reviews/']}, format='json')
+        assert response.status_code == 200
+        assert context and not primary, (
+            'Проверьте, что пакетное чтение читает с реплики'
+        )
+        assert 'yamdb_primary' not in response.cookies, (
+            'Проверьте, что пакетное чтение не закрепляет клиента '
+            'за основной БД'
+        )
+
+    def test_unhealthy_replica_falls_back(self, anon_client,
+                                          catalog_factory, replica):
+        connections.databases[replica]['NAME'] = 'yamdb_missing_replica'
+        ids = catalog_factory(2)
+        response = anon_client.get(
+            f'/api/v1/titles/{ids["title_id"]}/reviews/')
+        assert response.status_code == 200
+        assert response.json()['count'] == 2, (
+            'Проверьте, что при недоступной реплике чтение идет '
+            'с основной БД'
+        )
+        assert health.checked[replica][1] is False
+
+    def test_health_checked_once_per_interval(self, anon_client,
+                                              catalog_factory, replica):
+        ids = catalog_factory(2)
+        url = f'/api/v1/titles/{ids["title_id"]}/reviews/'
+        anon_client.get(url)
+        checked_at = health.checked[replica][0]
+        anon_client.get(url)
+        assert health.checked[replica][0] == checked_at, (
+            'Проверьте, что состояние реплики проверяется не чаще '
+            'REPLICA_HEALTH_INTERVAL'
+        )
+
+
+@pytest.fixture
+def lagging_replica(replica):
+    """Реплика, которая не видит изменений после вызова фикстуры."""
+
+    connection = connections[replica]
+    connection.ensure_connection()
+    with connection.connection.cursor() as cursor:
+        cursor.execute('BEGIN ISOLATION LEVEL REPEATABLE READ')
+        cursor.execute('SELECT COUNT(*) FROM reviews_title')
+    yield replica
+    with connection.connection.cursor() as cursor:
+        cursor.execute('ROLLBACK')
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLaggingReplica:
+
+    def get_count(self, client, params=None):
+        response = client.get('/api/v1/titles/', params)
+        assert response.status_code == 200
+        return response.json()['count']
+
+    @pytest.fixture
+    def titles(self, catalog_factory, replica):
+        from api.cache import get_cache
+
+        ids = catalog_factory(3)
+        # Реплика давно получила эти изменения: поколения не недавние.
+        get_cache().clear()
+        return ids
+
+    def test_cache_filled_from_primary(self, anon_client, replica, titles,
+                                       lagging_replica):
+        from reviews.models import Title
+
+        with CaptureQueriesContext(connections[replica]) as context:
+            assert self.get_count(anon_client) == 3
+        assert context, 'Реплика должна использоваться до изменений'
+        Title.objects.create(name='Новое', year=2020)
+        assert self.get_count(anon_client) == 4, (
+            'Проверьте, что сразу после смены поколения кэш заполняется '
+            'с основной БД, а не с отстающей реплики'
+        )
+
+    def test_index_built_from_primary(self, anon_client, replica, titles,
+                                      lagging_replica, settings):
+        from api.title_index import title_index
+        from reviews.models import Title
+
+        settings.TITLE_BITMAP_INDEX = True
+        title_index.refresh()
+        Title.objects.create(name='Новое', year=2020)
+        assert self.get_count(anon_client, {'year': 2020}) == 1, (
+            'Проверьте, что сразу после смены поколения индекс '
+            'перестраивается по основной БД'
+        )
+
+    def test_token_client_reads_own_writes(self, user, anon_client, replica,
+                                           titles, lagging_replica):
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        url = f'/api/v1/titles/{titles["title_id"]}/reviews/'
+        token = f'Bearer {AccessToken.for_user(user)}'
+
+        def token_client():
+            # Клиент с токеном не хранит cookie между запросами.
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=token)
+            return client
+
+        assert count_queries(token_client(), url)[1]
+        response = token_client().post(url, {'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        data = token_client().get(url).json()
+        assert response.json()['id'] in [
+            review['id'] for review in data['results']], (
+            'Проверьте, что клиент с токеном без cookie после записи '
+            'видит свои изменения'
+        )
+        primary, replica_queries = count_queries(token_client(), url)
+        assert primary and not replica_queries
+        with CaptureQueriesContext(connections['replica1']) as context:
+            response = token_client().post('/api/v1/batch/', {
+                'requests': [url]}, format='json')
+        assert response.status_code == 200 and not context, (
+            'Проверьте, что пакетное чтение после записи идет '
+            'с основной БД'
+        )
+        assert not count_queries(anon_client, url)[0], (
+            'Проверьте, что другие клиенты читают с реплики'
+        )
@@ -0,0 +1,46 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_repeated_request_served_from_cache(self, anon_client,
+                                                catalog_factory):
+        catalog_factory(3)
+        url = '/api/v1/titles/?genre=test-genre-1,test-genre-0&limit=2'
+        first = anon_client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            second = anon_client.get(
+                '/api/v1/titles/?limit=2&genre=test-genre-0,test-genre-1')
+        assert second.json() == first.json(), (
+            'Проверьте, что повторный запрос возвращает тот же ответ'
+        )
+        assert len(context.captured_queries) == 0, (
+            'Проверьте, что повторный запрос к `/api/v1/titles/` '
+            'обслуживается из кэша без запросов к БД'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_write_invalidates_cache(self, anon_client, admin_client,
+                                     catalog_factory):
+        ids = catalog_factory(1)
+        url = f'/api/v1/titles/{ids["title_id"]}/'
+        assert anon_client.get(url).json()['name'] == 'Произведение 0'
+        response = admin_client.patch(url, {'name': 'Новое название'})
+        assert response.status_code == 200
+        assert anon_client.get(url).json()['name'] == 'Новое название', (
+            'Проверьте, что изменение произведения сбрасывает кэш ответов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_review_invalidates_rating(self, anon_client, user_client,
+                                       catalog_factory):
+        ids = catalog_factory(1)
+        url = f'/api/v1/titles/{ids["title_id"]}/'
+        assert anon_client.get(url).json()['rating'] == 5
+        user_client.post(f'{url}reviews/', {'text': 'Отзыв', 'score': 8})
+        assert anon_client.get(url).json()['rating'] == 6, (
+            'Проверьте, что новый отзыв сбрасывает кэш рейтинга'
+        )
@@ -0,0 +1,65 @@
+import pytest
+
+
+@pytest.fixture
+def search_catalog(db):
+    from reviews.models import Category, Title
+
+    movie = Category.objects.create(name='Фильмы', slug='movie')
+    book = Category.objects.create(name='Книги', slug='book')
+    Title.objects.create(
+        name='Крестный отец', year=1972, category=movie,
+        description='Фильм о мафиозной семье')
+    Title.objects.create(
+        name='Семья', year=2000, category=movie, description='Драма')
+    Title.objects.create(
+        name='Отцы и дети', year=1862, category=book,
+        description='Роман о семье и конфликте поколений')
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def test_ranked_search(self, anon_client, search_catalog):
+        response = anon_client.get('/api/v1/titles/?search=семья')
+        names = [title['name'] for title in response.json()['results']]
+        assert names[0] == 'Семья', (
+            'Проверьте, что совпадение в названии ранжируется выше, '
+            'чем в описании'
+        )
+        assert set(names) == {'Семья', 'Крестный отец', 'Отцы и дети'}
+
+    def test_search_with_filters(self, anon_client, search_catalog):
+        response = anon_client.get(
+            '/api/v1/titles/?search=семья&category=book')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Отцы и дети'], (
+            'Проверьте, что поиск сочетается с фильтрами'
+        )
+
+    def test_index_follows_updates(self, admin_client, anon_client,
+                                   search_catalog):
+        from reviews.models import Title
+
+        title = Title.objects.get(name='Семья')
+        admin_client.patch(
+            f'/api/v1/titles/{title.id}/', {'description': 'Вестерн'})
+        response = anon_client.get('/api/v1/titles/?search=вестерн')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Семья'], (
+            'Проверьте, что поисковый индекс обновляется при изменении'
+        )
+
+
+class TestSqlitePrefix:
+
+    def test_get_prefix(self):
+        from reviews.search import get_prefix
+
+        assert get_prefix('Семья') == 'семь', (
+            'Проверьте, что у слова запроса отбрасывается окончание'
+        )
+        assert get_prefix('вестерн') == 'вестерн'
+        assert get_prefix('оба') == 'оба', (
+            'Проверьте, что у коротких слов окончание не отбрасывается'
+        )
@@ -0,0 +1,122 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.title_index import count_bits, slice_bits, title_index, to_bits
+
+
+class TestBits:
+
+    def test_slice_bits(self):
+        ids = [1, 7, 8, 9, 64, 300, 301]
+        bits = to_bits(ids)
+        assert count_bits(bits) == len(ids)
+        assert slice_bits(bits, 0) == ids
+        assert slice_bits(bits, 2, 5) == ids[2:5], (
+            'Проверьте, что срез карты совпадает со срезом списка id'
+        )
+        assert slice_bits(bits, 6, 100) == [301]
+        assert slice_bits(bits, 7) == []
+        assert to_bits([]) == 0 and slice_bits(0, 0, 10) == []
+
+
+@pytest.mark.django_db(transaction=True)
+class TestTitleIndex:
+
+    @pytest.fixture(autouse=True)
+    def index(self, settings):
+        settings.TITLE_BITMAP_INDEX = True
+
+    @pytest.fixture
+    def titles(self, catalog_factory):
+        """
+        Шесть произведений 2000 года в своих категориях с жанрами
+        test-genre-0 и test-genre-1; у четвертого и пятого год 1999,
+        у шестого еще жанр test-genre-2.
+        """
+        from reviews.models import Genre, GenreTitle, Title
+
+        catalog_factory(6)
+        ids = list(Title.objects.values_list('id', flat=True))
+        Title.objects.filter(pk__in=ids[3:5]).update(year=1999)
+        GenreTitle.objects.create(
+            title_id=ids[5], genre=Genre.objects.get(slug='test-genre-2'))
+        return ids
+
+    def get_ids(self, client, params):
+        response = client.get('/api/v1/titles/', {'limit': 10, **params})
+        assert response.status_code == 200
+        data = response.json()
+        return data['count'], [title['id'] for title in data['results']]
+
+    def test_filters(self, anon_client, titles):
+        cases = (
+            ({'genre': 'test-genre-1,test-genre-2'}, titles),
+            ({'genre': 'test-genre-2', 'year': 2000}, titles[5:]),
+            ({'category': 'test-category-3,test-category-5', 'year': 1999},
+             titles[3:4]),
+            ({'category': 'unknown'}, []),
+            ({'year': '1999.5'}, []),
+            ({}, titles),
+        )
+        for params, expected in cases:
+            assert self.get_ids(anon_client, params) == (
+                len(expected), expected), (
+                f'Проверьте отбор произведений по индексу с фильтрами {params}'
+            )
+
+    def test_bulk_load_rebuilds_index(self, anon_client, titles):
+        from reviews.models import Review, Title, reviews_bulk_changed
+
+        title_index.refresh()
+        title = Title.objects.bulk_create([
+            Title(name='Загруженное', year=1990)])[0]
+        # Так о загрузке сообщают import_db и generate_dataset.
+        reviews_bulk_changed.send(sender=Review, title_ids=None)
+        assert self.get_ids(anon_client, {'year': 1990}) == (1, [title.pk]), (
+            'Проверьте, что после загрузки данных в обход API индекс '
+            'перестраивается при следующем запросе'
+        )
+
+    def test_page_without_count_query(self, anon_client, titles):
+        title_index.refresh()
+        with CaptureQueriesContext(connection) as context:
+            count, ids = self.get_ids(
+                anon_client, {'genre': 'test-genre-0', 'limit': 2,
+                              'offset': 3})
+        assert (count, ids) == (6, titles[3:5])
+        sql = ' '.join(query['sql'] for query in context).upper()
+        assert 'COUNT(' not in sql, (
+            'Проверьте, что количество считается по индексу, а из БД '
+            'читается только страница'
+        )
+        assert len(context) == 2, (
+            'Проверьте, что для страницы читаются только произведения '
+            'и их жанры'
+        )
+
+    def test_falls_back_to_database(self, anon_client, titles):
+        count, ids = self.get_ids(
+            anon_client, {'year': 1999, 'ordering': '-name'})
+        assert ids == [titles[4], titles[3]], (
+            'Проверьте, что запросы с сортировкой обрабатываются БД'
+        )
+        response = anon_client.get('/api/v1/titles/', {'year': 'abc'})
+        assert response.status_code == 400
+
+    def test_refreshes_after_write(self, admin_client, anon_client, titles):
+        assert self.get_ids(anon_client, {'year': 1999})[0] == 2
+        response = admin_client.post('/api/v1/titles/', {
+            'name': 'Новое', 'year': 1999, 'category': 'test-category-0',
+            'genre': ['test-genre-2'],
+        })
+        assert response.status_code == 201
+        assert self.get_ids(
+            anon_client, {'year': 1999, 'genre': 'test-genre-2'}
+        ) == (1, [response.json()['id']]), (
+            'Проверьте, что индекс перестраивается после записи каталога'
+        )
+        response = admin_client.patch(
+            f'/api/v1/titles/{titles[3]}/', {'genre': ['test-genre-2']})
+        assert response.status_code == 200
+        assert self.get_ids(anon_client, {'genre': 'test-genre-2'})[0] == 3
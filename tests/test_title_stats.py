@@ -0,0 +1,217 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+def get_state():
+    from reviews.models import LeaderboardEntry, TitleActivity, TitleScore
+
+    return (
+        sorted(TitleScore.objects.filter(count__gt=0).values_list(
+            'title_id', 'score', 'count')),
+        sorted(TitleActivity.objects.filter(review_count__gt=0).values_list(
+            'title_id', 'day', 'review_count', 'score_sum')),
+        sorted(LeaderboardEntry.objects.values_list(
+            'period', 'category_id', 'genre_id', 'title_id', 'review_count',
+            'score_sum'), key=str),
+    )
+
+
+def add_reviews(title_id, scores, prefix='stats'):
+    from reviews.models import Review, User
+
+    for i, score in enumerate(scores):
+        author = User.objects.create(
+            username=f'{prefix}-{title_id}-{i}',
+            email=f'{prefix}-{title_id}-{i}@yamdb.fake')
+        Review.objects.create(
+            title_id=title_id, author=author, text='Отзыв', score=score)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestTitleStats:
+
+    def test_stats(self, anon_client, catalog_factory):
+        ids = catalog_factory(4)
+        add_reviews(ids['title_id'], [1, 10])
+        response = anon_client.get(f'/api/v1/titles/{ids["title_id"]}/stats/')
+        assert response.status_code == 200
+        data = response.json()
+        assert data['count'] == 6
+        assert data['mean'] == 5.17
+        assert data['median'] == 5, (
+            'Проверьте, что медиана четного числа оценок — среднее двух '
+            'средних оценок'
+        )
+        assert {'score': 10, 'count': 1} in data['histogram']
+        assert {'score': 5, 'count': 4} in data['histogram']
+        assert len(data['histogram']) == 11
+
+    def test_stats_not_found(self, anon_client):
+        assert anon_client.get('/api/v1/titles/0/stats/').status_code == 404
+
+    def test_histogram_follows_api_writes(self, user_client, anon_client,
+                                          catalog_factory):
+        ids = catalog_factory(2)
+        url = f'/api/v1/titles/{ids["title_id"]}/'
+        response = user_client.post(
+            f'{url}reviews/', {'text': 'Отзыв', 'score': 8})
+        assert response.status_code == 201
+        review = f'{url}reviews/{response.json()["id"]}/'
+        user_client.patch(review, {'score': 2})
+        histogram = {row['score']: row['count'] for row in
+                     anon_client.get(f'{url}stats/').json()['histogram']}
+        assert histogram[2] == 1 and histogram[8] == 0, (
+            'Проверьте, что изменение оценки переносит отзыв '
+            'в распределении оценок'
+        )
+        user_client.delete(review)
+        assert anon_client.get(f'{url}stats/').json()['count'] == 2
+
+    def test_rebuild_matches_incremental(self, catalog_factory):
+        from reviews.models import Review
+        from reviews.stats import rebuild_title_stats
+
+        ids = catalog_factory(3)
+        add_reviews(ids['title_id'], [3, 9])
+        review = Review.objects.get(pk=ids['review_id'])
+        review.score = 1
+        review.save()
+        Review.objects.filter(score=9).get().delete()
+        expected = get_state()
+        rebuild_title_stats()
+        assert get_state() == expected, (
+            'Проверьте, что пересчет статистики по отзывам совпадает '
+            'с накопленной при изменениях'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLeaderboards:
+
+    @pytest.fixture
+    def titles(self, catalog_factory):
+        """
+        Три произведения: у первого три отзыва с оценкой 5,
+        у второго одна оценка 10, у третьего пять оценок 9.
+        """
+        from reviews.models import Title
+
+        catalog_factory(3)
+        titles = list(Title.objects.order_by('id').values_list(
+            'id', flat=True))
+        add_reviews(titles[1], [10])
+        add_reviews(titles[2], [9] * 5)
+        return titles
+
+    def get_top(self, client, **params):
+        response = client.get('/api/v1/titles/top/', params)
+        assert response.status_code == 200
+        return [row['title']['id'] for row in response.json()['results']]
+
+    def test_order(self, anon_client, titles):
+        response = anon_client.get('/api/v1/titles/top/')
+        assert response.status_code == 200
+        data = response.json()
+        assert [row['title']['id'] for row in data['results']] == [
+            titles[2], titles[1], titles[0]], (
+            'Проверьте, что одна высокая оценка не поднимает произведение '
+            'выше многих'
+        )
+        first = data['results'][0]
+        assert first['rank'] == 1
+        assert first['reviews'] == 5
+        assert first['average'] == 9
+        assert first['score'] == 7
+
+    def test_scopes(self, anon_client, titles):
+        assert self.get_top(anon_client, category='test-category-1') == [
+            titles[1]]
+        assert self.get_top(anon_client, genre='test-genre-1') == [
+            titles[2], titles[1], titles[0]]
+        assert self.get_top(
+            anon_client, category='test-category-2', genre='test-genre-0'
+        ) == [titles[2]]
+        assert self.get_top(anon_client, genre='test-genre-2') == []
+        assert self.get_top(anon_client, category='unknown') == [], (
+            'Проверьте, что для неизвестной категории рейтинг пуст'
+        )
+        assert self.get_top(anon_client, limit=1) == [titles[2]]
+
+    def test_follows_category_change(self, admin_client, anon_client, titles):
+        response = admin_client.patch(
+            f'/api/v1/titles/{titles[0]}/', {'category': 'test-category-1'})
+        assert response.status_code == 200
+        assert self.get_top(anon_client, category='test-category-1') == [
+            titles[1], titles[0]], (
+            'Проверьте, что смена категории переносит произведение '
+            'в рейтинг новой категории'
+        )
+        assert self.get_top(anon_client, category='test-category-0') == []
+
+    def test_windows(self, anon_client, titles):
+        from reviews.models import Review
+        from reviews.stats import expire_activity, rebuild_title_stats
+
+        Review.objects.filter(title_id=titles[2]).update(
+            pub_date=timezone.now() - timedelta(days=10))
+        rebuild_title_stats()
+        assert self.get_top(anon_client, window='week') == [
+            titles[1], titles[0]], (
+            'Проверьте, что рейтинг за неделю не учитывает старые отзывы'
+        )
+        assert self.get_top(anon_client, window='month') == [
+            titles[2], titles[1], titles[0]]
+
+        Review.objects.filter(title_id=titles[0]).update(
+            pub_date=timezone.now() - timedelta(days=40))
+        rebuild_title_stats([titles[0]])
+        expire_activity()
+        assert self.get_top(anon_client, window='month') == [
+            titles[2], titles[1]]
+        assert len(self.get_top(anon_client, window='all')) == 3
+
+    def test_refresh_loop(self, anon_client, titles, monkeypatch):
+        from reviews.management.commands import refresh_leaderboards
+        from reviews.models import TitleActivity
+
+        # Прошло восемь дней: отзывы первого произведения вне недели.
+        TitleActivity.objects.filter(title_id=titles[0]).update(
+            day=timezone.localdate() - timedelta(days=8))
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(refresh_leaderboards.time, 'sleep', sleep)
+        with pytest.raises(KeyboardInterrupt):
+            call_command('refresh_leaderboards', '--loop', stdout=StringIO())
+        assert titles[0] not in self.get_top(anon_client, window='week'), (
+            'Проверьте, что refresh_leaderboards --loop сразу исключает '
+            'из рейтинга устаревшие отзывы'
+        )
+        assert titles[0] in self.get_top(anon_client, window='month')
+        assert 60 < sleeps[0] <= 24 * 60 * 60 + 60, (
+            'Проверьте, что следующее обновление — в начале суток'
+        )
+
+    def test_invalid_params(self, anon_client):
+        for params in ({'window': 'year'}, {'limit': 0}, {'limit': 1000}):
+            response = anon_client.get('/api/v1/titles/top/', params)
+            assert response.status_code == 400, (
+                f'Проверьте, что параметры {params} отклоняются'
+            )
+
+    def test_constant_queries(self, anon_client, titles):
+        with CaptureQueriesContext(connection) as context:
+            self.get_top(anon_client, category='test-category-0',
+                         genre='test-genre-0')
+        assert len(context) <= 4, (
+            'Проверьте, что рейтинг читается постоянным числом запросов'
+        )
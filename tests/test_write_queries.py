@@ -0,0 +1,125 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+def assert_queries(client, method, url, data, status, budget):
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(url, data)
+    assert response.status_code == status, (
+        f'Проверьте, что {method.upper()}-запрос к `{url}` '
+        f'возвращает статус {status}'
+    )
+    queries = [query['sql'] for query in context.captured_queries]
+    assert len(queries) <= budget, (
+        f'Проверьте, что {method.upper()}-запрос к `{url}` выполняет '
+        f'не больше {budget} SQL-запросов, а не {len(queries)}:\n'
+        + '\n'.join(queries)
+    )
+    return response
+
+
+@pytest.mark.django_db
+class TestWriteQueries:
+
+    @pytest.fixture
+    def urls(self, catalog_factory):
+        ids = catalog_factory(3)
+        title = f'/api/v1/titles/{ids["title_id"]}/'
+        review = f'{title}reviews/{ids["review_id"]}/'
+        return {'title': title, 'review': review,
+                'username': ids['username']}
+
+    @pytest.fixture
+    def author_client(self, urls, django_user_model):
+        client = APIClient()
+        client.force_authenticate(
+            django_user_model.objects.get(username=urls['username']))
+        return client
+
+    # Рейтинг, распределение оценок, отзывы за день и рейтинги лидеров
+    # обновляются в одной транзакции: два запроса SAVEPOINT, обновление
+    # рейтинга, оценки (и вставка новой оценки), отзывов за день,
+    # удаление и вставка мест в рейтингах лидеров.
+    STATS_QUERIES = 7
+
+    def test_create_review(self, user_client, urls):
+        # Произведение вместе с признаком отзыва автора, вставка отзыва,
+        # обновление рейтинга и статистики.
+        url = f'{urls["title"]}reviews/'
+        assert_queries(
+            user_client, 'post', url, {'text': 'Отзыв', 'score': 7}, 201,
+            2 + self.STATS_QUERIES + 1)
+        assert_queries(
+            user_client, 'post', url, {'text': 'Отзыв', 'score': 7}, 400, 1)
+
+    def test_update_review(self, author_client, urls):
+        # Отзыв с автором, запись отзыва, обновление рейтинга
+        # и статистики по обеим оценкам.
+        assert_queries(
+            author_client, 'patch', urls['review'], {'score': 9}, 200,
+            2 + self.STATS_QUERIES + 2)
+
+    def test_delete_review(self, author_client, urls):
+        # Отзыв, его комментарии, удаление комментариев и отзыва,
+        # обновление рейтинга и статистики.
+        assert_queries(author_client, 'delete', urls['review'], None, 204,
+                       4 + self.STATS_QUERIES)
+
+    def test_create_comment(self, user_client, urls):
+        # Отзыв, вставка комментария, отметка времени отзыва.
+        assert_queries(
+            user_client, 'post', f'{urls["review"]}comments/',
+            {'text': 'Комментарий'}, 201, 3)
+
+    def test_update_comment(self, author_client, urls):
+        # Отзыв, комментарий с автором, запись комментария,
+        # отметка времени отзыва.
+        from reviews.models import Comment
+
+        comment = Comment.objects.filter(
+            author__username=urls['username']).get()
+        assert_queries(
+            author_client, 'patch',
+            f'{urls["review"]}comments/{comment.pk}/',
+            {'text': 'Исправлено'}, 200, 4)
+
+    def test_failed_delete_does_not_leak_marks(self, user_client, urls):
+        from django.db import transaction
+        from django.db.models.signals import post_delete
+
+        from reviews.models import Comment, Review, deleting_reviews
+
+        review = Review.objects.get(pk=urls['review'].split('/')[-2])
+
+        def fail(sender, **kwargs):
+            raise RuntimeError('Удаление прервано')
+
+        post_delete.connect(fail, sender=Comment)
+        try:
+            with pytest.raises(RuntimeError), transaction.atomic():
+                review.delete()
+        finally:
+            post_delete.disconnect(fail, sender=Comment)
+        assert deleting_reviews.get() == frozenset(), (
+            'Проверьте, что отметка об удалении снимается и после ошибки'
+        )
+        updated_at = review.updated_at
+        response = user_client.post(
+            f'{urls["review"]}comments/', {'text': 'Комментарий'})
+        assert response.status_code == 201
+        review.refresh_from_db()
+        assert review.updated_at > updated_at, (
+            'Проверьте, что после неудачного удаления комментарии '
+            'по-прежнему обновляют отметку времени отзыва'
+        )
+
+    def test_token(self, anon_client, user):
+        from django.contrib.auth.tokens import default_token_generator
+
+        assert_queries(
+            anon_client, 'post', '/api/v1/auth/token/', {
+                'username': user.username,
+                'confirmation_code': default_token_generator.make_token(user),
+            }, 200, 1)